@@ -1,5 +1,6 @@
 import json
 import os
+import sys
 from datetime import datetime
 from pathlib import Path
 
@@ -8,6 +9,9 @@ import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from pipeline.catalog import layer_summary
+
 st.set_page_config(
     page_title="Feature Intelligence Platform",
     page_icon="⚡",
@@ -226,6 +230,17 @@ def load_metrics():
 
 @st.cache_data(ttl=30)
 def load_trends():
+    # Pre-aggregated daily rollup from the Gold layer; CSV export as fallback.
+    # Imported here so a deploy without the pipeline's ingest dependencies
+    # still starts and falls back to the CSV.
+    try:
+        from pipeline.gold import load_gold
+    except ImportError:
+        gold = pd.DataFrame()
+    else:
+        gold = load_gold("day", columns=["feature_name", "period_start", "avg_latency", "avg_feedback", "usage_count"])
+    if not gold.empty:
+        return gold.rename(columns={"period_start": "date", "avg_latency": "avg_latency_ms"})
     p = "data/processed/feature_daily_trends.csv"
     if Path(p).exists():
         df = pd.read_csv(p)
@@ -686,8 +701,8 @@ with tab5:
         ("🥈 SILVER", "data/silver", "Cleaned, transformed, scored"),
         ("🥇 GOLD",   "data/gold",   "Business-ready aggregations"),
     ]:
-        files   = list(Path(lpath).rglob("*.parquet")) if Path(lpath).exists() else []
-        size_mb = sum(f.stat().st_size for f in files) / 1e6 if files else 0
+        summary = layer_summary(Path(lpath))
+        size_mb = summary["bytes"] / 1e6
         st.markdown(f"""
         <div class="feature-row">
             <div>
@@ -695,7 +710,7 @@ with tab5:
                 <div style="font-size:0.7rem;color:#475569;font-family:JetBrains Mono;margin-top:0.2rem;">{ldesc}</div>
             </div>
             <div style="text-align:right;font-family:JetBrains Mono;font-size:0.78rem;color:#94a3b8;">
-                <div>{len(files)} parquet files</div>
+                <div>{summary["files"]} parquet files</div>
                 <div style="color:#475569;">{size_mb:.2f} MB</div>
             </div>
         </div>""", unsafe_allow_html=True)
@@ -1,9 +1,10 @@
 import json
 import logging
 import os
+import sys
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 import pandas as pd
 
@@ -13,6 +14,11 @@ try:
 except ImportError:
     KAFKA_AVAILABLE = False
 
+# Project root on the path so the consumer can share the pipeline's Bronze writer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipeline.dedup import DedupIndex, RotatingBloomFilter, drop_duplicates
+from pipeline.ingest import event_dates, write_partitioned
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
@@ -27,8 +33,21 @@ KAFKA_GROUP_ID = "analytics-pipeline-consumer"
 # This creates: data/bronze/date=2024-01-15/events.parquet
 BRONZE_OUTPUT_PATH = Path("data/bronze")
 
-
-def save_to_bronze(events: list) -> Optional[Path]:
+# Kafka delivers at-least-once: redelivered events are dropped against a
+# Bloom filter of recently seen (user_id, timestamp) keys, one filter per
+# event date, keeping the last DEDUP_WINDOWS days. A Bloom hit can be a
+# false positive, so it is confirmed against the exact keys of that date
+# (read only for dates with hits) before an event is dropped
+DEDUP_BLOOM_PATH = BRONZE_OUTPUT_PATH / "_dedup_bloom.npz"
+DEDUP_INDEX_PATH = BRONZE_OUTPUT_PATH / "_kafka_dedup_index"
+DEDUP_WINDOWS = 7
+
+
+def save_to_bronze(
+    events: list,
+    dedup: Optional[RotatingBloomFilter] = None,
+    seen: Optional[DedupIndex] = None,
+) -> Optional[List[Path]]:
     """
     Save a batch of events to the Bronze data layer as Parquet.
     
@@ -42,29 +61,40 @@ def save_to_bronze(events: list) -> Optional[Path]:
     - Silver = cleaned and validated data  
     - Gold = business-ready aggregated data
     This is called the Medallion Architecture (used at Databricks/Netflix).
+
+    With a `dedup` filter, events already seen (in this batch or an earlier
+    one) are dropped before writing — with `seen` (the exact keys), only
+    once it confirms the filter's hit.
     """
     if not events:
         return None
 
     df = pd.DataFrame(events)
 
-    # Partition by date (like a real data lake)
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    partition_path = BRONZE_OUTPUT_PATH / f"date={today}"
-    partition_path.mkdir(parents=True, exist_ok=True)
+    # Partition by EVENT date (like a real data lake) — a replayed backlog
+    # lands in the days it happened, not in today's partition. The date is
+    # also the event's dedup window.
+    dates = event_dates(df)
+    dropped = 0
+    if dedup is not None:
+        df, dropped = drop_duplicates(df, dedup, window=dates.to_numpy(), confirm=seen)
+        dates = dates.loc[df.index]
+        if df.empty:
+            logger.info(f"All {dropped} events were duplicates — nothing saved")
+            return []
 
     # Add ingestion metadata
     df["_ingested_at"] = datetime.now(timezone.utc).isoformat()
     df["_source"] = "kafka_consumer"
-    df["_partition_date"] = today
 
     # Save as Parquet (not CSV — this is production standard)
-    ts = datetime.now(timezone.utc).strftime("%H%M%S")
-    output_file = partition_path / f"events_{ts}.parquet"
-    df.to_parquet(output_file, index=False, engine="pyarrow")
-
-    logger.info(f"✅ Saved {len(df)} events → {output_file}")
-    return output_file
+    ts = datetime.now(timezone.utc).strftime("%H%M%S_%f")
+    output_files = write_partitioned(df, BRONZE_OUTPUT_PATH, f"events_{ts}.parquet", dates)
+    logger.info(
+        f"✅ Saved {len(df)} events → {len(output_files)} partition(s) under {BRONZE_OUTPUT_PATH}"
+        + (f" ({dropped} duplicates dropped)" if dropped else "")
+    )
+    return output_files
 
 
 def consume_from_kafka(max_messages: int = 500, timeout_ms: int = 5000) -> list:
@@ -97,6 +127,8 @@ def consume_from_kafka(max_messages: int = 500, timeout_ms: int = 5000) -> list:
         logger.error(f"❌ Cannot connect to Kafka: {e}")
         return []
 
+    dedup = RotatingBloomFilter.load(DEDUP_BLOOM_PATH, max_windows=DEDUP_WINDOWS)
+    seen = DedupIndex.load(DEDUP_INDEX_PATH, max_windows=DEDUP_WINDOWS)
     events = []
     batch = []
     BATCH_SIZE = 50  # Save to disk every 50 events (micro-batching)
@@ -111,7 +143,7 @@ def consume_from_kafka(max_messages: int = 500, timeout_ms: int = 5000) -> list:
 
             # Save in batches (efficient I/O)
             if len(batch) >= BATCH_SIZE:
-                save_to_bronze(batch)
+                save_to_bronze(batch, dedup, seen)
                 batch = []
                 logger.info(f" Progress: {len(events)}/{max_messages} events consumed")
 
@@ -123,8 +155,10 @@ def consume_from_kafka(max_messages: int = 500, timeout_ms: int = 5000) -> list:
     finally:
         # Save any remaining events
         if batch:
-            save_to_bronze(batch)
+            save_to_bronze(batch, dedup, seen)
         consumer.close()
+        dedup.save(DEDUP_BLOOM_PATH)
+        seen.save()
 
     logger.info(f"✅ Consumer done. Total events consumed: {len(events)}")
     return events
@@ -1,24 +1,466 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from pipeline.ingest import (
+    DAY_KEY_COLUMN, TIMESTAMP_FORMAT, day_keys, parse_timestamps, render_day_keys,
+)
+from pipeline.sketches import DEFAULT_COMPRESSION, TDigest
+
+# Columns that aggregate_daily() produces as per-row means
+MEAN_COLUMNS = ["avg_latency", "crash_rate", "avg_feedback", "avg_error_count"]
+
+# Columns aggregate_daily() reads — all a caller needs to hand it
+# (timestamp only matters for frames without a day key yet)
+AGGREGATE_INPUT_COLUMNS = [
+    "feature_name", "timestamp", DAY_KEY_COLUMN, "user_id",
+    "latency_ms", "crash_flag", "feedback_score", "error_count",
+]
+
+# Group-by engine behind partial_aggregates(): "pandas" (groupby().agg())
+# or "arrow" (pyarrow Table.group_by — multi-threaded, no Python objects)
+AGGREGATION_BACKENDS = ("pandas", "arrow")
+AGGREGATION_BACKEND = "pandas"
+
+
+def aggregate_daily(df, backend: Optional[str] = None):
+    """
+    Per feature-day metrics of an event frame — finalize_partial_aggregates()
+    of its partial_aggregates(), so a full run and an incremental merge
+    produce their averages the same way — plus exact latency percentiles.
+    """
+    return finalize_partial_aggregates(
+        partial_aggregates(df, backend=backend), percentiles=latency_percentiles(df)
+    )
+
+
+# ─────────────────────────────────────────────
+# PARTIAL AGGREGATES
+#   Per (feature_name, day_key): sum, non-null count and sum of squares of
+#   each metric, plus usage_count. Partials of two batches merge by
+#   addition, so a new batch (including late events for old days) updates
+#   only the feature-days it touches, without re-reading earlier events.
+#   Means (and standard deviations) are derived only when finalizing.
+# ─────────────────────────────────────────────
+
+# Output mean column -> event metric it averages
+PARTIAL_METRICS = {
+    "avg_latency":     "latency_ms",
+    "crash_rate":      "crash_flag",
+    "avg_feedback":    "feedback_score",
+    "avg_error_count": "error_count",   # added for ML risk scoring
+}
+PARTIAL_KEY = ["feature_name", DAY_KEY_COLUMN]
+# Additive columns of a partial-aggregate row (everything but its key)
+PARTIAL_VALUE_COLUMNS = ["usage_count"] + [
+    f"{col}_{part}" for col in PARTIAL_METRICS.values() for part in ("sum", "count", "sumsq")
+]
+
+DAILY_COLUMNS = [
+    "feature_name", "date", "avg_latency", "crash_rate",
+    "avg_feedback", "usage_count", "avg_error_count",
+]
+
+
+def partial_aggregates(
+    df: pd.DataFrame,
+    period_key: str = DAY_KEY_COLUMN,
+    backend: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Partial aggregates of an event frame, one row per feature and period.
+
+    Args:
+        df: Event frame
+        period_key: Integer period column to group by — the day key by
+                    default; finer grains (e.g. gold's hour_key) must be
+                    added to `df` by the caller
+        backend: "pandas" or "arrow" (see AGGREGATION_BACKENDS; default:
+                 AGGREGATION_BACKEND, read at call time). Both give the same
+                 rows, columns and dtypes; float sums may differ in the last
+                 bit (pandas sums with Kahan compensation)
+
+    Returns:
+        DataFrame with feature_name, the period key, usage_count and
+        <metric>_sum / <metric>_count / <metric>_sumsq per metric
+    """
+    if backend is None:
+        backend = AGGREGATION_BACKEND
+    if backend not in AGGREGATION_BACKENDS:
+        raise ValueError(f"Unknown aggregation backend '{backend}'. Use one of {AGGREGATION_BACKENDS}.")
+
+    # Only the columns the aggregation reads, never a full-frame copy
+    wanted = AGGREGATE_INPUT_COLUMNS + ([period_key] if period_key not in AGGREGATE_INPUT_COLUMNS else [])
+    df = df[[c for c in wanted if c in df.columns]].copy(deep=False)
 
+    # Daily grain: the integer day key from ingest (parsed here only for
+    # frames that didn't come through it) — dates are rendered on output
+    parse_timestamps(df)
 
-def aggregate_daily(df):
-    df = df.copy()
+    # Accumulate every metric (float32 in the compact profile) in float64
+    aggs = {"usage_count": ("user_id", "count")}
+    for col in PARTIAL_METRICS.values():
+        df[col] = df[col].astype("float64")
+        df[f"{col}_sq"] = df[col] * df[col]
+        aggs[f"{col}_sum"] = (col, "sum")
+        aggs[f"{col}_count"] = (col, "count")
+        aggs[f"{col}_sumsq"] = (f"{col}_sq", "sum")
+
+    key = ["feature_name", period_key]
+    if backend == "arrow":
+        partials = _arrow_group_by(df, key, aggs)
+    else:
+        # observed=True: with a categorical feature_name (compact dtype
+        # profile) only feature-days that actually occur are emitted
+        partials = df.groupby(key, as_index=False, observed=True).agg(**aggs)
+    partials["feature_name"] = partials["feature_name"].astype(str)
+    partials[period_key] = partials[period_key].astype("int32")
+    return partials
+
+
+def _arrow_group_by(df: pd.DataFrame, key: list, aggs: dict) -> pd.DataFrame:
+    """
+    Internal: The pandas named aggregations `aggs` ("count" / "sum") run
+    through pyarrow's hash group-by, with the same rows in the same order
+    as df.groupby(key, as_index=False, observed=True).agg(**aggs).
+
+    Labels are grouped on integer codes (categorical codes, or factorized
+    strings) and the small result is sorted the way pandas sorts: by
+    category order, else by label. Rows with a null key are dropped, as
+    pandas' dropna=True does.
+    """
+    label, period_key = key
+    labels = df[label]
+    if isinstance(labels.dtype, pd.CategoricalDtype):
+        codes, uniques = labels.cat.codes.to_numpy(), labels.cat.categories.to_numpy()
+        rank = np.arange(uniques.size)
+    else:
+        codes, uniques = pd.factorize(labels)
+        uniques = np.asarray(uniques, dtype=object)
+        rank = np.empty(uniques.size, dtype=np.int64)
+        rank[np.argsort(uniques, kind="stable")] = np.arange(uniques.size)
+
+    periods = df[period_key]
+    valid = (codes >= 0) & periods.notna().to_numpy()
+    keep = None if valid.all() else valid
+
+    def column(values: np.ndarray, mask: Optional[np.ndarray] = None) -> pa.Array:
+        if keep is not None:
+            values, mask = values[keep], None if mask is None else mask[keep]
+        return pa.array(values, mask=mask)
+
+    columns = {
+        label: column(codes.astype(np.int32)),
+        period_key: column(periods.to_numpy(dtype="int32", na_value=0)),
+    }
+    for col, func in aggs.values():
+        if col in columns:
+            continue
+        if func == "count" and not pd.api.types.is_numeric_dtype(df[col]):
+            # Only the validity matters (e.g. usage_count over string
+            # user_ids) — don't convert every label to Arrow
+            columns[col] = column(np.zeros(len(df), dtype=np.int8), df[col].isna().to_numpy())
+        else:
+            values = df[col].to_numpy(dtype="float64", na_value=np.nan)
+            columns[col] = column(values, np.isnan(values))
+
+    # min_count=0: an all-null group sums to 0, like pandas
+    sum_options = pc.ScalarAggregateOptions(skip_nulls=True, min_count=0)
+    grouped = pa.table(columns).group_by(key, use_threads=True).aggregate([
+        (col, func, sum_options) if func == "sum" else (col, func) for col, func in aggs.values()
+    ])
+
+    group_codes = grouped[label].to_numpy()
+    group_periods = grouped[period_key].to_numpy()
+    order = np.lexsort((group_periods, rank[group_codes]))
+    partials = pd.DataFrame({
+        label: uniques[group_codes[order]],
+        period_key: group_periods[order],
+    })
+    for name, (col, func) in aggs.items():
+        partials[name] = grouped[f"{col}_{func}"].to_numpy()[order]
+    return partials
+
+
+def merge_partial_aggregates(
+    existing: pd.DataFrame,
+    new: pd.DataFrame,
+    period_key: str = DAY_KEY_COLUMN,
+) -> pd.DataFrame:
+    """
+    Fold the partials of a new batch into existing ones. Feature-periods
+    the batch doesn't touch are passed through unchanged; only the touched
+    ones are re-summed.
+    """
+    key = ["feature_name", period_key]
+    if existing is None or existing.empty:
+        return new.sort_values(key, ignore_index=True)
+
+    touched = pd.MultiIndex.from_frame(existing[key]).isin(pd.MultiIndex.from_frame(new[key]))
+    updated = _sum_partials(pd.concat([existing[touched], new], ignore_index=True), key)
+    merged = pd.concat([existing[~touched], updated], ignore_index=True)
+    return merged.sort_values(key, ignore_index=True)
+
+
+def rollup_partial_aggregates(
+    partials: pd.DataFrame,
+    coarser_keys: np.ndarray,
+    period_key: str,
+) -> pd.DataFrame:
+    """
+    Partials at a coarser grain, summed from finer-grain partials rather
+    than from events (e.g. days from hours).
+
+    Args:
+        partials: Finer-grain partials
+        coarser_keys: Coarser period key of each partials row
+        period_key: Name of the coarser key column in the result
+    """
+    rolled = partials[["feature_name"] + PARTIAL_VALUE_COLUMNS].assign(
+        **{period_key: np.asarray(coarser_keys, dtype="int32")}
+    )
+    return _sum_partials(rolled, ["feature_name", period_key])[["feature_name", period_key] + PARTIAL_VALUE_COLUMNS]
 
-    # Ensuring timestamp is datetime
-    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
 
-    # Creating daily grain column
-    df["date"] = df["timestamp"].dt.date.astype(str)
+def _sum_partials(partials: pd.DataFrame, key: List[str]) -> pd.DataFrame:
+    """
+    Internal: Partials summed per key. A sum of squares stays NaN if any of
+    its inputs is NaN (unknown — see daily_to_partial_aggregates()): a
+    skipped term would make the sum, and the std from it, silently wrong.
+    """
+    sumsq = [c for c in partials.columns if c.endswith("_sumsq")]
+    unknown = {f"{c}_unknown": partials[c].isna() for c in sumsq}
+    summed = partials.assign(**unknown).groupby(key, as_index=False, sort=True).sum(min_count=1)
+    for c in sumsq:
+        summed[c] = summed[c].mask(summed.pop(f"{c}_unknown") > 0)
+    return summed
 
-    aggregated = (
-        df.groupby(["feature_name", "date"], as_index=False)
-        .agg(
-            avg_latency=("latency_ms", "mean"),
-            crash_rate=("crash_flag", "mean"),
-            avg_feedback=("feedback_score", "mean"),
-            usage_count=("user_id", "count"),
-            avg_error_count=("error_count", "mean"),  # added for ML risk scoring
+
+def partial_metrics(partials: pd.DataFrame, with_std: bool = False) -> pd.DataFrame:
+    """
+    Means (sum / count — NaN where a metric is all-null) and usage_count of
+    partial aggregates, plus a sample standard deviation per metric
+    (latency_ms_std, ...) from the sums of squares when `with_std` is set.
+    """
+    metrics = pd.DataFrame(index=partials.index)
+    for mean_col, col in PARTIAL_METRICS.items():
+        count = partials[f"{col}_count"].where(partials[f"{col}_count"] > 0)
+        metrics[mean_col] = (partials[f"{col}_sum"] / count).astype("float64")
+    metrics["usage_count"] = partials["usage_count"].astype("int64")
+
+    if with_std:
+        for col in PARTIAL_METRICS.values():
+            n = partials[f"{col}_count"].where(partials[f"{col}_count"] > 1)
+            variance = (partials[f"{col}_sumsq"] - partials[f"{col}_sum"] ** 2 / n) / (n - 1)
+            metrics[f"{col}_std"] = variance.clip(lower=0) ** 0.5
+    return metrics
+
+
+def finalize_partial_aggregates(
+    partials: pd.DataFrame,
+    with_std: bool = False,
+    percentiles: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
+    """
+    aggregate_daily() output from partial aggregates: means are sum / count
+    (NaN for a feature-day where a metric is all-null).
+
+    Args:
+        partials: Output of partial_aggregates() / merge_partial_aggregates()
+        with_std: Also add the standard deviation columns of partial_metrics()
+        percentiles: Latency percentiles per feature-day (latency_percentiles()
+                     or a latency_digests() table) to add as latency_p50/95/99
+    """
+    metrics = partial_metrics(partials, with_std)
+    if percentiles is not None:
+        # Align on the key; feature-days without a percentile row get NaN
+        key = ["feature_name", DAY_KEY_COLUMN]
+        aligned = partials[key].assign(feature_name=partials["feature_name"].astype(str)).merge(
+            percentiles[key + list(LATENCY_PERCENTILES)].astype({"feature_name": str}),
+            on=key, how="left",
         )
+        aligned.index = partials.index
+        metrics = pd.concat([metrics, aligned[list(LATENCY_PERCENTILES)]], axis=1)
+
+    daily = pd.DataFrame({
+        "feature_name": partials["feature_name"].astype(str),
+        "date": render_day_keys(partials[DAY_KEY_COLUMN]),
+    })
+    daily = pd.concat([daily, metrics], axis=1)
+    extra = [c for c in metrics.columns if c not in DAILY_COLUMNS]
+    return daily[DAILY_COLUMNS + extra]
+
+
+def daily_to_partial_aggregates(daily: pd.DataFrame) -> pd.DataFrame:
+    """
+    Approximate partials from a finished aggregate_daily() output (e.g. one
+    saved before partials were kept): sum = mean × usage_count, count =
+    usage_count. Sums of squares are unknown (NaN), and stay NaN through
+    merges and rollups, so no std is reported for those feature-days.
+
+    The output keeps only means, so a metric's null count is lost: its
+    count is taken to be usage_count, which overstates it for a metric
+    that had nulls (its mean is right, but a later merge weights these
+    rows too heavily).
+    """
+    partials = pd.DataFrame({
+        "feature_name": daily["feature_name"].astype(str),
+        DAY_KEY_COLUMN: day_keys(pd.to_datetime(daily["date"].astype(str), format=TIMESTAMP_FORMAT)),
+        "usage_count": daily["usage_count"].astype("int64"),
+    })
+    for mean_col, col in PARTIAL_METRICS.items():
+        partials[f"{col}_sum"] = daily[mean_col] * daily["usage_count"]
+        partials[f"{col}_count"] = daily["usage_count"].where(daily[mean_col].notna(), 0)
+        partials[f"{col}_sumsq"] = float("nan")
+    return partials
+
+
+def merge_daily_aggregates(existing, new):
+    """
+    Combine two aggregate_daily() outputs (e.g. history + a new batch).
+
+    Feature-days present in both are merged with usage_count-weighted means,
+    so only the days touched by the new batch change. Prefer keeping
+    partial_aggregates() and merging those — they also stay exact when a
+    metric has nulls. Latency percentiles can't be recovered from finished
+    aggregates and are dropped (merge latency_digests() for those).
+    """
+    merged = merge_partial_aggregates(
+        daily_to_partial_aggregates(existing), daily_to_partial_aggregates(new)
     )
+    return finalize_partial_aggregates(merged)
+
+
+# ─────────────────────────────────────────────
+# LATENCY PERCENTILES
+#   A mean hides tail regressions, so every feature-day also gets its
+#   latency p50/p95/p99. Batch runs compute them exactly: one sort of
+#   (feature, day, latency), then numpy's linear interpolation at each
+#   group's rank positions — no per-group Python calls. Percentiles don't
+#   add up across batches, so incremental runs keep a t-digest per
+#   feature-day (see sketches.py) next to the partials, merge the digests
+#   of the feature-days a batch touches and re-read only their percentiles.
+# ─────────────────────────────────────────────
+
+# Output column -> latency quantile
+LATENCY_PERCENTILES = {"latency_p50": 0.50, "latency_p95": 0.95, "latency_p99": 0.99}
+
+
+def latency_percentiles(df: pd.DataFrame, period_key: str = DAY_KEY_COLUMN) -> pd.DataFrame:
+    """
+    Exact latency percentiles per feature and period (NaN where every
+    latency of a feature-period is null).
+
+    Returns:
+        DataFrame with feature_name, the period key and one column per
+        LATENCY_PERCENTILES entry, sorted by the key
+    """
+    keys, values, starts, sizes = _sorted_latency_groups(df, period_key)
+    for col, q in LATENCY_PERCENTILES.items():
+        keys[col] = _sorted_quantile(values, starts, sizes, q)
+    return keys
+
+
+def latency_digests(
+    df: pd.DataFrame,
+    period_key: str = DAY_KEY_COLUMN,
+    compression: int = DEFAULT_COMPRESSION,
+) -> pd.DataFrame:
+    """
+    Mergeable latency sketches of an event frame, one per feature and
+    period, alongside the frame's exact percentiles.
+
+    Returns:
+        DataFrame with feature_name, the period key, latency_digest (the
+        TDigest.to_dict() state — stored as a struct column in parquet) and
+        the LATENCY_PERCENTILES columns
+    """
+    keys, values, starts, sizes = _sorted_latency_groups(df, period_key)
+    keys["latency_digest"] = [
+        TDigest.from_values(values[start:start + size], compression).to_dict()
+        for start, size in zip(starts, sizes)
+    ]
+    for col, q in LATENCY_PERCENTILES.items():
+        keys[col] = _sorted_quantile(values, starts, sizes, q)
+    return keys
+
+
+def merge_latency_digests(
+    existing: Optional[pd.DataFrame],
+    new: pd.DataFrame,
+    period_key: str = DAY_KEY_COLUMN,
+) -> pd.DataFrame:
+    """
+    Fold a batch's latency_digests() into existing ones. Feature-periods
+    the batch doesn't touch keep their stored digests and percentiles;
+    touched ones get merged digests and percentiles estimated from them
+    (new feature-periods keep the batch's exact values).
+    """
+    key = ["feature_name", period_key]
+    if existing is None or existing.empty:
+        return new.sort_values(key, ignore_index=True)
+
+    existing = existing.astype({"feature_name": str})
+    new = new.astype({"feature_name": str})
+    touched = pd.MultiIndex.from_frame(existing[key]).isin(pd.MultiIndex.from_frame(new[key]))
+    stored = existing[touched].set_index(key)["latency_digest"]
+
+    merged = new.reset_index(drop=True)
+    columns = list(LATENCY_PERCENTILES)
+    digests = list(merged["latency_digest"])
+    overlap = pd.MultiIndex.from_frame(merged[key]).isin(stored.index)
+    for i in np.flatnonzero(overlap):
+        digest = TDigest.from_dict(stored.loc[tuple(merged.loc[i, key])])
+        digest.merge(TDigest.from_dict(digests[i]))
+        digests[i] = digest.to_dict()
+        merged.loc[i, columns] = digest.quantile(list(LATENCY_PERCENTILES.values()))
+    merged["latency_digest"] = digests
+
+    merged = pd.concat([existing[~touched], merged], ignore_index=True)
+    return merged.sort_values(key, ignore_index=True)
+
+
+def _sorted_latency_groups(
+    df: pd.DataFrame,
+    period_key: str,
+) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Internal: Non-null latencies sorted by (feature, period, latency).
+
+    Returns:
+        (keys, values, starts, sizes) — one keys row per feature-period,
+        whose latencies are values[start:start + size]
+    """
+    wanted = ["feature_name", "timestamp", DAY_KEY_COLUMN, period_key, "latency_ms"]
+    df = df[[c for c in dict.fromkeys(wanted) if c in df.columns]].copy(deep=False)
+    parse_timestamps(df)
+
+    grouped = df.groupby(["feature_name", period_key], observed=True, sort=True)
+    codes = grouped.ngroup().to_numpy()
+    keys = grouped.size().reset_index()[["feature_name", period_key]]
+    keys["feature_name"] = keys["feature_name"].astype(str)
+    keys[period_key] = keys[period_key].astype("int32")
+
+    latency = df["latency_ms"].to_numpy(dtype="float64", na_value=np.nan)
+    valid = ~np.isnan(latency) & (codes >= 0)
+    codes, latency = codes[valid], latency[valid]
+    order = np.lexsort((latency, codes))
+    sizes = np.bincount(codes, minlength=len(keys))
+    starts = np.cumsum(sizes) - sizes
+    return keys, latency[order], starts, sizes
+
 
-    return aggregated
\ No newline at end of file
+def _sorted_quantile(values: np.ndarray, starts: np.ndarray, sizes: np.ndarray, q: float) -> np.ndarray:
+    """Internal: np.quantile's linear interpolation for every sorted group at once."""
+    result = np.full(sizes.size, np.nan)
+    has = sizes > 0
+    position = (sizes[has] - 1) * q
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, sizes[has] - 1)
+    low_values = values[starts[has] + lower]
+    high_values = values[starts[has] + upper]
+    result[has] = low_values + (high_values - low_values) * (position - lower)
+    return result
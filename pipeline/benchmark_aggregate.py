@@ -0,0 +1,123 @@
+import argparse
+import logging
+import time
+from pathlib import Path
+from typing import List, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from pipeline.aggregate import AGGREGATION_BACKENDS, partial_aggregates
+from pipeline.dtypes import DTYPE_PROFILES, apply_dtype_profile, check_profile
+from pipeline.ingest import DAY_KEY_COLUMN
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────────
+# AGGREGATION BACKEND BENCHMARK
+#   Times partial_aggregates() — the group-by behind aggregate_daily() —
+#   with each backend on synthetic events of the pipeline's shape, and
+#   checks the backends agree:
+#       python -m pipeline.benchmark_aggregate --rows 1M,10M,50M
+#   Timestamps are generated already parsed (with a day key), so only the
+#   group-by itself is measured.
+# ─────────────────────────────────────────────
+
+DEFAULT_ROWS = (1_000_000, 10_000_000, 50_000_000)
+BENCHMARK_REPORT_PATH = Path("artifacts/reports/aggregate_backends.csv")
+
+FEATURES = [
+    "Search", "Payments", "Login", "VideoPlayback", "Recommendations", "Checkout",
+    "Notifications", "Profile", "Settings", "Messaging", "Upload", "Dashboard",
+]
+DAYS = 90
+
+
+def synthetic_events(rows: int, dtype_profile: str = "compact", seed: int = 42) -> pd.DataFrame:
+    """Event frame with the columns aggregate_daily() reads, ~5% null latencies."""
+    check_profile(dtype_profile)
+    rng = np.random.default_rng(seed)
+    seconds = rng.integers(0, DAYS * 86400, rows)
+    latency = rng.lognormal(5, 1, rows)
+    latency[rng.random(rows) < 0.05] = np.nan
+    # Arrow casts the ids to strings in C — no Python string per row
+    user_ids = pc.cast(pa.array(rng.integers(0, rows // 10 + 1, rows)), pa.string())
+
+    df = pd.DataFrame({
+        "feature_name": pd.Categorical.from_codes(rng.integers(0, len(FEATURES), rows), FEATURES),
+        "timestamp": np.datetime64("2025-01-01", "s") + seconds,
+        DAY_KEY_COLUMN: (np.datetime64("2025-01-01", "D").astype("int64") + seconds // 86400).astype("int32"),
+        "user_id": pd.Series(pd.arrays.ArrowStringArray(user_ids)),
+        "latency_ms": latency,
+        "crash_flag": (rng.random(rows) < 0.02).astype("int64"),
+        "feedback_score": rng.integers(1, 6, rows).astype("float64"),
+        "error_count": rng.poisson(0.3, rows),
+    })
+    if dtype_profile == "default":
+        df["feature_name"] = df["feature_name"].astype(object)
+        df["user_id"] = df["user_id"].astype(object)
+        return df
+    return apply_dtype_profile(df, dtype_profile)
+
+
+def benchmark_backends(
+    rows: Sequence[int] = DEFAULT_ROWS,
+    dtype_profile: str = "compact",
+    repeats: int = 3,
+) -> pd.DataFrame:
+    """
+    Best-of-`repeats` wall time of partial_aggregates() per backend and
+    input size, plus how the arrow output compares to pandas'.
+
+    Returns:
+        DataFrame with rows, backend, seconds, rows_per_second and, for
+        arrow rows, identical (all columns equal bit for bit) and
+        max_rel_diff (largest relative difference of any float column)
+    """
+    results: List[dict] = []
+    for n in rows:
+        df = synthetic_events(n, dtype_profile)
+        outputs = {}
+        for backend in AGGREGATION_BACKENDS:
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                outputs[backend] = partial_aggregates(df, backend=backend)
+                timings.append(time.perf_counter() - start)
+            best = min(timings)
+            results.append({
+                "rows": n, "backend": backend, "seconds": round(best, 3),
+                "rows_per_second": int(n / best),
+            })
+            logger.info(f"benchmark_aggregate | rows={n} | backend={backend} | seconds={best:.3f}")
+
+        expected, actual = outputs["pandas"], outputs["arrow"]
+        floats = expected.select_dtypes("float64").columns
+        rel_diff = ((actual[floats] - expected[floats]).abs() / expected[floats].abs().clip(lower=1e-300)).max().max()
+        results[-1]["identical"] = bool(expected.equals(actual))
+        results[-1]["max_rel_diff"] = float(rel_diff)
+        del df, outputs
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Benchmark aggregate_daily group-by backends")
+    parser.add_argument("--rows", default="1M,10M,50M",
+                        help="Comma-separated input sizes (K/M suffixes allowed)")
+    parser.add_argument("--dtype-profile", default="compact", choices=DTYPE_PROFILES)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    sizes = [
+        int(float(size[:-1]) * {"K": 1e3, "M": 1e6}[size[-1].upper()]) if size[-1] in "kKmM" else int(size)
+        for size in args.rows.split(",")
+    ]
+    report = benchmark_backends(sizes, args.dtype_profile, args.repeats)
+    BENCHMARK_REPORT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    report.to_csv(BENCHMARK_REPORT_PATH, index=False)
+    print(report.to_string(index=False))
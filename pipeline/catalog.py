@@ -0,0 +1,250 @@
+import argparse
+import json
+import logging
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────────
+# PARTITION CATALOG
+#   One small SQLite file per data layer (data/bronze/_catalog.sqlite, ...)
+#   that writers update with every Parquet file they publish: partition,
+#   row count, byte size, schema and per-column min/max.
+#   Readers, partition pruning and the dashboard query it instead of
+#   rglob()/stat()-ing every file. The leading underscore keeps it out of
+#   parquet dataset scans.
+# ─────────────────────────────────────────────
+
+CATALOG_FILE_NAME = "_catalog.sqlite"
+
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS files (
+    path        TEXT PRIMARY KEY,
+    partition   TEXT,
+    rows        INTEGER NOT NULL,
+    bytes       INTEGER NOT NULL,
+    written_at  TEXT NOT NULL,
+    stats       TEXT NOT NULL,
+    arrow_schema BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_files_partition ON files (partition);
+"""
+
+
+def register_files(base_path: Path, paths: Iterable[Path]) -> None:
+    """
+    Record (or refresh) files under a layer root. Only the Parquet footer
+    of each file is read — rows, size, schema and column min/max come
+    from metadata, not data.
+    """
+    base_path = Path(base_path)
+    rows = [_describe(base_path, Path(p)) for p in paths]
+    if not rows:
+        return
+    with closing(_connect(base_path)) as conn, conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+        )
+
+
+def unregister_files(base_path: Path, paths: Iterable[Path]) -> None:
+    """Drop catalog entries for files that were removed (e.g. by compaction)."""
+    base_path = Path(base_path)
+    keys = [(_key(base_path, Path(p)),) for p in paths]
+    with closing(_connect(base_path)) as conn, conn:
+        conn.executemany("DELETE FROM files WHERE path = ?", keys)
+
+
+def swap_files(base_path: Path, removed: Iterable[Path], added: Iterable[Path]) -> None:
+    """
+    Replace catalog entries in one transaction — e.g. a compaction's inputs
+    by its output — so readers see either the old files or the new ones,
+    never both and never neither. Call before deleting the removed files.
+    """
+    base_path = Path(base_path)
+    rows = [_describe(base_path, Path(p)) for p in added]
+    keys = [(_key(base_path, Path(p)),) for p in removed]
+    with closing(_connect(base_path)) as conn, conn:
+        conn.executemany("DELETE FROM files WHERE path = ?", keys)
+        conn.executemany(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+        )
+
+
+def list_files(
+    base_path: Path,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    filters: Optional[Dict[str, Any]] = None,
+) -> List[Path]:
+    """
+    Return the files of a layer, pruned by partition date range and by
+    per-file column min/max against {column: value | [values]} filters.
+
+    Args:
+        base_path: Layer root (e.g. data/bronze)
+        start: First partition date to include (inclusive)
+        end: Last partition date to include (inclusive)
+        filters: Equality / membership filters used for min/max pruning
+
+    Returns:
+        Paths (base_path / relative path) ordered by partition then name
+    """
+    base_path = Path(base_path)
+    query = "SELECT path, stats FROM files WHERE 1 = 1"
+    params: List[Any] = []
+    if start:
+        query += " AND partition >= ?"
+        params.append(start)
+    if end:
+        query += " AND partition <= ?"
+        params.append(end)
+    query += " ORDER BY partition, path"
+
+    with closing(_connect(base_path)) as conn:
+        rows = conn.execute(query, params).fetchall()
+
+    return [
+        base_path / path
+        for path, stats in rows
+        if not filters or _may_match(json.loads(stats), filters)
+    ]
+
+
+def file_schemas(base_path: Path, paths: Iterable[Path]) -> List[pa.Schema]:
+    """Physical schemas of the given files, read from the catalog (no file I/O)."""
+    base_path = Path(base_path)
+    keys = [_key(base_path, Path(p)) for p in paths]
+    schemas: Dict[str, pa.Schema] = {}
+    with closing(_connect(base_path)) as conn:
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for path, blob in conn.execute(
+                f"SELECT path, arrow_schema FROM files WHERE path IN ({placeholders})", chunk
+            ):
+                schemas[path] = pa.ipc.read_schema(pa.py_buffer(blob))
+    # Files the catalog doesn't know yet fall back to their footer
+    return [schemas[k] if k in schemas else pq.read_schema(base_path / k) for k in keys]
+
+
+def layer_summary(base_path: Path) -> Dict[str, Any]:
+    """File count, row count, byte size and last write time for a layer."""
+    base_path = Path(base_path)
+    if not base_path.exists():
+        return {"files": 0, "rows": 0, "bytes": 0, "last_written": None}
+
+    with closing(_connect(base_path)) as conn:
+        files, rows, size, last = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(rows), 0), COALESCE(SUM(bytes), 0), MAX(written_at) FROM files"
+        ).fetchone()
+    return {"files": files, "rows": rows, "bytes": size, "last_written": last}
+
+
+def rebuild(base_path: Path) -> int:
+    """
+    Re-scan a layer on disk and replace its catalog. Used once to bootstrap
+    layers written before the catalog existed, or after manual file edits.
+    """
+    base_path = Path(base_path)
+    files = [
+        f for f in base_path.rglob("*.parquet")
+        if not f.name.startswith(("_", "."))
+    ]
+    with closing(_connect(base_path, bootstrap=False)) as conn, conn:
+        conn.execute("DELETE FROM files")
+    register_files(base_path, files)
+    logger.info(f"catalog_rebuilt | layer={base_path} | files={len(files)}")
+    return len(files)
+
+
+def _connect(base_path: Path, bootstrap: bool = True) -> sqlite3.Connection:
+    """
+    Internal: Open (creating if needed) a layer's catalog. A layer that has
+    data but no catalog yet is bootstrapped from disk on first read.
+    """
+    base_path.mkdir(parents=True, exist_ok=True)
+    db_path = base_path / CATALOG_FILE_NAME
+    is_new = not db_path.exists()
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA_SQL)
+
+    if is_new and bootstrap:
+        conn.close()
+        rebuild(base_path)
+        conn = sqlite3.connect(db_path, timeout=30)
+    return conn
+
+
+def _key(base_path: Path, path: Path) -> str:
+    return path.resolve().relative_to(base_path.resolve()).as_posix()
+
+
+def _describe(base_path: Path, path: Path) -> tuple:
+    """Internal: One catalog row built from a file's Parquet footer."""
+    metadata = pq.read_metadata(path)
+    schema = metadata.schema.to_arrow_schema()
+
+    stats: Dict[str, List[Any]] = {}
+    for i, name in enumerate(schema.names):
+        lo = hi = None
+        for rg in range(metadata.num_row_groups):
+            col_stats = metadata.row_group(rg).column(i).statistics
+            if col_stats is None or not col_stats.has_min_max:
+                lo = hi = None
+                break
+            lo = col_stats.min if lo is None else min(lo, col_stats.min)
+            hi = col_stats.max if hi is None else max(hi, col_stats.max)
+        if lo is not None and isinstance(lo, (int, float, str)):
+            stats[name] = [lo, hi]
+
+    partition = next(
+        (part.split("=", 1)[1] for part in path.parts if part.startswith("date=")),
+        None,
+    )
+    return (
+        _key(base_path, path),
+        partition,
+        metadata.num_rows,
+        path.stat().st_size,
+        datetime.now(timezone.utc).isoformat(),
+        json.dumps(stats, default=str),
+        schema.serialize().to_pybytes(),
+    )
+
+
+def _may_match(stats: Dict[str, List[Any]], filters: Dict[str, Any]) -> bool:
+    """Internal: False only when min/max prove no row can satisfy the filters."""
+    for col, value in filters.items():
+        if col not in stats:
+            continue
+        lo, hi = stats[col]
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        try:
+            if not any(lo <= v <= hi for v in values):
+                return False
+        except TypeError:
+            continue  # incomparable types — can't prune on this column
+    return True
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Rebuild the Parquet partition catalogs")
+    parser.add_argument("layers", nargs="*", default=["data/bronze", "data/silver", "data/gold"])
+    args = parser.parse_args()
+
+    for layer in args.layers:
+        if Path(layer).exists():
+            print(f"{layer}: {rebuild(Path(layer))} files catalogued")
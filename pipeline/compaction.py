@@ -0,0 +1,218 @@
+import argparse
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from pipeline import catalog, incremental, ingest
+from pipeline.locks import release_lock, try_lock
+
+logger = logging.getLogger(__name__)
+
+# ── Compaction settings ───────────────────────────────────────
+# Rows per compacted output file (one file ≈ a handful of row groups)
+TARGET_ROWS_PER_FILE = 1_000_000
+ROW_GROUP_SIZE = 128_000
+
+# Files younger than this may still be being written by the consumer
+MIN_FILE_AGE_SECONDS = 60
+
+# Sort order inside each output file — keeps row-group min/max stats tight
+# for the feature_name filters pushed down by load_bronze_data()
+SORT_KEYS = [("feature_name", "ascending"), ("timestamp", "ascending")]
+
+LOCK_FILE_NAME = "_compaction.lock"
+# A lock whose compaction died (or has run longer than this) is taken over
+LOCK_MAX_AGE_SECONDS = 6 * 3600
+
+
+def compact_partition(
+    partition_path: Path,
+    target_rows: int = TARGET_ROWS_PER_FILE,
+    min_file_age_seconds: float = MIN_FILE_AGE_SECONDS,
+) -> Dict:
+    """
+    Rewrite the small Parquet files of one `date=` partition into a few
+    large, sorted, zstd-compressed files.
+
+    Safe alongside a running writer:
+    - Only a snapshot of files older than `min_file_age_seconds` is touched,
+      so files the consumer is still writing (or writes later) are left alone.
+    - Each output is written under a hidden temp name (ignored by readers),
+      fsynced, then renamed into place with os.replace(), so a reader never
+      sees a partially written file. The inputs it replaces are deleted
+      once the catalog, manifest and watermark point at the output.
+    - A `_compaction.lock` file stops two compactions racing on one partition.
+      A lock left by a compaction that died is stale and taken over (see
+      pipeline/locks.py).
+    - The pipeline lock (see pipeline/incremental.py) is held from reading
+      the watermark until the last group is remapped, so no run can read
+      files and commit them after they were merged away. The partition is
+      skipped while a pipeline run holds it.
+    - The catalog swaps each group's inputs for its output in one
+      transaction before any input is deleted, so catalog readers never
+      see the rows twice or list a deleted file.
+
+    Args:
+        partition_path: Path to a partition directory (e.g. data/bronze/date=2024-01-15)
+        target_rows: Approximate number of rows per output file
+        min_file_age_seconds: Skip files modified more recently than this
+
+    Returns:
+        Dict with before/after file counts, rows and bytes
+    """
+    partition_path = Path(partition_path)
+    summary = {
+        "partition": partition_path.name,
+        "files_before": 0,
+        "files_after": 0,
+        "rows": 0,
+        "bytes_before": 0,
+        "bytes_after": 0,
+        "skipped": None,
+    }
+
+    lock_path = partition_path / LOCK_FILE_NAME
+    if not try_lock(lock_path, max_age=LOCK_MAX_AGE_SECONDS):
+        logger.warning(f"compaction_skipped | {partition_path} is locked by another compaction")
+        summary["skipped"] = "locked"
+        return summary
+    pipeline_lock = incremental.pipeline_lock_path()
+    if not try_lock(pipeline_lock, max_age=incremental.PIPELINE_LOCK_MAX_AGE_SECONDS):
+        release_lock(lock_path)
+        logger.warning(f"compaction_skipped | {partition_path} | a pipeline run holds {pipeline_lock}")
+        summary["skipped"] = "pipeline_running"
+        return summary
+
+    try:
+        cutoff = time.time() - min_file_age_seconds
+        files = sorted(
+            f for f in partition_path.glob("*.parquet")
+            if f.stat().st_mtime <= cutoff
+        )
+        if len(files) < 2:
+            summary["skipped"] = "nothing_to_compact"
+            return summary
+
+        summary["files_before"] = len(files)
+        summary["bytes_before"] = sum(f.stat().st_size for f in files)
+
+        # Never merge files an incremental run already consumed with ones it
+        # has not — the output could then be neither skipped nor reprocessed.
+        watermark = incremental.load_watermark()["consumed"]
+        consumed = [f for f in files if ingest.bronze_key(f) in watermark]
+        pending = [f for f in files if ingest.bronze_key(f) not in watermark]
+        groups = [
+            (group, is_consumed)
+            for batch, is_consumed in ((consumed, True), (pending, False))
+            for group in _group_by_rows(batch, target_rows)
+        ]
+
+        for group, is_consumed in groups:
+            if len(group) == 1:
+                # Already full-sized (e.g. an earlier compaction's output)
+                summary["files_after"] += 1
+                summary["rows"] += pq.read_metadata(group[0]).num_rows
+                summary["bytes_after"] += group[0].stat().st_size
+                continue
+            output_path, rows = _rewrite_group(partition_path, group)
+            catalog.swap_files(partition_path.parent, group, [output_path])
+            ingest.remap_manifest_paths(group, output_path)
+            if is_consumed:
+                incremental.remap_watermark(group, output_path)
+            for f in group:
+                f.unlink()
+            summary["files_after"] += 1
+            summary["rows"] += rows
+            summary["bytes_after"] += output_path.stat().st_size
+    finally:
+        release_lock(pipeline_lock)
+        release_lock(lock_path)
+
+    logger.info(
+        f"compaction_complete | partition={partition_path.name} | "
+        f"files={summary['files_before']}→{summary['files_after']} | "
+        f"rows={summary['rows']} | "
+        f"MB={summary['bytes_before'] / 1e6:.2f}→{summary['bytes_after'] / 1e6:.2f}"
+    )
+    return summary
+
+
+def compact_bronze(
+    date: Optional[str] = None,
+    target_rows: int = TARGET_ROWS_PER_FILE,
+    min_file_age_seconds: float = MIN_FILE_AGE_SECONDS,
+) -> List[Dict]:
+    """
+    Compact one Bronze partition (if `date` is given) or every partition.
+
+    Returns:
+        List of per-partition summaries from compact_partition()
+    """
+    if date:
+        partitions = [ingest.BRONZE_PATH / f"date={date}"]
+    else:
+        partitions = sorted(p for p in ingest.BRONZE_PATH.glob("date=*") if p.is_dir())
+
+    return [
+        compact_partition(p, target_rows=target_rows, min_file_age_seconds=min_file_age_seconds)
+        for p in partitions
+        if p.exists()
+    ]
+
+
+def _group_by_rows(files: List[Path], target_rows: int) -> List[List[Path]]:
+    """Internal: Bin files into groups of ~target_rows using only Parquet footers."""
+    groups, current, current_rows = [], [], 0
+    for f in files:
+        rows = pq.read_metadata(f).num_rows
+        if current and current_rows + rows > target_rows:
+            groups.append(current)
+            current, current_rows = [], 0
+        current.append(f)
+        current_rows += rows
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _rewrite_group(partition_path: Path, files: List[Path]) -> Tuple[Path, int]:
+    """Internal: Merge, sort and atomically publish one compacted file."""
+    schema = ingest.unify_bronze_schemas(pq.read_schema(f) for f in files)
+    table = ds.dataset([str(f) for f in files], schema=schema, format="parquet").to_table()
+
+    sort_keys = [(col, order) for col, order in SORT_KEYS if col in table.column_names]
+    if sort_keys:
+        table = table.sort_by(sort_keys)
+
+    ts = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    token = uuid.uuid4().hex[:8]
+    tmp_path = partition_path / f".compacted_{ts}_{token}.parquet.tmp"
+    output_path = partition_path / f"compacted_{ts}_{token}.parquet"
+
+    pq.write_table(table, tmp_path, compression="zstd", row_group_size=ROW_GROUP_SIZE)
+    with open(tmp_path, "r+b") as fh:
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, output_path)
+
+    return output_path, table.num_rows
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Compact small Bronze Parquet files")
+    parser.add_argument("--date", help="Only compact this partition (YYYY-MM-DD)")
+    parser.add_argument("--target-rows", type=int, default=TARGET_ROWS_PER_FILE)
+    parser.add_argument("--min-age", type=float, default=MIN_FILE_AGE_SECONDS,
+                        help="Skip files modified in the last N seconds")
+    args = parser.parse_args()
+
+    for result in compact_bronze(args.date, args.target_rows, args.min_age):
+        print(result)
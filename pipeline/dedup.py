@@ -0,0 +1,480 @@
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from pipeline.ingest import DAY_KEY_COLUMN, parse_timestamps, render_day_keys
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────────
+# CROSS-BATCH DEDUPLICATION
+#   Events are identified by a 64-bit hash of their key columns
+#   (user_id, timestamp), computed vectorized by pandas — no Python
+#   tuples or object hash tables. The key includes the timestamp, so a
+#   duplicate always falls in the same event-date window as the original,
+#   and keys seen by earlier batches / runs are remembered per window:
+#     DedupIndex          — exact: one sorted uint64 array per window
+#                           (8 bytes/event), one file per window, loaded
+#                           only for the windows a batch touches
+#     RotatingBloomFilter — approximate: one fixed-size Bloom filter per
+#                           window; never misses a duplicate, but flags a
+#                           new event as seen with probability `error_rate`
+#                           (more once a window holds more than its
+#                           capacity), so a hit only means "maybe seen" —
+#                           drop_duplicates() confirms it against a
+#                           DedupIndex before dropping anything
+#   Both keep a bounded number of windows and persist under a
+#   leading-underscore path so parquet scans ignore them.
+# ─────────────────────────────────────────────
+
+DEDUP_KEY_COLUMNS = ("user_id", "timestamp")
+
+# Version of hash_keys() — stored with every saved index and filter; ones
+# saved under another version hold keys that no longer match and are
+# discarded on load. Bump it whenever hash_keys() output changes.
+# (1: pd.util.hash_pandas_object rows, 2: per-column hash_array, combined)
+HASH_VERSION = 2
+
+# Window of keys added without one, and of rows whose event timestamp is
+# missing or unparseable
+DEFAULT_WINDOW = "default"
+UNDATED_WINDOW = "undated"
+
+# Written next to a DedupIndex's window files
+VERSION_FILE = "_hash_version"
+
+Windows = Union[None, str, Sequence[str], np.ndarray]
+
+
+def hash_keys(df: pd.DataFrame, subset: Sequence[str] = DEDUP_KEY_COLUMNS) -> np.ndarray:
+    """
+    64-bit hash per row of the key columns. Values hash the same whatever
+    their pandas dtype (object, Arrow string, categorical).
+
+    Columns are hashed with categorize=False: the default factorizes
+    first, which is ~10x slower on near-unique keys like these.
+    """
+    if df.empty:
+        return np.empty(0, dtype=np.uint64)
+    combined = None
+    for col in subset:
+        values = df[col]
+        if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_any_dtype(values):
+            h = pd.util.hash_array(values.to_numpy(), categorize=False)
+        else:
+            h = pd.util.hash_array(values.to_numpy(dtype=object), categorize=False)
+        combined = h if combined is None else _combine_hashes(combined, h)
+    return combined
+
+
+def _combine_hashes(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Internal: Order-sensitive mix of two uint64 hash arrays (boost hash_combine)."""
+    with np.errstate(over="ignore"):
+        return left ^ (right + np.uint64(0x9E3779B97F4A7C15) + (left << np.uint64(6)) + (left >> np.uint64(2)))
+
+
+def event_windows(df: pd.DataFrame, timestamp_col: str = "timestamp") -> np.ndarray:
+    """
+    Dedup window per row: the event date (YYYY-MM-DD, UTC), read from the
+    day key when the frame is already parsed. Rows without a parseable
+    timestamp fall in UNDATED_WINDOW.
+    """
+    if DAY_KEY_COLUMN in df.columns:
+        keys = df[DAY_KEY_COLUMN]
+    elif timestamp_col in df.columns:
+        keys = parse_timestamps(df[[timestamp_col]].copy(), timestamp_col)[DAY_KEY_COLUMN]
+    else:
+        return np.full(len(df), UNDATED_WINDOW, dtype=object)
+    labels = render_day_keys(keys)
+    labels[pd.isna(labels)] = UNDATED_WINDOW
+    return labels
+
+
+def duplicate_mask(
+    keys: np.ndarray,
+    index: Optional[Union["DedupIndex", "RotatingBloomFilter"]] = None,
+    window: Windows = None,
+) -> np.ndarray:
+    """
+    True for rows whose key appeared earlier in the same batch, or — when
+    an index is given — in any batch the index has already seen.
+
+    `window` is the keys' dedup window: one label, or one per key (see
+    event_windows()). Without it every window of the index is checked.
+    """
+    keys = np.asarray(keys, dtype=np.uint64)
+    first = np.zeros(keys.size, dtype=bool)
+    first[np.unique(keys, return_index=True)[1]] = True
+    mask = ~first
+    if index is not None and keys.size:
+        mask |= index.contains(keys, window)
+    return mask
+
+
+def counted_mask(
+    keys: np.ndarray,
+    index: Optional["DedupIndex"] = None,
+    window: Windows = None,
+    sources: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    True for rows a pipeline run has already counted: their key is in
+    `index`, or — given `sources`, a source id per row (e.g. its Bronze
+    file, in landing order) — appeared in an earlier source of the batch.
+
+    Unlike duplicate_mask(), repeats within one source are kept: the key is
+    not unique within an export, and a full run counts every row of it.
+    """
+    keys = np.asarray(keys, dtype=np.uint64)
+    mask = np.zeros(keys.size, dtype=bool)
+    if not keys.size:
+        return mask
+    if index is not None:
+        mask |= index.contains(keys, window)
+    if sources is not None:
+        sources = np.asarray(sources)
+        mask |= sources != pd.Series(sources).groupby(keys).transform("min").to_numpy()
+    return mask
+
+
+def drop_duplicates(
+    df: pd.DataFrame,
+    index: Optional[Union["DedupIndex", "RotatingBloomFilter"]] = None,
+    subset: Sequence[str] = DEDUP_KEY_COLUMNS,
+    window: Windows = None,
+    confirm: Optional["DedupIndex"] = None,
+) -> Tuple[pd.DataFrame, int]:
+    """
+    Drop rows already seen (in this batch or by `index`) and record the
+    surviving keys in the index.
+
+    Args:
+        df: Batch of events
+        index: Keys seen by earlier batches
+        subset: Key columns
+        window: The rows' dedup window — one label, or one per row
+        confirm: Exact index a hit in `index` must be confirmed by before
+                 the row is dropped — pair a RotatingBloomFilter, whose
+                 hits can be false positives, with a DedupIndex. Only the
+                 windows with hits are read from it; surviving keys are
+                 recorded in both.
+
+    Returns:
+        (deduplicated frame, number of rows dropped)
+    """
+    keys = hash_keys(df, subset)
+    labels = _window_labels(window, keys.size)
+    mask = duplicate_mask(keys)
+    if index is not None and keys.size:
+        seen = index.contains(keys, labels)
+        if confirm is not None and seen.any():
+            hits = np.flatnonzero(seen)
+            seen[hits] = confirm.contains(keys[hits], None if labels is None else labels[hits])
+            false_positives = hits.size - int(seen.sum())
+            if false_positives:
+                logger.info(f"dedup | unconfirmed_hits={false_positives} | kept")
+        mask |= seen
+
+    kept = ~mask
+    kept_labels = None if labels is None else labels[kept]
+    for target in (index, confirm):
+        if target is not None:
+            target.add(keys[kept], window=kept_labels)
+    dropped = int(mask.sum())
+    if dropped:
+        logger.info(f"dedup | dropped={dropped} | kept={len(df) - dropped}")
+        df = df[kept]
+    return df, dropped
+
+
+class DedupIndex:
+    """
+    Exact set of 64-bit event keys, kept per window (event date) as sorted
+    NumPy arrays. Saved as a directory with one `<window>.npy` per window:
+    a window is only read when a lookup touches it, and added keys are
+    merged into their window lazily (at the next lookup or save), so a
+    batch costs O(the windows it touches), not O(history). save() drops
+    the oldest windows beyond `max_windows` — labels are YYYY-MM-DD, so
+    they sort chronologically.
+    """
+
+    def __init__(
+        self,
+        keys: Optional[np.ndarray] = None,
+        window: Windows = None,
+        path: Optional[Path] = None,
+        max_windows: Optional[int] = None,
+    ):
+        self.path = Path(path) if path is not None else None
+        self.max_windows = max_windows
+        self._loaded: Dict[str, np.ndarray] = {}
+        self._pending: Dict[str, List[np.ndarray]] = {}
+        self._dirty: set = set()
+        if keys is not None:
+            self.add(keys, window)
+
+    def __len__(self) -> int:
+        return sum(self._window(label).size for label in self.windows)
+
+    @property
+    def windows(self) -> List[str]:
+        saved = [p.stem for p in self.path.glob("*.npy")] if self.path is not None and self.path.is_dir() else []
+        return sorted(set(saved) | set(self._loaded) | set(self._pending))
+
+    def contains(self, keys: np.ndarray, window: Windows = None) -> np.ndarray:
+        """True per key already in its window (in any window, if none given)."""
+        keys = np.asarray(keys, dtype=np.uint64)
+        found = np.zeros(keys.size, dtype=bool)
+        if not keys.size:
+            return found
+        labels = _window_labels(window, keys.size)
+        if labels is None:
+            for label in self.windows:
+                found |= _isin_sorted(self._window(label), keys)
+            return found
+        for label in pd.unique(labels):
+            selected = labels == label
+            found[selected] = _isin_sorted(self._window(label), keys[selected])
+        return found
+
+    def add(self, keys: np.ndarray, window: Windows = None) -> None:
+        """Queue keys for their window (merged at the next lookup of it or save())."""
+        keys = np.asarray(keys, dtype=np.uint64)
+        labels = _window_labels(window, keys.size)
+        if labels is None:
+            self._pending.setdefault(DEFAULT_WINDOW, []).append(keys)
+            return
+        for label in pd.unique(labels):
+            self._pending.setdefault(label, []).append(keys[labels == label])
+
+    def clear(self) -> None:
+        """Forget every key, deleting the saved windows too."""
+        if self.path is not None:
+            for file in self.path.glob("*.npy"):
+                file.unlink()
+        self._loaded.clear()
+        self._pending.clear()
+        self._dirty.clear()
+
+    def save(self, path: Optional[Path] = None) -> None:
+        """Write the changed windows (every window, to a new path) and apply retention."""
+        path = Path(path) if path is not None else self.path
+        if path is None:
+            raise ValueError("DedupIndex.save: No path given and the index was not loaded from one")
+        changed = set(self.windows) if path != self.path else self._dirty | set(self._pending)
+        path.mkdir(parents=True, exist_ok=True)
+        for label in sorted(changed):
+            keys = self._window(label)
+            _atomic_save(path / f"{label}.npy", lambda fh: np.save(fh, keys))
+        (path / VERSION_FILE).write_text(str(HASH_VERSION))
+        self.path = path
+        self._dirty.clear()
+
+        if self.max_windows is not None:
+            for label in self.windows[:-self.max_windows or None]:
+                (path / f"{label}.npy").unlink(missing_ok=True)
+                self._loaded.pop(label, None)
+                logger.info(f"dedup_index | evicted window={label}")
+
+    @classmethod
+    def load(cls, path: Path, max_windows: Optional[int] = None) -> "DedupIndex":
+        """
+        Open a saved index (empty if it doesn't exist yet); windows load on
+        first use. An index saved under another HASH_VERSION is deleted.
+        """
+        path = Path(path)
+        # Single-file index from before per-window files — unversioned
+        legacy = path.with_name(f"{path.name}.npy")
+        if legacy.exists():
+            logger.warning(f"dedup_index | discarded {legacy} (unversioned single-file index)")
+            legacy.unlink()
+        version = _saved_hash_version(path / VERSION_FILE)
+        if version != HASH_VERSION and any(path.glob("*.npy")):
+            logger.warning(f"dedup_index | discarded {path} (hash version {version}, expected {HASH_VERSION})")
+            for file in path.glob("*.npy"):
+                file.unlink()
+        return cls(path=path, max_windows=max_windows)
+
+    def _window(self, label: str) -> np.ndarray:
+        """Internal: Sorted keys of one window — read on first use, pending keys merged in."""
+        keys = self._loaded.get(label)
+        if keys is None:
+            file = self.path / f"{label}.npy" if self.path is not None else None
+            keys = np.load(file) if file is not None and file.exists() else np.empty(0, dtype=np.uint64)
+        pending = self._pending.pop(label, None)
+        if pending:
+            keys = np.union1d(keys, np.concatenate(pending))
+            self._dirty.add(label)
+        if keys.size:
+            self._loaded[label] = keys
+        return keys
+
+
+class RotatingBloomFilter:
+    """
+    Bloom filters over 64-bit keys, one per time window. Memory is fixed
+    (≈ 1.44·log2(1/error_rate) bits per expected key per window) no matter
+    how many events flow through; adding to a new window beyond
+    `max_windows` evicts the oldest one.
+
+    A lookup given the keys' windows tests each key against its own window
+    only, so a new key is reported seen with probability ~error_rate;
+    without windows it is tested against all of them, ~len(windows) times
+    that. A window filled past `capacity_per_window` logs a warning: its
+    rate climbs quickly from there.
+    """
+
+    def __init__(
+        self,
+        capacity_per_window: int = 1_000_000,
+        error_rate: float = 0.001,
+        max_windows: int = 7,
+    ):
+        if not 0 < error_rate < 1:
+            raise ValueError(f"error_rate must be in (0, 1), got {error_rate}")
+        self.capacity_per_window = capacity_per_window
+        self.error_rate = error_rate
+        self.max_windows = max_windows
+        # Optimal bit count and hash count for the target false-positive rate
+        self.num_bits = int(np.ceil(-capacity_per_window * np.log(error_rate) / np.log(2) ** 2))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity_per_window * np.log(2))))
+        self._windows: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._counts: Dict[str, int] = {}
+
+    @property
+    def windows(self) -> list:
+        return list(self._windows)
+
+    def contains(self, keys: np.ndarray, window: Windows = None) -> np.ndarray:
+        """True per key maybe seen in its window (in any window, if none given)."""
+        keys = np.asarray(keys, dtype=np.uint64)
+        found = np.zeros(keys.size, dtype=bool)
+        if not self._windows or not keys.size:
+            return found
+        labels = _window_labels(window, keys.size)
+        if labels is None:
+            positions = self._positions(keys)
+            for bits in self._windows.values():
+                found |= _test_bits(bits, positions).all(axis=0)
+            return found
+        for label in pd.unique(labels):
+            bits = self._windows.get(label)
+            if bits is not None:
+                selected = labels == label
+                found[selected] = _test_bits(bits, self._positions(keys[selected])).all(axis=0)
+        return found
+
+    def add(self, keys: np.ndarray, window: Windows = None) -> None:
+        keys = np.asarray(keys, dtype=np.uint64)
+        labels = _window_labels(window, keys.size)
+        if labels is None:
+            self._add_window(keys, DEFAULT_WINDOW)
+            return
+        for label in pd.unique(labels):
+            self._add_window(keys[labels == label], label)
+
+    def save(self, path: Path) -> None:
+        config = np.array(
+            [self.capacity_per_window, self.max_windows, self.error_rate], dtype=np.float64
+        )
+        _atomic_save(path, lambda fh: np.savez_compressed(
+            fh, config=config, hash_version=np.array(HASH_VERSION),
+            names=np.array(self.windows, dtype=str),
+            counts=np.array([self._counts.get(w, 0) for w in self.windows], dtype=np.int64),
+            **{f"w{i}": bits for i, bits in enumerate(self._windows.values())},
+        ))
+
+    @classmethod
+    def load(cls, path: Path, **kwargs) -> "RotatingBloomFilter":
+        """
+        Load a saved filter, or create one from `kwargs` if none exists yet
+        (or the saved one is from another HASH_VERSION).
+        """
+        path = Path(path)
+        if not path.exists():
+            return cls(**kwargs)
+        with np.load(path) as data:
+            # Unversioned filters predate HASH_VERSION — treated as version 1
+            version = int(data["hash_version"]) if "hash_version" in data else 1
+            if version != HASH_VERSION:
+                logger.warning(f"dedup_bloom | discarded {path} (hash version {version}, expected {HASH_VERSION})")
+                return cls(**kwargs)
+            capacity, max_windows, error_rate = data["config"]
+            bloom = cls(int(capacity), float(error_rate), int(max_windows))
+            counts = data["counts"] if "counts" in data else np.zeros(len(data["names"]), dtype=np.int64)
+            for i, name in enumerate(data["names"]):
+                bloom._windows[str(name)] = data[f"w{i}"]
+                bloom._counts[str(name)] = int(counts[i])
+        return bloom
+
+    def _add_window(self, keys: np.ndarray, window: str) -> None:
+        """Internal: Set the bits of `keys` in one window, creating (and rotating) as needed."""
+        if window not in self._windows:
+            self._windows[window] = np.zeros((self.num_bits + 7) // 8, dtype=np.uint8)
+            while len(self._windows) > self.max_windows:
+                evicted, _ = self._windows.popitem(last=False)
+                self._counts.pop(evicted, None)
+                logger.info(f"dedup_bloom | evicted window={evicted}")
+        before = self._counts.get(window, 0)
+        self._counts[window] = before + keys.size
+        if before <= self.capacity_per_window < self._counts[window]:
+            logger.warning(
+                f"dedup_bloom | window={window} over capacity | "
+                f"keys={self._counts[window]} | capacity={self.capacity_per_window} — "
+                f"false-positive rate now above {self.error_rate}"
+            )
+        positions = self._positions(keys).ravel()
+        np.bitwise_or.at(self._windows[window], positions >> 3, (1 << (positions & 7)).astype(np.uint8))
+
+    def _positions(self, keys: np.ndarray) -> np.ndarray:
+        """Internal: (num_hashes, n) bit positions via double hashing of the key."""
+        h1 = keys
+        h2 = (keys >> np.uint64(32)) | np.uint64(1)
+        i = np.arange(self.num_hashes, dtype=np.uint64)[:, None]
+        return (h1 + i * h2) % np.uint64(self.num_bits)
+
+
+def _saved_hash_version(path: Path) -> Optional[int]:
+    """Internal: HASH_VERSION recorded next to a saved index (None if there is none)."""
+    return int(path.read_text()) if path.exists() else None
+
+
+def _window_labels(window: Windows, n: int) -> Optional[np.ndarray]:
+    """Internal: One window label per key (None when no window is given)."""
+    if window is None:
+        return None
+    if isinstance(window, str):
+        return np.full(n, window, dtype=object)
+    labels = np.asarray(window, dtype=object)
+    if labels.shape != (n,):
+        raise ValueError(f"Expected one window label per key ({n}), got shape {labels.shape}")
+    return labels
+
+
+def _isin_sorted(sorted_keys: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """Internal: Membership of `keys` in a sorted array, via binary search."""
+    if not sorted_keys.size:
+        return np.zeros(keys.size, dtype=bool)
+    pos = np.searchsorted(sorted_keys, keys)
+    pos[pos == sorted_keys.size] = 0
+    return sorted_keys[pos] == keys
+
+
+def _test_bits(bits: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    return (bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1 == 1
+
+
+def _atomic_save(path: Path, write) -> None:
+    """Internal: Write via a temp file + os.replace so readers never see a partial index."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as fh:
+        write(fh)
+    os.replace(tmp_path, path)
@@ -0,0 +1,193 @@
+import logging
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────────
+# DTYPE PROFILES
+#   "default" — what pandas infers (int64/float64, object strings)
+#   "compact" — categoricals for low-cardinality labels, int8 flags,
+#               float32 metrics and Arrow-backed strings for ids.
+#   Telemetry metrics don't need more than float32's ~7 significant digits;
+#   aggregates are still returned as float64. A column with values outside
+#   its compact integer type's range (e.g. a bad error_count of 40000) is
+#   left unnarrowed rather than failing the cast or wrapping around —
+#   validate_schema reports the out-of-range values.
+# ─────────────────────────────────────────────
+
+DTYPE_PROFILES = ("default", "compact")
+
+COMPACT_DTYPES: Dict[str, str] = {
+    # Raw columns (applied at ingest)
+    "user_id":               "string[pyarrow]",
+    "feature_name":          "category",
+    "session_duration":      "float32",
+    "latency_ms":            "float32",
+    "crash_flag":            "int8",
+    "error_count":           "int16",
+    "feedback_score":        "float32",
+    # Columns derived in transform.engineer_features
+    "date":                  "string[pyarrow]",
+    "hour_of_day":           "int8",
+    "day_of_week":           "int8",
+    "is_weekend":            "int8",
+    "is_business_hours":     "int8",
+    "quality_score":         "float32",
+    "latency_bucket":        "category",
+    "is_anomaly":            "int8",
+    "has_errors":            "int8",
+    "high_error":            "int8",
+    "session_quality_index": "float32",
+    "log_latency":           "float32",
+}
+
+_ARROW_TYPES = {
+    "string[pyarrow]": pa.string(),
+    "category":        pa.dictionary(pa.int32(), pa.string()),
+    "float32":         pa.float32(),
+    "int8":            pa.int8(),
+    "int16":           pa.int16(),
+}
+
+
+def check_profile(profile: str) -> None:
+    if profile not in DTYPE_PROFILES:
+        raise ValueError(f"Invalid dtype profile '{profile}'. Use one of {DTYPE_PROFILES}.")
+
+
+def apply_dtype_profile(df: pd.DataFrame, profile: str = "compact") -> pd.DataFrame:
+    """
+    Convert the known telemetry columns of `df` to the given profile
+    (in place on the frame's columns; the frame itself is returned).
+
+    Integer targets are skipped for columns containing nulls — downcasting
+    those would fail, so they keep their float dtype — and for columns with
+    values outside the target's range, which keep their dtype too.
+    """
+    check_profile(profile)
+    if profile == "default":
+        return _to_default(df)
+
+    for col, dtype in COMPACT_DTYPES.items():
+        if col not in df.columns or str(df[col].dtype) == dtype:
+            continue
+        if (
+            dtype.startswith("int")
+            and pd.api.types.is_numeric_dtype(df[col])
+            and not _fits(df[col].min(), df[col].max(), dtype, col)
+        ):
+            continue
+        if dtype.startswith("int") and df[col].isnull().any():
+            if pd.api.types.is_float_dtype(df[col]):
+                df[col] = df[col].astype("float32")
+            continue
+        if dtype == "category" and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("string[pyarrow]").astype("category")
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def arrow_to_pandas(table: pa.Table, profile: str = "default") -> pd.DataFrame:
+    """
+    Convert an Arrow table to pandas under a dtype profile. For "compact"
+    the casts happen in Arrow first, so no intermediate object-string or
+    int64/float64 columns are ever materialised.
+    """
+    check_profile(profile)
+    if profile == "default":
+        return table.to_pandas()
+
+    for i, field in enumerate(table.schema):
+        target = _ARROW_TYPES.get(COMPACT_DTYPES.get(field.name, ""))
+        if target is None or field.type == target:
+            continue
+        if pa.types.is_string(field.type) and not pa.types.is_dictionary(target):
+            # A numeric column a lenient read kept as strings — validate_schema coerces it
+            continue
+        column = table.column(i)
+        if pa.types.is_integer(target):
+            bounds = pc.min_max(column).as_py()
+            if not _fits(bounds["min"], bounds["max"], str(target), field.name):
+                continue
+        if pa.types.is_integer(target) and column.null_count:
+            target = pa.float32()
+        if pa.types.is_dictionary(target):
+            column = column.cast(pa.string()).dictionary_encode()
+        else:
+            column = column.cast(target)
+        table = table.set_column(i, field.name, column)
+
+    return table.to_pandas(
+        types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get
+    )
+
+
+def memory_report(df: pd.DataFrame, sample_rows: int = 100_000) -> pd.DataFrame:
+    """
+    Per-column bytes/row of `df` in the default vs compact profile, measured
+    on a sample (deep memory usage, so object strings are counted fully).
+
+    Returns:
+        DataFrame with column, default_bytes_per_row, compact_bytes_per_row,
+        saved_pct — plus a TOTAL row
+    """
+    sample = df.head(sample_rows)
+    n = max(len(sample), 1)
+    default = _to_default(sample.copy()).memory_usage(index=False, deep=True) / n
+    compact = apply_dtype_profile(sample.copy(), "compact").memory_usage(index=False, deep=True) / n
+
+    report = pd.DataFrame({
+        "column": default.index,
+        "default_bytes_per_row": default.to_numpy().round(2),
+        "compact_bytes_per_row": compact.reindex(default.index).to_numpy().round(2),
+    })
+    total = pd.DataFrame([{
+        "column": "TOTAL",
+        "default_bytes_per_row": round(float(default.sum()), 2),
+        "compact_bytes_per_row": round(float(compact.sum()), 2),
+    }])
+    report = pd.concat([report, total], ignore_index=True)
+    report["saved_pct"] = (
+        (1 - report["compact_bytes_per_row"] / report["default_bytes_per_row"]) * 100
+    ).round(1)
+
+    logger.info(
+        f"memory_report | bytes/row default={total['default_bytes_per_row'][0]} | "
+        f"compact={total['compact_bytes_per_row'][0]} | "
+        f"saved={report['saved_pct'].iloc[-1]}%"
+    )
+    return report
+
+
+def _fits(low, high, dtype: str, column: str) -> bool:
+    """Internal: True if [low, high] fits integer `dtype` (an all-null column fits); warns if not."""
+    if low is None or pd.isna(low):
+        return True
+    info = np.iinfo(dtype)
+    if info.min <= low and high <= info.max:
+        return True
+    logger.warning(
+        f"dtype_not_narrowed | column={column} | range=[{low}, {high}] | "
+        f"outside {dtype} — keeping the wider type"
+    )
+    return False
+
+
+def _to_default(df: pd.DataFrame) -> pd.DataFrame:
+    """Internal: Undo compact dtypes (object strings, int64, float64)."""
+    for col in df.columns:
+        dtype = df[col].dtype
+        if isinstance(dtype, (pd.CategoricalDtype, pd.StringDtype)):
+            df[col] = df[col].astype(object)
+        elif pd.api.types.is_float_dtype(dtype) and dtype != np.float64:
+            df[col] = df[col].astype("float64")
+        elif pd.api.types.is_integer_dtype(dtype) and dtype != np.int64:
+            df[col] = df[col].astype("int64")
+    return df
@@ -0,0 +1,231 @@
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+from pipeline import catalog
+from pipeline.aggregate import (
+    AGGREGATE_INPUT_COLUMNS, PARTIAL_VALUE_COLUMNS, merge_partial_aggregates, partial_aggregates,
+    partial_metrics, rollup_partial_aggregates,
+)
+from pipeline.ingest import BRONZE_PARTITIONING, DAY_KEY_COLUMN, GOLD_PATH, parse_timestamps, render_day_keys
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────────
+# GOLD LAYER
+#   Feature rollups at three grains, each stored as partial aggregates
+#   (sums, counts, sums of squares — see aggregate.py) next to the
+#   finalized metrics, so dashboards read small pre-aggregated tables and
+#   later batches can still be merged in:
+#       data/gold/grain=hour/date=<day>/rollup.parquet
+#       data/gold/grain=day/date=<week start>/rollup.parquet
+#       data/gold/grain=week/date=<month start>/rollup.parquet
+#   Only the hourly rollup is computed from events. Each table is
+#   partitioned by the next coarser period, so one partition holds every
+#   child of a parent period: days are rolled up from whole hourly
+#   partitions, weeks from whole daily ones, and a batch rewrites only the
+#   partitions it touches.
+# ─────────────────────────────────────────────
+
+GOLD_GRAINS = ("hour", "day", "week")
+
+# Integer period key column per grain: hours / days since the epoch, and
+# for weeks the day key of the week's Monday
+GRAIN_KEYS = {"hour": "hour_key", "day": DAY_KEY_COLUMN, "week": "week_key"}
+
+GOLD_FILE_NAME = "rollup.parquet"
+
+
+def hour_keys(timestamps: pd.Series) -> np.ndarray:
+    """Hours since 1970-01-01 per (parsed, non-null) timestamp."""
+    return timestamps.to_numpy().astype("datetime64[h]").astype("int64").astype("int32")
+
+
+def week_keys(day_keys: np.ndarray) -> np.ndarray:
+    """Day key of the Monday starting each day's ISO week (1970-01-01 was a Thursday)."""
+    day_keys = np.asarray(day_keys, dtype="int64")
+    return (day_keys - (day_keys + 3) % 7).astype("int32")
+
+
+def month_keys(day_keys: np.ndarray) -> np.ndarray:
+    """Day key of the first day of each day's month."""
+    days = np.asarray(day_keys, dtype="int64").astype("datetime64[D]")
+    return days.astype("datetime64[M]").astype("datetime64[D]").astype("int64").astype("int32")
+
+
+def period_start(grain: str, keys: np.ndarray) -> np.ndarray:
+    """Start timestamp of each period key of a grain."""
+    unit = "h" if grain == "hour" else "D"
+    return np.asarray(keys, dtype="int64").astype(f"datetime64[{unit}]").astype("datetime64[s]")
+
+
+def materialize_gold(
+    df: pd.DataFrame,
+    base_path: Path = GOLD_PATH,
+    merge: bool = False,
+) -> Dict[str, List[Path]]:
+    """
+    Write the hourly, daily and weekly rollups of an event frame to the
+    Gold layer, touching only the partitions its events fall in.
+
+    Args:
+        df: Event frame (parsed timestamps, as from ingest/transform)
+        base_path: Gold layer root
+        merge: Add the frame's hourly partials to what the touched hourly
+               partitions already hold (incremental batches). By default
+               the frame replaces them (a full recompute of those days).
+
+    Returns:
+        {grain: paths written}
+    """
+    events = parse_timestamps(
+        df[[c for c in AGGREGATE_INPUT_COLUMNS if c in df.columns]].copy(deep=False)
+    )
+    events = events[events["timestamp"].notna()]
+    if events.empty:
+        logger.warning("gold_skipped: no events with a timestamp")
+        return {grain: [] for grain in GOLD_GRAINS}
+
+    events = events.assign(hour_key=hour_keys(events["timestamp"]))
+    new = partial_aggregates(events, period_key=GRAIN_KEYS["hour"])
+
+    written: Dict[str, List[Path]] = {}
+    for grain in GOLD_GRAINS:
+        key = GRAIN_KEYS[grain]
+        partitions = np.unique(_partition_keys(grain, new[key]))
+        existing = load_gold(grain, partitions=partitions, base_path=base_path, partials_only=True)
+        if grain == "hour":
+            table = merge_partial_aggregates(existing, new, period_key=key) if merge else new
+        else:
+            # Coarser rows were rolled up from whole child partitions, so
+            # they are complete: replace the periods they cover
+            table = _replace_periods(existing, new, key)
+        written[grain] = _write_partitions(table, grain, partitions, base_path)
+
+        if grain != GOLD_GRAINS[-1]:
+            coarser = GOLD_GRAINS[GOLD_GRAINS.index(grain) + 1]
+            new = rollup_partial_aggregates(
+                table, _coarser_keys(grain, table[key]), GRAIN_KEYS[coarser]
+            )
+
+    catalog.register_files(base_path, [p for paths in written.values() for p in paths])
+    logger.info(
+        "gold_materialized | "
+        + " | ".join(f"{grain}={len(paths)} partitions" for grain, paths in written.items())
+    )
+    return written
+
+
+def load_gold(
+    grain: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    partitions: Optional[np.ndarray] = None,
+    base_path: Path = GOLD_PATH,
+    columns: Optional[List[str]] = None,
+    partials_only: bool = False,
+) -> pd.DataFrame:
+    """
+    Read one Gold rollup, optionally pruned to a range of partition dates
+    (YYYY-MM-DD, inclusive) or to explicit partition day keys.
+
+    Args:
+        grain: "hour", "day" or "week"
+        start: First partition date to include
+        end: Last partition date to include
+        partitions: Partition day keys to read (see _partition_keys)
+        base_path: Gold layer root
+        columns: Columns to read (default: all)
+        partials_only: Read just the key and partial-aggregate columns
+
+    Returns:
+        DataFrame with feature_name, the grain's key, period_start, the
+        finalized metrics and the partial-aggregate columns; empty if
+        nothing has been materialized yet
+    """
+    if grain not in GRAIN_KEYS:
+        raise ValueError(f"Unknown gold grain '{grain}'. Use one of {GOLD_GRAINS}.")
+    root = Path(base_path) / f"grain={grain}"
+    if not root.exists():
+        return pd.DataFrame()
+
+    dataset = ds.dataset(root, format="parquet", partitioning=BRONZE_PARTITIONING)
+    expression = None
+    if partitions is not None:
+        expression = ds.field("date").isin(list(render_day_keys(np.asarray(partitions))))
+    for bound, op in ((start, "__ge__"), (end, "__le__")):
+        if bound:
+            condition = getattr(ds.field("date"), op)(bound)
+            expression = condition if expression is None else expression & condition
+
+    if partials_only:
+        columns = ["feature_name", GRAIN_KEYS[grain]] + PARTIAL_VALUE_COLUMNS
+    elif columns is None:
+        columns = [name for name in dataset.schema.names if name != "date"]
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+
+def _replace_periods(existing: pd.DataFrame, new: pd.DataFrame, key: str) -> pd.DataFrame:
+    """Internal: `existing` rows of periods not covered by `new`, plus all of `new`."""
+    if existing.empty:
+        return new
+    keep = existing[~existing[key].isin(new[key].unique())]
+    return pd.concat([keep, new], ignore_index=True).sort_values(["feature_name", key], ignore_index=True)
+
+
+def _coarser_keys(grain: str, keys: pd.Series) -> np.ndarray:
+    """Internal: Key of the next coarser period (hour → day, day → week)."""
+    keys = keys.to_numpy(dtype="int64")
+    if grain == "hour":
+        return (keys // 24).astype("int32")
+    return week_keys(keys)
+
+
+def _partition_keys(grain: str, keys: pd.Series) -> np.ndarray:
+    """Internal: Day key of each row's partition — the start of its next coarser period."""
+    keys = keys.to_numpy(dtype="int64")
+    if grain == "hour":
+        return (keys // 24).astype("int32")
+    if grain == "day":
+        return week_keys(keys)
+    return month_keys(keys)
+
+
+def _write_partitions(
+    table: pd.DataFrame,
+    grain: str,
+    partitions: np.ndarray,
+    base_path: Path,
+) -> List[Path]:
+    """
+    Internal: Rewrite the given partitions of a grain from `table` (partials
+    plus finalized metrics). Each file is replaced atomically.
+    """
+    key = GRAIN_KEYS[grain]
+    out = pd.concat(
+        [
+            table[["feature_name", key]],
+            pd.DataFrame({"period_start": period_start(grain, table[key])}, index=table.index),
+            partial_metrics(table, with_std=True).drop(columns="usage_count"),
+            table[PARTIAL_VALUE_COLUMNS],
+        ],
+        axis=1,
+    )
+    row_partitions = _partition_keys(grain, table[key])
+
+    paths = []
+    for part_key, label in zip(partitions, render_day_keys(np.asarray(partitions))):
+        partition_path = Path(base_path) / f"grain={grain}" / f"date={label}"
+        partition_path.mkdir(parents=True, exist_ok=True)
+        output_path = partition_path / GOLD_FILE_NAME
+        tmp_path = partition_path / f"_{GOLD_FILE_NAME}.{os.getpid()}.tmp"
+        out[row_partitions == part_key].to_parquet(tmp_path, index=False, engine="pyarrow")
+        os.replace(tmp_path, output_path)
+        paths.append(output_path)
+    return paths
@@ -0,0 +1,115 @@
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, List
+
+from pipeline import ingest
+from pipeline.locks import LOCK_TIMEOUT_SECONDS, locked
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────────
+# BRONZE WATERMARK
+#   Records which Bronze files a successful run has already consumed,
+#   so the next incremental run only reads files that landed since.
+#   Stored next to the data it describes: data/bronze/_watermark.json
+#   (leading underscore keeps it out of parquet dataset scans). Pipeline
+#   runs and compaction both update it, so every read-modify-write holds
+#   data/bronze/_watermark.lock.
+#   A pipeline run also holds the pipeline lock (data/bronze/_pipeline.lock)
+#   from choosing its Bronze files until it has committed them, and
+#   compaction holds it while it merges files — otherwise files a run has
+#   read could be merged before it commits them, leaving the merged output
+#   pending and its rows to be processed a second time.
+# ─────────────────────────────────────────────
+
+# A pipeline lock older than this is presumed abandoned (see pipeline/locks.py)
+PIPELINE_LOCK_MAX_AGE_SECONDS = 6 * 3600
+
+
+def load_watermark() -> dict:
+    """Load the Bronze watermark (empty if no run has committed yet)."""
+    path = _watermark_path()
+    if not path.exists():
+        return {"consumed": {}, "last_run": None}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def pending_bronze_files() -> List[Path]:
+    """Return Bronze files that no committed run has consumed yet."""
+    consumed = load_watermark()["consumed"]
+    pending = [f for f in ingest.list_bronze_files() if ingest.bronze_key(f) not in consumed]
+    logger.info(f"incremental | pending_bronze_files={len(pending)} | consumed={len(consumed)}")
+    return pending
+
+
+def commit_watermark(files: Iterable[Path], reset: bool = False) -> None:
+    """
+    Mark files as consumed. Call only after the run's outputs are written,
+    so a failed run leaves its inputs pending for the next attempt.
+
+    With reset=True every other file is marked pending again — for a full
+    run, whose outputs replace everything earlier runs committed.
+    """
+    with _watermark_lock():
+        watermark = load_watermark()
+        if reset:
+            watermark["consumed"] = {}
+        run_at = datetime.now(timezone.utc).isoformat()
+        count = 0
+        for f in files:
+            watermark["consumed"][ingest.bronze_key(f)] = run_at
+            count += 1
+        watermark["last_run"] = run_at
+        _save_watermark(watermark)
+    logger.info(f"incremental | watermark committed | files={count} | reset={reset}")
+
+
+def remap_watermark(replaced: Iterable[Path], output_path: Path) -> None:
+    """
+    Replace consumed entries for compacted inputs with their output file.
+    Only valid when every replaced file was consumed (compaction never
+    mixes consumed and pending files in one output).
+    """
+    with _watermark_lock():
+        watermark = load_watermark()
+        consumed = watermark["consumed"]
+        run_at = None
+        for f in replaced:
+            run_at = consumed.pop(ingest.bronze_key(f), run_at)
+        if run_at is not None:
+            consumed[ingest.bronze_key(output_path)] = run_at
+            _save_watermark(watermark)
+
+
+def pipeline_lock_path() -> Path:
+    """Path of the pipeline lock (take it with pipeline_lock() or locks.try_lock())."""
+    return ingest.BRONZE_PATH / "_pipeline.lock"
+
+
+def pipeline_lock(timeout: float = LOCK_TIMEOUT_SECONDS):
+    """Hold the pipeline lock for a block, waiting up to `timeout` seconds for it."""
+    return locked(pipeline_lock_path(), timeout=timeout, max_age=PIPELINE_LOCK_MAX_AGE_SECONDS)
+
+
+def _watermark_path() -> Path:
+    return ingest.BRONZE_PATH / "_watermark.json"
+
+
+def _watermark_lock():
+    """Internal: Lock held around every read-modify-write of the watermark."""
+    return locked(ingest.BRONZE_PATH / "_watermark.lock")
+
+
+def _save_watermark(watermark: dict) -> None:
+    """Internal: Write the watermark atomically (temp file + os.replace)."""
+    path = _watermark_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(watermark, f, indent=2)
+    os.replace(tmp_path, path)
@@ -1,11 +1,23 @@
+import hashlib
+import json
 import logging
+import os
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.dataset as ds
 import structlog
 
+from pipeline import catalog
+from pipeline.dtypes import arrow_to_pandas
+from pipeline.locks import locked
+from pipeline.validate import RAW_COLUMN_TYPES
+
 structlog.configure(
     processors=[
         structlog.processors.TimeStamper(fmt="iso"),
@@ -20,113 +32,685 @@ BRONZE_PATH = Path("data/bronze")
 SILVER_PATH = Path("data/silver")
 GOLD_PATH = Path("data/gold")
 
+# Explicit schema for the required raw columns — no dtype inference on
+# multi-GB exports, and every batch comes out with the same types.
+RAW_ARROW_SCHEMA = pa.schema(
+    [(name, pa.type_for_alias(alias)) for name, alias in RAW_COLUMN_TYPES.items()]
+)
+
+# Fallback for exports with malformed numeric cells ("abc" in latency_ms,
+# "1.0" in crash_flag): the numeric columns are read as strings, so
+# validate_schema can coerce them and report the bad values
+LENIENT_RAW_ARROW_SCHEMA = pa.schema([
+    (field.name, pa.string() if pa.types.is_integer(field.type) or pa.types.is_floating(field.type) else field.type)
+    for field in RAW_ARROW_SCHEMA
+])
+
+# Bronze/Silver partitions are hive-style directories: date=YYYY-MM-DD
+BRONZE_PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+# Files read concurrently by load_bronze_data() (bounded for shared storage)
+BRONZE_READ_CONCURRENCY = 4
+
+# Column added by load_bronze_data(with_file_index=True): the position of
+# each row's file in the `files` list
+BRONZE_FILE_INDEX_COLUMN = "_bronze_file"
+
+# Bytes of CSV decoded per record batch (bounds peak memory while streaming)
+DEFAULT_BLOCK_SIZE = 64 << 20
+
+# Event timestamps are parsed once per run, at load time, with this explicit
+# format (ISO 8601 with or without time/offset) — no per-value inference
+TIMESTAMP_FORMAT = "ISO8601"
+
+# Integer event date (days since 1970-01-01, UTC) added next to the parsed
+# timestamp; grouping and partitioning use it, strings are rendered on output
+DAY_KEY_COLUMN = "day_key"
+
+# Boolean metadata column parse_timestamps() adds when some timestamps were
+# present but unparseable — NaT alone can't tell those from missing ones
+UNPARSEABLE_TIMESTAMP_COLUMN = "_timestamp_unparseable"
+
+
+def iter_raw_batches(
+    path: str,
+    schema: Optional[pa.Schema] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Stream raw telemetry from CSV as Arrow record batches.
+
+    Only one block of the file is decoded at a time, so memory stays
+    proportional to `block_size` rather than to the size of the export.
+
+    Args:
+        path: Path to the CSV file (e.g., "data/raw/product_logs.csv")
+        schema: Arrow types for known columns (defaults to RAW_ARROW_SCHEMA).
+                Columns not in the schema are inferred from the first block.
+        block_size: Approximate number of CSV bytes per yielded batch
+
+    Yields:
+        pyarrow.RecordBatch objects with a consistent schema
+
+    Raises:
+        pyarrow.ArrowInvalid on a cell that doesn't parse as its column's
+        type — read with LENIENT_RAW_ARROW_SCHEMA to get such columns as strings
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Data file not found: {path}")
+
+    schema = schema if schema is not None else RAW_ARROW_SCHEMA
+    reader = pv.open_csv(
+        path,
+        read_options=pv.ReadOptions(block_size=block_size),
+        convert_options=pv.ConvertOptions(
+            column_types={field.name: field.type for field in schema}
+        ),
+    )
+
+    batches = 0
+    rows = 0
+    for batch in reader:
+        batches += 1
+        rows += batch.num_rows
+        yield batch
 
-def load_raw_data(path: str) -> pd.DataFrame:
+    logger.info("raw_data_streamed",
+                source=str(path),
+                batches=batches,
+                rows=rows)
+
+
+def load_raw_data(path: str, dtype_profile: str = "default") -> pd.DataFrame:
     """
     Load raw telemetry data from CSV (existing format).
 
+    Thin wrapper around iter_raw_batches() for callers that want the
+    whole file as one DataFrame.
+
     Args:
         path: Path to your CSV file (e.g., "data/raw/product_logs.csv")
+        dtype_profile: "default" or "compact" (see pipeline/dtypes.py).
+                       Bronze always receives the raw, uncompacted types.
     
     Returns:
         DataFrame with raw telemetry data
     """
     path = Path(path)
-    if not path.exists():
-        raise FileNotFoundError(f"Data file not found: {path}")
-
-    df = pd.read_csv(path)
+    table = _read_raw_table(path)
+    df = arrow_to_pandas(table, dtype_profile)
 
     logger.info("raw_data_loaded",
                 source=str(path),
                 rows=len(df),
                 columns=list(df.columns))
 
-    # Auto-save to Bronze layer every time we load
-    _save_to_bronze(df, source=str(path))
+    # Auto-save to Bronze layer — unless an identical copy is already there.
+    # Bronze keeps the raw timestamp strings; they're parsed afterwards.
+    _save_to_bronze_once(
+        path, lambda: df if dtype_profile == "default" and _has_raw_types(table) else _raw_bronze_frame(table)
+    )
+
+    return parse_timestamps(df)
+
+
+def bronze_copies(path: str) -> List[Path]:
+    """Bronze files holding the content last landed from a raw source (empty if none was)."""
+    manifest = _load_manifest()
+    source = manifest["sources"].get(str(Path(path).resolve()))
+    entry = manifest["content"].get(source["sha256"]) if source else None
+    return [BRONZE_PATH / p for p in entry["bronze_paths"]] if entry else []
+
+
+def ingest_raw_to_bronze(path: str) -> bool:
+    """
+    Land a raw CSV in the Bronze layer without returning it.
+
+    The CSV is only read when its fingerprint is new, so re-running on an
+    unchanged export costs a stat() (or one hash) instead of a full parse.
 
+    Returns:
+        True if a new Bronze file was written, False if it was a duplicate
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Data file not found: {path}")
+    return _save_to_bronze_once(path, lambda: _raw_bronze_frame(_read_raw_table(path)))
+
+
+def _read_raw_table(path: Path) -> pa.Table:
+    """
+    Internal: The whole raw CSV as one table. If a numeric cell is malformed
+    the file is read again with LENIENT_RAW_ARROW_SCHEMA instead of failing.
+    """
+    schema = RAW_ARROW_SCHEMA
+    try:
+        batches = list(iter_raw_batches(path))
+    except pa.ArrowInvalid as e:
+        logger.warning("raw_data_lenient_read",
+                       source=str(path),
+                       reason=str(e))
+        schema = LENIENT_RAW_ARROW_SCHEMA
+        batches = list(iter_raw_batches(path, schema=schema))
+    return pa.Table.from_batches(batches) if batches else schema.empty_table()
+
+
+def _has_raw_types(table: pa.Table) -> bool:
+    """Internal: True unless a lenient read left raw numeric columns as strings."""
+    return all(
+        table.schema.field(field.name).type == field.type
+        for field in RAW_ARROW_SCHEMA if field.name in table.schema.names
+    )
+
+
+def _raw_bronze_frame(table: pa.Table) -> pd.DataFrame:
+    """
+    Internal: A raw table as Bronze stores it, in RAW_COLUMN_TYPES — numeric
+    columns a lenient read kept as strings are coerced, malformed cells
+    (and non-whole values in integer columns) becoming null.
+    """
+    df = table.to_pandas()
+    if _has_raw_types(table):
+        return df
+    for name, alias in RAW_COLUMN_TYPES.items():
+        if alias in ("int64", "float64") and name in df.columns and not pd.api.types.is_numeric_dtype(df[name]):
+            values = pd.to_numeric(df[name], errors="coerce")
+            df[name] = values.where(values % 1 == 0).astype("Int64") if alias == "int64" else values
     return df
 
 
-def load_bronze_data(date: Optional[str] = None) -> pd.DataFrame:
+def _save_to_bronze_once(path: Path, load: Callable[[], pd.DataFrame]) -> bool:
+    """
+    Internal: Content-addressed Bronze write — skipped if the source was
+    already landed. Holds the manifest lock throughout, so two processes
+    landing the same export write it once.
+    """
+    with _manifest_lock():
+        manifest = _load_manifest()
+        fingerprint = _fingerprint_source(path, manifest)
+        existing = manifest["content"].get(fingerprint["sha256"])
+
+        written = False
+        if existing and all((BRONZE_PATH / p).exists() for p in existing["bronze_paths"]):
+            logger.info("bronze_write_skipped",
+                        source=str(path),
+                        sha256=fingerprint["sha256"],
+                        bronze_paths=existing["bronze_paths"])
+        else:
+            df = load()
+            output_paths = _save_to_bronze(df, source=str(path))
+            manifest["content"][fingerprint["sha256"]] = {
+                "bronze_paths": [bronze_key(p) for p in output_paths],
+                "rows": len(df),
+                "written_at": datetime.now(timezone.utc).isoformat(),
+            }
+            written = True
+
+        manifest["sources"][str(path.resolve())] = fingerprint
+        _save_manifest(manifest)
+        return written
+
+
+def load_bronze_data(
+    date: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    filters: Union[Dict[str, Any], ds.Expression, None] = None,
+    files: Optional[List[Path]] = None,
+    dtype_profile: str = "default",
+    max_concurrency: int = BRONZE_READ_CONCURRENCY,
+    with_file_index: bool = False,
+) -> pd.DataFrame:
     """
     Load data from the Bronze layer (Parquet files).
     
     WHY USE THIS?
     - Much faster than reading CSV every time
     - Parquet files are 5-10x smaller than CSV
-    - Supports reading just one day's data (partitioning)
+    - Only the partitions, columns and row groups a query needs are read
+      (hive partition pruning + projection + predicate pushdown)
+    - Files are read concurrently and combined once, as Arrow
     
     Args:
-        date: Optional date string like "2024-01-15"
-              If None, loads all available Bronze data
+        date: Optional date string like "2024-01-15" (single partition).
+              If None (and no start/end), loads all available Bronze data
+        start: Optional first partition date to include (inclusive)
+        end: Optional last partition date to include (inclusive)
+        columns: Optional list of columns to read. The partition column
+                 "date" is only returned when requested explicitly.
+        filters: Optional row filters, either a dict of
+                 {column: value} / {column: [values, ...]} or a
+                 pyarrow.dataset expression
+        files: Optional explicit list of Bronze files to read instead of
+               the whole layer (e.g. only files not yet processed)
+        dtype_profile: "default" or "compact" (see pipeline/dtypes.py)
+        max_concurrency: Maximum number of files read at the same time
+                         (1 = one file at a time, single-threaded)
+        with_file_index: Add BRONZE_FILE_INDEX_COLUMN — which of `files`
+                         (or of the files read) each row came from
     
     Returns:
-        DataFrame with Bronze layer data
+        DataFrame with Bronze layer data, timestamps parsed (see parse_timestamps)
+    """
+    table = load_bronze_table(date, start, end, columns, filters, files, max_concurrency, with_file_index)
+    if table is None:
+        return pd.DataFrame()
+    return parse_timestamps(arrow_to_pandas(table, dtype_profile))
+
+
+def load_bronze_table(
+    date: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    filters: Union[Dict[str, Any], ds.Expression, None] = None,
+    files: Optional[List[Path]] = None,
+    max_concurrency: int = BRONZE_READ_CONCURRENCY,
+    with_file_index: bool = False,
+) -> Optional[pa.Table]:
+    """
+    Arrow-level reader behind load_bronze_data() (same arguments).
+
+    Uses pyarrow's multithreaded dataset scan. `max_concurrency` bounds
+    how many files are in flight at once, so a wide scan doesn't flood
+    shared storage with requests.
+
+    Returns:
+        pyarrow.Table, or None if no Bronze files match
     """
     if date:
-        partition_path = BRONZE_PATH / f"date={date}"
-        if not partition_path.exists():
+        if not (BRONZE_PATH / f"date={date}").exists():
             logger.warning("bronze_partition_not_found", date=date)
-            return pd.DataFrame()
-        parquet_files = list(partition_path.glob("*.parquet"))
-    else:
-        parquet_files = list(BRONZE_PATH.rglob("*.parquet"))
+            return None
+        start = end = date
 
-    if not parquet_files:
+    if files is None:
+        # Catalog prunes whole files by partition range and column min/max
+        files = catalog.list_files(
+            BRONZE_PATH, start, end, filters if isinstance(filters, dict) else None
+        )
+    dataset = bronze_dataset(files)
+    if dataset is None:
         logger.warning("no_bronze_files_found", path=str(BRONZE_PATH))
-        return pd.DataFrame()
+        return None
+
+    expression = _partition_filter(start, end)
+    row_filter = _row_filter(filters)
+    if row_filter is not None:
+        expression = row_filter if expression is None else expression & row_filter
+
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name != "date"]
+    if with_file_index:
+        # pyarrow's special field: the row's fragment (file) in dataset order
+        columns = list(columns) + ["__fragment_index"]
 
-    # Read all Parquet files and combine
-    dfs = [pd.read_parquet(f) for f in parquet_files]
-    df = pd.concat(dfs, ignore_index=True)
+    max_concurrency = max(1, int(max_concurrency))
+    scanner = dataset.scanner(
+        columns=columns,
+        filter=expression,
+        use_threads=max_concurrency > 1,
+        fragment_readahead=max_concurrency,
+        # Coalesce each file's column-chunk reads into fewer, larger requests
+        fragment_scan_options=ds.ParquetFragmentScanOptions(pre_buffer=True),
+    )
+    table = scanner.to_table()
+    if with_file_index:
+        table = table.rename_columns(table.column_names[:-1] + [BRONZE_FILE_INDEX_COLUMN])
 
     logger.info("bronze_data_loaded",
-                files_read=len(parquet_files),
-                total_rows=len(df))
+                files_read=len(files),
+                start=start,
+                end=end,
+                columns=len(columns),
+                max_concurrency=max_concurrency,
+                total_rows=table.num_rows)
+
+    return table
 
-    return df
 
+def list_bronze_files() -> List[Path]:
+    """Return every Bronze Parquet file, as recorded in the partition catalog."""
+    if not BRONZE_PATH.exists():
+        return []
+    return catalog.list_files(BRONZE_PATH)
 
-def _save_to_bronze(df: pd.DataFrame, source: str = "csv") -> Path:
+
+def bronze_dataset(files: Optional[List[Path]] = None) -> Optional[ds.Dataset]:
     """
-    Internal: Save a DataFrame to the Bronze layer as Parquet.
+    Open the Bronze layer (or the given files within it) as a
+    hive-partitioned pyarrow dataset.
 
+    Files written by different producers (CSV ingest, Kafka consumer)
+    do not share one physical schema, so the dataset schema is the union
+    of every file's columns, with RAW_ARROW_SCHEMA types taking priority.
     """
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    partition_path = BRONZE_PATH / f"date={today}"
-    partition_path.mkdir(parents=True, exist_ok=True)
+    files = list_bronze_files() if files is None else files
+    if not files:
+        return None
+
+    schema = unify_bronze_schemas(catalog.file_schemas(BRONZE_PATH, files))
+    return ds.dataset(
+        [str(f) for f in files],
+        schema=schema.append(pa.field("date", pa.string())),
+        format="parquet",
+        partitioning=BRONZE_PARTITIONING,
+        partition_base_dir=str(BRONZE_PATH),
+    )
+
 
+def unify_bronze_schemas(schemas: Iterable[pa.Schema]) -> pa.Schema:
+    """
+    Merge the physical schemas of several Bronze files into one.
+
+    Columns are the union of all inputs; RAW_ARROW_SCHEMA types win for
+    the required columns, and any other column whose type differs between
+    producers falls back to string.
+    """
+    types: Dict[str, pa.DataType] = {field.name: field.type for field in RAW_ARROW_SCHEMA}
+    for schema in schemas:
+        for field in schema:
+            if field.name == "date":
+                continue
+            if field.name not in types:
+                types[field.name] = field.type
+            elif types[field.name] != field.type and field.name not in RAW_ARROW_SCHEMA.names:
+                # Same column, different producers — fall back to string
+                types[field.name] = pa.string()
+    return pa.schema(list(types.items()))
+
+
+def _partition_filter(start: Optional[str], end: Optional[str]) -> Optional[ds.Expression]:
+    """Internal: Build a date-range expression over the hive `date=` partitions."""
+    expression = None
+    if start:
+        expression = ds.field("date") >= start
+    if end:
+        upper = ds.field("date") <= end
+        expression = upper if expression is None else expression & upper
+    return expression
+
+
+def _row_filter(
+    filters: Union[Dict[str, Any], ds.Expression, None],
+) -> Optional[ds.Expression]:
+    """Internal: Turn {column: value | [values]} filters into a dataset expression."""
+    if filters is None or isinstance(filters, ds.Expression):
+        return filters
+
+    expression = None
+    for col, value in filters.items():
+        if isinstance(value, (list, tuple, set)):
+            condition = ds.field(col).isin(list(value))
+        else:
+            condition = ds.field(col) == value
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _save_to_bronze(df: pd.DataFrame, source: str = "csv") -> List[Path]:
+    """
+    Internal: Save a DataFrame to the Bronze layer as Parquet, one file per
+    event-date partition (rows with unparseable timestamps go to today's).
+
+    """
     # Adding ingestion metadata 
     df_bronze = df.copy()
     df_bronze["_ingested_at"] = datetime.now(timezone.utc).isoformat()
     df_bronze["_source"] = source
     df_bronze["_layer"] = "bronze"
 
-    ts = datetime.now(timezone.utc).strftime("%H%M%S")
-    output_path = partition_path / f"raw_events_{ts}.parquet"
-    df_bronze.to_parquet(output_path, index=False, engine="pyarrow")
+    ts = datetime.now(timezone.utc).strftime("%H%M%S_%f")
+    output_paths = write_partitioned(
+        df_bronze, BRONZE_PATH, f"raw_events_{ts}.parquet", event_dates(df_bronze)
+    )
 
     logger.info("bronze_layer_saved",
-                path=str(output_path),
+                paths=[str(p) for p in output_paths],
+                partitions=len(output_paths),
                 rows=len(df_bronze))
 
-    return output_path
+    return output_paths
+
+
+def event_dates(df: pd.DataFrame, timestamp_col: str = "timestamp") -> pd.Series:
+    """
+    Partition key (YYYY-MM-DD, UTC) for each row, taken from the event
+    timestamp. Rows without a parseable timestamp fall back to today.
+    """
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    if timestamp_col not in df.columns:
+        return pd.Series(today, index=df.index)
+    parsed = _to_utc_datetime(df[timestamp_col])
+    _unparseable(df[timestamp_col], parsed, timestamp_col)
+    keys = day_keys(parsed)
+    return pd.Series(render_day_keys(keys), index=df.index).fillna(today)
+
+
+def parse_timestamps(df: pd.DataFrame, timestamp_col: str = "timestamp") -> pd.DataFrame:
+    """
+    Parse the event timestamp into datetime64 (UTC, tz-naive) and add the
+    integer DAY_KEY_COLUMN. This is the one timestamp parse of a run —
+    transform, aggregate and the quality suite reuse the parsed column, and
+    calling it again on a parsed frame costs nothing.
+
+    Unparseable timestamps become NaT (and a null day key), as do missing
+    ones; when some present values failed to parse, the boolean
+    UNPARSEABLE_TIMESTAMP_COLUMN marks those rows, so the two can be told
+    apart. The frame's columns are replaced in place; the frame itself is
+    returned.
+    """
+    if timestamp_col not in df.columns:
+        return df
+    if not _is_parsed(df[timestamp_col]):
+        raw = df[timestamp_col]
+        parsed = _to_utc_datetime(raw)
+        failed = _unparseable(raw, parsed, timestamp_col)
+        if failed.any():
+            df[UNPARSEABLE_TIMESTAMP_COLUMN] = failed
+        df[timestamp_col] = parsed
+    if DAY_KEY_COLUMN not in df.columns:
+        df[DAY_KEY_COLUMN] = day_keys(df[timestamp_col])
+    return df
+
+
+def day_keys(timestamps: pd.Series) -> Union[np.ndarray, pd.arrays.IntegerArray]:
+    """
+    Days since 1970-01-01 per timestamp: int32, or nullable Int32 when some
+    timestamps are NaT. Computed on the datetime64 values directly — no
+    Python date objects.
+    """
+    days = timestamps.to_numpy().astype("datetime64[D]")
+    missing = np.isnat(days)
+    keys = days.astype("int64").astype("int32")
+    if missing.any():
+        return pd.arrays.IntegerArray(keys, missing)
+    return keys
+
+
+def render_day_keys(keys: Union[np.ndarray, pd.Series, pd.arrays.IntegerArray]) -> np.ndarray:
+    """
+    YYYY-MM-DD string per day key (None for null keys). Each distinct day is
+    formatted once and the labels are taken from that small table.
+    """
+    codes, uniques = pd.factorize(keys)
+    labels = np.datetime_as_string(np.asarray(uniques, dtype="int64").astype("datetime64[D]"))
+    # code -1 (null key) picks the trailing None
+    return np.append(labels.astype(object), None)[codes]
+
+
+def _unparseable(raw: pd.Series, parsed: pd.Series, timestamp_col: str) -> np.ndarray:
+    """
+    Internal: Rows whose timestamp was present but failed to parse — logged
+    with a few examples, since a TIMESTAMP_FORMAT mismatch (e.g. "01/02/2025
+    10:00" under ISO8601) would otherwise show up only as lost rows.
+    """
+    failed = (parsed.isna() & raw.notna()).to_numpy()
+    if failed.any():
+        logger.warning("timestamps_unparseable",
+                       column=timestamp_col,
+                       rows=int(failed.sum()),
+                       total=len(raw),
+                       format=TIMESTAMP_FORMAT,
+                       examples=raw[failed].astype(str).unique()[:3].tolist())
+    return failed
+
+
+def _is_parsed(ts: pd.Series) -> bool:
+    """Internal: True for a tz-naive datetime64 column (parse_timestamps' output)."""
+    return pd.api.types.is_datetime64_dtype(ts) and getattr(ts.dt, "tz", None) is None
+
+
+def _to_utc_datetime(ts: pd.Series) -> pd.Series:
+    """Internal: Strings or datetimes → tz-naive UTC datetime64 (NaT if unparseable)."""
+    if _is_parsed(ts):
+        return ts
+    if not pd.api.types.is_datetime64_any_dtype(ts):
+        ts = pd.to_datetime(ts, format=TIMESTAMP_FORMAT, utc=True, errors="coerce")
+    elif ts.dt.tz is None:
+        return ts
+    return ts.dt.tz_convert(None)
+
+
+def write_partitioned(
+    df: pd.DataFrame,
+    base_path: Path,
+    filename: str,
+    dates: pd.Series,
+) -> List[Path]:
+    """
+    Split a frame by partition date and write one Parquet file per
+    `date=YYYY-MM-DD` directory under `base_path`, in a single groupby pass.
+
+    Args:
+        df: Rows to write (written as-is — no partition column is added)
+        base_path: Layer root, e.g. BRONZE_PATH or SILVER_PATH
+        filename: File name used inside every partition directory
+        dates: Partition date per row, aligned with df's index — either
+               YYYY-MM-DD strings or integer day keys (see day_keys), which
+               group faster and are only rendered once per partition
+
+    Returns:
+        Paths of the files written, ordered by date
+    """
+    render = pd.api.types.is_integer_dtype(dates)
+    output_paths = []
+    for day, part in df.groupby(dates.to_numpy(), sort=True):
+        if render:
+            day = render_day_keys(np.array([day]))[0]
+        partition_path = Path(base_path) / f"date={day}"
+        partition_path.mkdir(parents=True, exist_ok=True)
+        output_path = partition_path / filename
+        part.to_parquet(output_path, index=False, engine="pyarrow")
+        output_paths.append(output_path)
+
+    catalog.register_files(base_path, output_paths)
+    return output_paths
+
+
+def remap_manifest_paths(replaced: Iterable[Path], output_path: Path) -> None:
+    """
+    Point manifest entries at a file that replaced them (e.g. after compaction),
+    so dedup keeps recognising the source as already ingested.
+    """
+    replaced_keys = {bronze_key(p) for p in replaced}
+    output_key = bronze_key(output_path)
+    with _manifest_lock():
+        manifest = _load_manifest()
+        changed = False
+        for entry in manifest["content"].values():
+            paths = entry["bronze_paths"]
+            if replaced_keys.intersection(paths):
+                entry["bronze_paths"] = [p for p in paths if p not in replaced_keys]
+                if output_key not in entry["bronze_paths"]:
+                    entry["bronze_paths"].append(output_key)
+                changed = True
+        if changed:
+            _save_manifest(manifest)
+
+
+def _fingerprint_source(path: Path, manifest: dict) -> dict:
+    """
+    Internal: Identify a source file by content.
+
+    Fast path: if size and mtime match the last time we saw this path, the
+    stored hash is reused without reading the file. Otherwise the file is
+    hashed (SHA-256, streamed in 1 MB chunks).
+    """
+    stat = path.stat()
+    previous = manifest["sources"].get(str(path.resolve()))
+    if (
+        previous
+        and previous["size"] == stat.st_size
+        and previous["mtime_ns"] == stat.st_mtime_ns
+    ):
+        return previous
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": digest.hexdigest(),
+    }
+
+
+def _manifest_path() -> Path:
+    # Leading underscore keeps it invisible to the parquet dataset scan
+    return BRONZE_PATH / "_ingest_manifest.json"
+
+
+def _manifest_lock():
+    """
+    Internal: Lock held around every read-modify-write of the manifest —
+    writes are atomic, but two unlocked updates would lose one of them.
+    """
+    return locked(BRONZE_PATH / "_ingest_manifest.lock")
+
+
+def bronze_key(path: Path) -> str:
+    """Bronze file path relative to BRONZE_PATH — a cwd-independent key for manifests."""
+    return Path(path).resolve().relative_to(BRONZE_PATH.resolve()).as_posix()
+
+
+def _load_manifest() -> dict:
+    path = _manifest_path()
+    if not path.exists():
+        return {"sources": {}, "content": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(manifest: dict) -> None:
+    """Internal: Write the manifest atomically (temp file + os.replace)."""
+    path = _manifest_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
 
 
 def get_pipeline_metadata() -> dict:
     """
     Return metadata about available data layers.
 
+    Read from each layer's partition catalog — no directory walk or stat().
     """
-    bronze_files = list(BRONZE_PATH.rglob("*.parquet"))
-    silver_files = list(SILVER_PATH.rglob("*.parquet"))
-    gold_files = list(GOLD_PATH.rglob("*.parquet"))
+    bronze = catalog.layer_summary(BRONZE_PATH)
+    silver = catalog.layer_summary(SILVER_PATH)
+    gold = catalog.layer_summary(GOLD_PATH)
 
     return {
-        "bronze_files": len(bronze_files),
-        "silver_files": len(silver_files),
-        "gold_files": len(gold_files),
-        "bronze_size_mb": sum(f.stat().st_size for f in bronze_files) / 1e6,
-        "last_ingested": datetime.now(timezone.utc).isoformat(),
+        "bronze_files": bronze["files"],
+        "silver_files": silver["files"],
+        "gold_files": gold["files"],
+        "bronze_size_mb": bronze["bytes"] / 1e6,
+        "bronze_rows": bronze["rows"],
+        "last_ingested": bronze["last_written"] or datetime.now(timezone.utc).isoformat(),
     }
@@ -0,0 +1,118 @@
+import logging
+import os
+import socket
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────────
+# LOCK FILES
+#   A lock is a file created with O_CREAT | O_EXCL — only one process can
+#   create it — holding "<pid> <host> <unix time>" of its owner. A process
+#   that dies without releasing its lock would otherwise block the resource
+#   forever, so a lock is stale (and taken over) once its owner is no longer
+#   running on this host, or once it is older than `max_age` (the only test
+#   possible for an owner on another host).
+# ─────────────────────────────────────────────
+
+# Locks older than this are presumed abandoned
+LOCK_MAX_AGE_SECONDS = 3600.0
+# locked(): how long to wait for a held lock, and how often to retry
+LOCK_TIMEOUT_SECONDS = 600.0
+LOCK_POLL_SECONDS = 0.05
+
+
+def try_lock(path: Path, max_age: float = LOCK_MAX_AGE_SECONDS) -> bool:
+    """
+    Take the lock at `path` without waiting.
+
+    Returns:
+        True if the lock is now held (release it with release_lock()),
+        False if a live owner holds it
+    """
+    path = Path(path)
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            owner = _read_owner(path)
+            if owner is None or not _is_stale(path, owner, max_age):
+                return False
+            # Re-check right before removing, so a lock another process
+            # has just taken over is left alone
+            if _read_owner(path) != owner:
+                return False
+            logger.warning(f"lock_stale | {path} | owner={owner[0]}@{owner[1]} — removing")
+            path.unlink(missing_ok=True)
+            continue
+        with os.fdopen(fd, "w") as fh:
+            fh.write(f"{os.getpid()} {socket.gethostname()} {time.time():.3f}")
+        return True
+    return False
+
+
+def release_lock(path: Path) -> None:
+    """Release a lock taken with try_lock()."""
+    Path(path).unlink(missing_ok=True)
+
+
+@contextmanager
+def locked(
+    path: Path,
+    timeout: float = LOCK_TIMEOUT_SECONDS,
+    max_age: float = LOCK_MAX_AGE_SECONDS,
+) -> Iterator[None]:
+    """
+    Hold the lock at `path` for the duration of the block, waiting up to
+    `timeout` seconds for it.
+
+    Raises:
+        TimeoutError if a live owner still holds the lock after `timeout`
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    deadline = time.monotonic() + timeout
+    while not try_lock(path, max_age):
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"locked: {path} still held after {timeout:.0f}s (owner: {_read_owner(path)})")
+        time.sleep(LOCK_POLL_SECONDS)
+    try:
+        yield
+    finally:
+        release_lock(path)
+
+
+def _read_owner(path: Path) -> Optional[Tuple[int, str, float]]:
+    """Internal: (pid, host, created at) of a lock — None if it vanished meanwhile."""
+    try:
+        text = path.read_text()
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+    parts = text.split()
+    try:
+        return int(parts[0]), parts[1], float(parts[2])
+    except (IndexError, ValueError):
+        # Written by an older version, or cut short: judge by age alone
+        return -1, "", mtime
+
+
+def _is_stale(path: Path, owner: Tuple[int, str, float], max_age: float) -> bool:
+    """Internal: True if the lock's owner is gone or the lock is older than `max_age`."""
+    pid, host, created = owner
+    if time.time() - created > max_age:
+        return True
+    if host != socket.gethostname() or pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        # Alive, owned by another user
+        return False
+    return False
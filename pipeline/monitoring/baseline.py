@@ -1,17 +1,24 @@
 import json
 import os
+from typing import Optional
+
 import pandas as pd
 
+from pipeline.profiling import DataFrameProfile, profile_dataframe
+
 BASELINE_PATH = "artifacts/reports/baseline_stats.json"
+BASELINE_COLUMNS = ["latency_ms", "crash_flag", "feedback_score", "error_count"]
 
-def compute_baseline(df: pd.DataFrame) -> dict:
+def compute_baseline(df: pd.DataFrame, profile: Optional[DataFrameProfile] = None) -> dict:
+    if profile is None:
+        profile = profile_dataframe(df, columns=BASELINE_COLUMNS)
     return {
-        "row_count": int(len(df)),
-        "latency_ms_mean": float(df["latency_ms"].mean()),
-        "latency_ms_std": float(df["latency_ms"].std()),
-        "crash_flag_rate": float(df["crash_flag"].mean()),
-        "feedback_score_mean": float(df["feedback_score"].mean()),
-        "error_count_mean": float(df["error_count"].mean()),
+        "row_count": int(profile.rows),
+        "latency_ms_mean": profile["latency_ms"].mean,
+        "latency_ms_std": profile["latency_ms"].std,
+        "crash_flag_rate": profile["crash_flag"].mean,
+        "feedback_score_mean": profile["feedback_score"].mean,
+        "error_count_mean": profile["error_count"].mean,
     }
 
 def save_baseline(stats: dict) -> None:
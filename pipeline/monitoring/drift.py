@@ -8,6 +8,8 @@ import numpy as np
 import pandas as pd
 from scipy import stats  # KS test comes from scipy
 
+from pipeline.profiling import DataFrameProfile, profile_dataframe
+
 logger = logging.getLogger(__name__)
 
 ARTIFACTS_PATH = Path("artifacts/reports")
@@ -119,6 +121,7 @@ def detect_data_drift(
     baseline: dict,
     threshold: float = 0.20,
     baseline_df: Optional[pd.DataFrame] = None,
+    profile: Optional[DataFrameProfile] = None,
 ) -> dict:
     """
     Full drift detection suite combining:
@@ -131,17 +134,24 @@ def detect_data_drift(
         baseline: Baseline stats dict (from baseline.py)
         threshold: % change threshold for legacy alerts
         baseline_df: Optional historical DataFrame for statistical tests
+        profile: Precomputed profile of `df` (computed here if omitted)
     
     Returns:
         Comprehensive drift report dictionary
     """
     columns_to_monitor = ["latency_ms", "crash_flag", "feedback_score", "error_count"]
     
+    if profile is None:
+        profile = profile_dataframe(df, columns=columns_to_monitor)
+
+    def _mean(col: str) -> float:
+        return profile[col].mean if col in profile else 0
+
     current_stats = {
-        "latency_ms_mean": float(df["latency_ms"].mean()) if "latency_ms" in df.columns else 0,
-        "crash_flag_rate": float(df["crash_flag"].mean()) if "crash_flag" in df.columns else 0,
-        "feedback_score_mean": float(df["feedback_score"].mean()) if "feedback_score" in df.columns else 0,
-        "error_count_mean": float(df["error_count"].mean()) if "error_count" in df.columns else 0,
+        "latency_ms_mean": _mean("latency_ms"),
+        "crash_flag_rate": _mean("crash_flag"),
+        "feedback_score_mean": _mean("feedback_score"),
+        "error_count_mean": _mean("error_count"),
     }
 
     # ── LAYER 1: Original % change (kept for backward compatibility) ──
@@ -0,0 +1,184 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from pipeline.sketches import TDigest
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────────
+# COLUMN PROFILES
+#   One pass over each column of a frame yields everything the quality
+#   suite, the drift baseline, the drift check and the run log need:
+#   counts, nulls, moments, min/max, quantiles and distinct counts.
+#   Callers compute a DataFrameProfile once per run and evaluate their
+#   checks against it instead of re-scanning the raw frame.
+# ─────────────────────────────────────────────
+
+PROFILE_QUANTILES = (0.01, 0.05, 0.25, 0.50, 0.75, 0.95, 0.99)
+
+# Columns with at most this many distinct values keep the values themselves
+# (e.g. crash_flag's {0, 1}) so set-membership checks need no extra scan
+MAX_TRACKED_DISTINCT = 32
+
+
+@dataclass
+class ColumnProfile:
+    """Single-pass summary of one column."""
+    name: str
+    dtype: str
+    count: int = 0
+    null_count: int = 0
+    n_distinct: int = 0
+    distinct_values: Optional[List] = None
+    # Numeric columns only
+    mean: float = float("nan")
+    std: float = float("nan")
+    min: float = float("nan")
+    max: float = float("nan")
+    quantiles: Dict[float, float] = field(default_factory=dict)
+    # Non-numeric columns only: values that are blank after strip()
+    empty_count: int = 0
+
+    @property
+    def rows(self) -> int:
+        return self.count + self.null_count
+
+    @property
+    def null_rate(self) -> float:
+        return self.null_count / self.rows if self.rows else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Profiled quantile `q` (must be one of the profiled quantiles)."""
+        if q not in self.quantiles:
+            raise KeyError(f"Quantile {q} was not profiled for '{self.name}'")
+        return self.quantiles[q]
+
+
+@dataclass
+class DataFrameProfile:
+    """Column profiles of one frame, keyed by column name."""
+    rows: int
+    columns: Dict[str, ColumnProfile] = field(default_factory=dict)
+
+    def __contains__(self, col: str) -> bool:
+        return col in self.columns
+
+    def __getitem__(self, col: str) -> ColumnProfile:
+        return self.columns[col]
+
+
+def profile_dataframe(
+    df: pd.DataFrame,
+    columns: Optional[Iterable[str]] = None,
+    quantiles: Sequence[float] = PROFILE_QUANTILES,
+    approximate: bool = False,
+) -> DataFrameProfile:
+    """
+    Profile the columns of `df` (all of them by default) in one vectorized
+    pass per column.
+
+    Args:
+        df: Frame to profile
+        columns: Optional subset of columns
+        quantiles: Quantiles computed for numeric columns
+        approximate: Estimate quantiles with a t-digest (see sketches.py)
+                     instead of an exact partition of each column
+
+    Returns:
+        DataFrameProfile
+    """
+    cols = list(df.columns) if columns is None else [c for c in columns if c in df.columns]
+    profile = DataFrameProfile(rows=len(df))
+    for col in cols:
+        profile.columns[col] = profile_column(df[col], quantiles, approximate)
+    logger.info(f"profile_dataframe | rows={profile.rows} | columns={len(cols)}")
+    return profile
+
+
+def profile_column(
+    series: pd.Series,
+    quantiles: Sequence[float] = PROFILE_QUANTILES,
+    approximate: bool = False,
+) -> ColumnProfile:
+    """Profile a single column (see profile_dataframe)."""
+    prof = ColumnProfile(name=str(series.name), dtype=str(series.dtype))
+
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        arr = series.to_numpy(dtype="float64", na_value=np.nan)
+        values = arr[~np.isnan(arr)]
+        prof.count = int(values.size)
+        prof.null_count = int(arr.size - values.size)
+        if values.size:
+            prof.mean = float(values.mean())
+            prof.std = float(values.std(ddof=1)) if values.size > 1 else float("nan")
+            prof.min = float(values.min())
+            prof.max = float(values.max())
+            if approximate:
+                qs = TDigest.from_values(values).quantile(list(quantiles))
+            else:
+                qs = np.quantile(values, list(quantiles))
+            prof.quantiles = {float(q): float(v) for q, v in zip(quantiles, qs)}
+        distinct = pd.unique(values)
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        # Parsed timestamps: distinct counts on the datetime64 values, no
+        # string conversion of every row
+        nulls = series.isna().to_numpy()
+        prof.null_count = int(nulls.sum())
+        prof.count = int(nulls.size - prof.null_count)
+        distinct = pd.unique(series[~nulls].to_numpy())
+        if distinct.size <= MAX_TRACKED_DISTINCT:
+            distinct = np.datetime_as_string(distinct)
+    elif isinstance(series.dtype, pd.CategoricalDtype):
+        # Only the integer codes are scanned; labels come from the categories
+        codes = series.cat.codes.to_numpy()
+        valid = codes[codes >= 0]
+        prof.null_count = int(codes.size - valid.size)
+        prof.count = int(valid.size)
+        counts = np.bincount(valid, minlength=len(series.cat.categories))
+        labels = series.cat.categories.astype(str)
+        distinct = labels[counts > 0].to_numpy()
+        prof.empty_count = int(counts[labels.str.strip() == ""].sum())
+    else:
+        strings = _arrow_strings(series)
+        if strings is not None:
+            # Distinct and blank counts in Arrow — no Python string per row
+            prof.null_count = strings.null_count
+            prof.count = len(strings) - strings.null_count
+            distinct = pc.unique(strings.drop_null())
+            if len(distinct) <= MAX_TRACKED_DISTINCT:
+                distinct = np.array(distinct.to_pylist(), dtype=object)
+            prof.empty_count = int(pc.sum(pc.match_substring_regex(strings, r"^\s*$")).as_py() or 0)
+        else:
+            nulls = series.isna().to_numpy()
+            prof.null_count = int(nulls.sum())
+            prof.count = int(nulls.size - prof.null_count)
+            values = series[~nulls].astype(str)
+            distinct = pd.unique(values)
+            # Blank values are rare — only count them if a blank label exists at all
+            if any(not v.strip() for v in distinct):
+                prof.empty_count = int((values.str.strip() == "").sum())
+
+    prof.n_distinct = int(len(distinct))
+    if prof.n_distinct <= MAX_TRACKED_DISTINCT:
+        prof.distinct_values = sorted(v.item() if hasattr(v, "item") else v for v in distinct)
+    return prof
+
+
+def _arrow_strings(series: pd.Series) -> Optional[pa.Array]:
+    """Internal: A string column as an Arrow string array (None if it holds anything else)."""
+    try:
+        arr = pa.array(series, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return None
+    if isinstance(arr, pa.ChunkedArray):
+        arr = arr.combine_chunks()
+    if pa.types.is_large_string(arr.type):
+        arr = arr.cast(pa.string())
+    return arr if pa.types.is_string(arr.type) else None
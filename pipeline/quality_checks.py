@@ -1,143 +1,531 @@
 import json
 import logging
 import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
 import pandas as pd
 import numpy as np
 
+from pipeline.dedup import DedupIndex, duplicate_mask, event_windows, hash_keys
+from pipeline.ingest import TIMESTAMP_FORMAT, UNPARSEABLE_TIMESTAMP_COLUMN
+from pipeline.profiling import DataFrameProfile, profile_dataframe
+from pipeline.sampling import DEFAULT_CONFIDENCE, StratifiedSample, estimate_rate, stratified_sample
+
 logger = logging.getLogger(__name__)
 
 
 QUALITY_REPORT_PATH = Path("artifacts/reports/data_quality")
 QUALITY_REPORT_PATH.mkdir(parents=True, exist_ok=True)
 
+# ── Expectation thresholds (shared by the global and grouped suites) ──
+NULL_RATE_THRESHOLD = 0.05          # Max 5% nulls allowed
+LATENCY_RANGE_MS = (0, 10_000)
+SPIKE_LATENCY_MS = 5000
+FEEDBACK_RANGE = (1, 5)
+
 
 # ─────────────────────────────────────────────
+# EXPECTATION REGISTRY
+#   Each expectation is a small function registered with @expectation.
+#   It receives a SuiteContext (frame + shared profile) and returns
+#   (passed, detail, rows_scanned) — rows_scanned is 0 for checks answered
+#   from the profile. The suite runs them on a thread pool (the heavy
+#   checks are NumPy/pandas kernels that release the GIL), times each one
+#   and enforces a per-check timeout.
+# ─────────────────────────────────────────────
+
+# Seconds a single expectation may run before it is reported as timed out
+DEFAULT_CHECK_TIMEOUT_SECONDS = 60.0
+QUALITY_MAX_WORKERS = 4
+MIN_ROWS = 50
+
+# Sampled mode: a zero-tolerance check (no violations allowed) passes on a
+# sample only if its violation rate is below this with the chosen
+# confidence; any violation seen in the sample fails it outright
+SAMPLE_ZERO_TOLERANCE = 0.001
 
-def run_great_expectations_suite(df: pd.DataFrame) -> Dict:
+ExpectationFn = Callable[["SuiteContext"], Tuple[bool, str, int]]
+ViolationFn = Callable[[pd.DataFrame], np.ndarray]
+
+
+@dataclass
+class SuiteContext:
     """
-    Run a Great Expectations-style validation suite.
-    
-    We implement the same logic as GE but without requiring
-    the full GE server setup (works offline, no extra config).
-    
-    Returns a report dict with:
-    - passed: True/False overall
-    - results: list of individual check results
-    - score: % of checks that passed
+    Inputs shared by every expectation of one suite run. The full-frame
+    profile is computed on first use, so a sampled run only pays for it
+    when a check falls back to a full scan. Time a check spends building
+    or waiting for it is shared work, tracked per thread so it doesn't
+    count against the check's timeout (see profile_seconds()).
     """
-    results = []
-    
-    def add_result(expectation: str, passed: bool, detail: str):
-        results.append({
-            "expectation": expectation,
-            "passed": passed,
-            "detail": detail,
-        })
+    df: pd.DataFrame
+    cached_profile: Optional[DataFrameProfile] = None
+    dedup_index: Optional[DedupIndex] = None
+    sample: Optional[StratifiedSample] = None
+    confidence: float = DEFAULT_CONFIDENCE
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _profile_waits: Dict[int, float] = field(default_factory=dict, repr=False)
+    _profile_since: Dict[int, float] = field(default_factory=dict, repr=False)
 
-    # ── CHECK 1: Required columns exist ──────────────────────
-    required_cols = [
-        "user_id", "feature_name", "latency_ms",
-        "crash_flag", "feedback_score", "timestamp"
-    ]
-    missing = [c for c in required_cols if c not in df.columns]
-    add_result(
-        "expect_columns_to_exist",
-        passed=len(missing) == 0,
-        detail=f"Missing columns: {missing}" if missing else "All required columns present"
-    )
+    @property
+    def profile(self) -> DataFrameProfile:
+        if self.cached_profile is not None:
+            return self.cached_profile
+        thread, start = threading.get_ident(), time.perf_counter()
+        self._profile_since[thread] = start
+        try:
+            with self._lock:
+                if self.cached_profile is None:
+                    self.cached_profile = profile_dataframe(self.df)
+        finally:
+            del self._profile_since[thread]
+            self._profile_waits[thread] = self._profile_waits.get(thread, 0.0) + time.perf_counter() - start
+        return self.cached_profile
 
-    # ── CHECK 2: No duplicate event records ──────────────────
-    if "user_id" in df.columns and "timestamp" in df.columns:
-        dup_count = df.duplicated(subset=["user_id", "timestamp"]).sum()
-        add_result(
-            "expect_no_duplicate_events",
-            passed=dup_count == 0,
-            detail=f"Found {dup_count} duplicate (user_id, timestamp) pairs"
-        )
+    def profile_seconds(self, thread: int, now: float) -> float:
+        """Seconds `thread` has spent building or waiting for the profile, up to `now`."""
+        since = self._profile_since.get(thread)
+        return self._profile_waits.get(thread, 0.0) + (now - since if since is not None else 0.0)
 
-    # ── CHECK 3: Null rate below threshold ───────────────────
-    for col in ["latency_ms", "crash_flag", "feedback_score"]:
-        if col in df.columns:
-            null_rate = df[col].isnull().mean()
-            threshold = 0.05  # Max 5% nulls allowed
-            add_result(
-                f"expect_column_null_rate_below_threshold_{col}",
-                passed=null_rate <= threshold,
-                detail=f"{col} null rate: {null_rate:.2%} (threshold: {threshold:.0%})"
-            )
 
-    # ── CHECK 4: Latency values in valid range ────────────────
-    if "latency_ms" in df.columns:
-        min_latency = df["latency_ms"].min()
-        max_latency = df["latency_ms"].max()
-        valid = (min_latency >= 0) and (max_latency <= 10_000)
-        add_result(
-            "expect_latency_in_valid_range",
-            passed=valid,
-            detail=f"Latency range: [{min_latency:.1f}, {max_latency:.1f}] ms. Expected: [0, 10000]"
-        )
+@dataclass
+class Expectation:
+    """
+    One registered check. `violations` (optional) marks the rows that break
+    it; checks that have one can be decided on a stratified sample by
+    comparing the violation rate's confidence interval with `max_rate`.
+    """
+    name: str
+    fn: ExpectationFn
+    columns: Tuple[str, ...] = ()
+    critical: bool = False
+    timeout: float = DEFAULT_CHECK_TIMEOUT_SECONDS
+    violations: Optional[ViolationFn] = None
+    max_rate: float = 0.0
 
-    # ── CHECK 5: Crash flag is binary (0 or 1 only) ──────────
-    if "crash_flag" in df.columns:
-        unique_values = set(df["crash_flag"].dropna().unique())
-        valid_values = {0, 1, 0.0, 1.0}
-        valid = unique_values.issubset(valid_values)
-        add_result(
-            "expect_crash_flag_is_binary",
-            passed=valid,
-            detail=f"crash_flag unique values: {unique_values}. Expected: {{0, 1}}"
-        )
+    def applies_to(self, df: pd.DataFrame) -> bool:
+        return all(col in df.columns for col in self.columns)
 
-    # ── CHECK 6: Feedback score in range [1, 5] ──────────────
-    if "feedback_score" in df.columns:
-        out_of_range = df[(df["feedback_score"] < 1) | (df["feedback_score"] > 5)].shape[0]
-        add_result(
-            "expect_feedback_score_between_1_and_5",
-            passed=out_of_range == 0,
-            detail=f"Records with feedback_score outside [1,5]: {out_of_range}"
+
+EXPECTATIONS: List[Expectation] = []
+
+
+def expectation(
+    name: str,
+    columns: Sequence[str] = (),
+    critical: bool = False,
+    timeout: float = DEFAULT_CHECK_TIMEOUT_SECONDS,
+    violations: Optional[ViolationFn] = None,
+    max_rate: float = 0.0,
+):
+    """Register a function as a suite expectation (run in registration order)."""
+    def decorator(fn: ExpectationFn) -> ExpectationFn:
+        EXPECTATIONS.append(
+            Expectation(name, fn, tuple(columns), critical, timeout, violations, max_rate)
         )
+        return fn
+    return decorator
+
+
+# ── CHECK 1: Required columns exist ──────────────────────
+REQUIRED_COLUMNS = [
+    "user_id", "feature_name", "latency_ms",
+    "crash_flag", "feedback_score", "timestamp"
+]
+
+
+@expectation("expect_columns_to_exist", critical=True)
+def _expect_columns_to_exist(ctx: SuiteContext):
+    missing = [c for c in REQUIRED_COLUMNS if c not in ctx.df.columns]
+    detail = f"Missing columns: {missing}" if missing else "All required columns present"
+    return len(missing) == 0, detail, 0
+
+
+# ── CHECK 2: No duplicate event records ──────────────────
+@expectation("expect_no_duplicate_events", columns=("user_id", "timestamp"))
+def _expect_no_duplicate_events(ctx: SuiteContext):
+    windows = event_windows(ctx.df) if ctx.dedup_index is not None else None
+    dup_count = int(duplicate_mask(hash_keys(ctx.df), ctx.dedup_index, windows).sum())
+    scope = " (including earlier batches)" if ctx.dedup_index is not None else ""
+    return dup_count == 0, f"Found {dup_count} duplicate (user_id, timestamp) pairs{scope}", len(ctx.df)
+
+
+# ── CHECK 3: Null rate below threshold ───────────────────
+def _null_rate_expectation(col: str) -> ExpectationFn:
+    def check(ctx: SuiteContext):
+        null_rate = ctx.profile[col].null_rate
+        threshold = NULL_RATE_THRESHOLD
+        return null_rate <= threshold, f"{col} null rate: {null_rate:.2%} (threshold: {threshold:.0%})", 0
+    return check
+
+
+def _null_rows(col: str) -> ViolationFn:
+    return lambda df: df[col].isnull().to_numpy()
+
+
+for _col in ["latency_ms", "crash_flag", "feedback_score"]:
+    expectation(
+        f"expect_column_null_rate_below_threshold_{_col}", columns=(_col,),
+        violations=_null_rows(_col), max_rate=NULL_RATE_THRESHOLD,
+    )(_null_rate_expectation(_col))
+
+
+def _numeric(df: pd.DataFrame, col: str) -> np.ndarray:
+    return df[col].to_numpy(dtype="float64", na_value=np.nan)
+
 
-    # ── CHECK 7: Row count is above minimum ──────────────────
-    MIN_ROWS = 50
-    add_result(
-        "expect_minimum_row_count",
-        passed=len(df) >= MIN_ROWS,
-        detail=f"Row count: {len(df)}. Minimum required: {MIN_ROWS}"
+# ── CHECK 4: Latency values in valid range ────────────────
+@expectation(
+    "expect_latency_in_valid_range", columns=("latency_ms",), critical=True,
+    violations=lambda df: (_numeric(df, "latency_ms") < LATENCY_RANGE_MS[0])
+    | (_numeric(df, "latency_ms") > LATENCY_RANGE_MS[1]),
+)
+def _expect_latency_in_valid_range(ctx: SuiteContext):
+    min_latency = ctx.profile["latency_ms"].min
+    max_latency = ctx.profile["latency_ms"].max
+    lo, hi = LATENCY_RANGE_MS
+    valid = (min_latency >= lo) and (max_latency <= hi)
+    return valid, f"Latency range: [{min_latency:.1f}, {max_latency:.1f}] ms. Expected: [{lo}, {hi}]", 0
+
+
+# ── CHECK 5: Crash flag is binary (0 or 1 only) ──────────
+@expectation(
+    "expect_crash_flag_is_binary", columns=("crash_flag",),
+    violations=lambda df: ~np.isin(_numeric(df, "crash_flag"), [0, 1])
+    & ~np.isnan(_numeric(df, "crash_flag")),
+)
+def _expect_crash_flag_is_binary(ctx: SuiteContext):
+    tracked = ctx.profile["crash_flag"].distinct_values
+    rows_scanned = 0
+    if tracked is None:
+        tracked, rows_scanned = ctx.df["crash_flag"].dropna().unique(), len(ctx.df)
+    unique_values = set(tracked)
+    valid = unique_values.issubset({0, 1, 0.0, 1.0})
+    return valid, f"crash_flag unique values: {unique_values}. Expected: {{0, 1}}", rows_scanned
+
+
+# ── CHECK 6: Feedback score in range [1, 5] ──────────────
+@expectation(
+    "expect_feedback_score_between_1_and_5", columns=("feedback_score",),
+    violations=lambda df: (_numeric(df, "feedback_score") < FEEDBACK_RANGE[0])
+    | (_numeric(df, "feedback_score") > FEEDBACK_RANGE[1]),
+)
+def _expect_feedback_score_in_range(ctx: SuiteContext):
+    fb = ctx.profile["feedback_score"]
+    lo, hi = FEEDBACK_RANGE
+    # min/max prove the common case; only count rows when they can't
+    if fb.count == 0 or (fb.min >= lo and fb.max <= hi):
+        out_of_range, rows_scanned = 0, 0
+    else:
+        scores = ctx.df["feedback_score"]
+        out_of_range, rows_scanned = int(((scores < lo) | (scores > hi)).sum()), len(ctx.df)
+    return out_of_range == 0, f"Records with feedback_score outside [1,5]: {out_of_range}", rows_scanned
+
+
+# ── CHECK 7: Row count is above minimum ──────────────────
+@expectation("expect_minimum_row_count")
+def _expect_minimum_row_count(ctx: SuiteContext):
+    rows = len(ctx.df)
+    return rows >= MIN_ROWS, f"Row count: {rows}. Minimum required: {MIN_ROWS}", 0
+
+
+# ── CHECK 8: feature_name has known valid values ──────────
+@expectation(
+    "expect_feature_name_not_null_or_empty", columns=("feature_name",),
+    violations=lambda df: (
+        df["feature_name"].isnull() | (df["feature_name"].astype(str).str.strip() == "")
+    ).to_numpy(),
+)
+def _expect_feature_name_not_null_or_empty(ctx: SuiteContext):
+    null_names = ctx.profile["feature_name"].null_count
+    empty_names = ctx.profile["feature_name"].empty_count
+    return (null_names == 0 and empty_names == 0), f"Null feature names: {null_names}, Empty: {empty_names}", 0
+
+
+# ── CHECK 9: Timestamp is parseable ──────────────────────
+# Frames from ingest arrive parsed, with the rows that failed to parse
+# marked by parse_timestamps() (other NaTs are missing timestamps — the
+# null checks' concern); raw string frames are parsed here with the ingest
+# format — the slow path, hence the tighter timeout
+def _unparseable_timestamps(df: pd.DataFrame) -> np.ndarray:
+    ts = df["timestamp"]
+    if pd.api.types.is_datetime64_any_dtype(ts):
+        if UNPARSEABLE_TIMESTAMP_COLUMN in df.columns:
+            return df[UNPARSEABLE_TIMESTAMP_COLUMN].to_numpy(dtype=bool)
+        return np.zeros(len(df), dtype=bool)
+    parsed = pd.to_datetime(ts, format=TIMESTAMP_FORMAT, utc=True, errors="coerce")
+    return (parsed.isna() & ts.notna()).to_numpy()
+
+
+@expectation(
+    "expect_timestamp_parseable", columns=("timestamp",), critical=True, timeout=30.0,
+    violations=_unparseable_timestamps,
+)
+def _expect_timestamp_parseable(ctx: SuiteContext):
+    bad = int(_unparseable_timestamps(ctx.df).sum())
+    if bad:
+        return False, f"Unparseable timestamps: {bad}", len(ctx.df)
+    return True, "All timestamps parsed successfully", len(ctx.df)
+
+
+# ── CHECK 10: No extreme latency spikes ──────────────────
+@expectation(
+    "expect_no_extreme_latency_spikes", columns=("latency_ms",),
+    violations=lambda df: _numeric(df, "latency_ms") > SPIKE_LATENCY_MS,
+)
+def _expect_no_extreme_latency_spikes(ctx: SuiteContext):
+    latency = ctx.profile["latency_ms"]
+    p99 = latency.quantiles.get(0.99, float("nan"))
+    if latency.max > SPIKE_LATENCY_MS:
+        extreme_spikes, rows_scanned = int((ctx.df["latency_ms"] > SPIKE_LATENCY_MS).sum()), len(ctx.df)
+    else:
+        extreme_spikes, rows_scanned = 0, 0
+    return (
+        extreme_spikes == 0,
+        f"Events with latency > {SPIKE_LATENCY_MS}ms: {extreme_spikes}. P99 latency: {p99:.1f}ms",
+        rows_scanned,
     )
 
-    # ── CHECK 8: feature_name has known valid values ──────────
-    if "feature_name" in df.columns:
-        null_names = df["feature_name"].isnull().sum()
-        empty_names = (df["feature_name"].astype(str).str.strip() == "").sum()
-        add_result(
-            "expect_feature_name_not_null_or_empty",
-            passed=(null_names == 0 and empty_names == 0),
-            detail=f"Null feature names: {null_names}, Empty: {empty_names}"
-        )
 
-    # ── CHECK 9: Timestamp is parseable ──────────────────────
-    if "timestamp" in df.columns:
+def run_expectations(
+    ctx: SuiteContext,
+    expectations: Optional[Sequence[Expectation]] = None,
+    max_workers: int = QUALITY_MAX_WORKERS,
+    fast_fail: bool = False,
+) -> List[Dict]:
+    """
+    Run expectations concurrently and return their results in registry order.
+
+    Each result records `wall_time_ms`, `rows_scanned` and a `status`:
+    passed / failed / error / timeout / skipped. A check that exceeds its
+    timeout is reported as failed; its thread cannot be killed, so it
+    finishes in the background and its result is discarded. Time spent
+    on the shared profile doesn't count towards a timeout. With
+    `fast_fail`, the first critical failure cancels every check that has
+    not started yet (reported as skipped).
+
+    Args:
+        ctx: Frame, profile and dedup index shared by the checks
+        expectations: Checks to run (default: every registered expectation)
+        max_workers: Thread pool size (1 = run serially, in order)
+        fast_fail: Stop at the first failed critical expectation
+    """
+    expectations = [e for e in (expectations or EXPECTATIONS) if e.applies_to(ctx.df)]
+    results: Dict[str, Dict] = {}
+    started: Dict[str, float] = {}
+
+    # Thread of each started check and its profile time when it started
+    threads: Dict[str, Tuple[int, float]] = {}
+
+    def timed(exp: Expectation) -> Dict:
+        start = time.perf_counter()
+        thread = threading.get_ident()
+        threads[exp.name] = (thread, ctx.profile_seconds(thread, start))
+        started[exp.name] = start
+        sampled: Dict = {}
         try:
-            pd.to_datetime(df["timestamp"], errors="raise")
-            add_result("expect_timestamp_parseable", passed=True,
-                      detail="All timestamps parsed successfully")
+            verdict = None
+            if ctx.sample is not None and exp.violations is not None:
+                verdict, sampled = _sampled_verdict(exp, ctx)
+                if verdict is None:
+                    verdict = _full_scan_verdict(exp, ctx)
+            if verdict is None:
+                passed, detail, rows_scanned = exp.fn(ctx)
+            else:
+                passed, detail, rows_scanned = verdict
+            status = "passed" if passed else "failed"
         except Exception as e:
-            add_result("expect_timestamp_parseable", passed=False,
-                      detail=f"Timestamp parse error: {e}")
+            passed, detail, rows_scanned, status = False, f"Check raised {type(e).__name__}: {e}", 0, "error"
+        result = {
+            "expectation": exp.name,
+            "passed": bool(passed),
+            "detail": detail,
+            "status": status,
+            "critical": exp.critical,
+            "wall_time_ms": round((time.perf_counter() - started[exp.name]) * 1000, 3),
+            "rows_scanned": int(rows_scanned),
+        }
+        result.update(sampled)
+        return result
 
-    # ── CHECK 10: No extreme latency spikes ──────────────────
-    if "latency_ms" in df.columns:
-        p99 = df["latency_ms"].quantile(0.99)
-        extreme_spikes = (df["latency_ms"] > 5000).sum()
-        add_result(
-            "expect_no_extreme_latency_spikes",
-            passed=extreme_spikes == 0,
-            detail=f"Events with latency > 5000ms: {extreme_spikes}. P99 latency: {p99:.1f}ms"
-        )
+    def stub(exp: Expectation, status: str, detail: str) -> Dict:
+        return {
+            "expectation": exp.name, "passed": False, "detail": detail, "status": status,
+            "critical": exp.critical, "wall_time_ms": 0.0, "rows_scanned": 0,
+        }
+
+    pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="expectation")
+    try:
+        # Serial mode submits one check at a time so fast-fail keeps order
+        queue = list(expectations)
+        pending = {}
+        stop = False
+        while queue or pending:
+            while queue and not stop and (max_workers > 1 or not pending):
+                exp = queue.pop(0)
+                pending[pool.submit(timed, exp)] = exp
+            if stop:
+                for exp in queue:
+                    results[exp.name] = stub(exp, "skipped", "Skipped: fast-fail after a critical failure")
+                queue = []
+            if not pending:
+                break
+
+            done, _ = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+            for future in done:
+                exp = pending.pop(future)
+                if future.cancelled():
+                    results[exp.name] = stub(exp, "skipped", "Skipped: fast-fail after a critical failure")
+                    continue
+                results[exp.name] = future.result()
+                if fast_fail and exp.critical and not results[exp.name]["passed"]:
+                    stop = True
+                    for other_future, other in list(pending.items()):
+                        if other_future.cancel():
+                            results[other.name] = stub(
+                                other, "skipped", "Skipped: fast-fail after a critical failure"
+                            )
+                            pending.pop(other_future)
+
+            now = time.perf_counter()
+            for future, exp in list(pending.items()):
+                t0 = started.get(exp.name)
+                if t0 is None:
+                    continue
+                thread, profile_before = threads[exp.name]
+                if now - t0 - (ctx.profile_seconds(thread, now) - profile_before) > exp.timeout:
+                    results[exp.name] = stub(
+                        exp, "timeout",
+                        f"Timed out after {exp.timeout:.0f}s — still running in the background, result discarded",
+                    )
+                    results[exp.name]["wall_time_ms"] = round((now - t0) * 1000, 3)
+                    pending.pop(future)
+                    if fast_fail and exp.critical:
+                        stop = True
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return [results[e.name] for e in expectations if e.name in results]
+
+
+def _sampled_verdict(exp: Expectation, ctx: SuiteContext) -> Tuple[Optional[Tuple[bool, str, int]], Dict]:
+    """
+    Internal: Decide a check from the stratified sample, or return None as
+    the verdict when the confidence interval straddles the threshold (the
+    caller then falls back to the full scan).
+    """
+    sample = ctx.sample
+    indicator = exp.violations(sample.df)
+    estimate, low, high = estimate_rate(sample, indicator, ctx.confidence)
+    zero_tolerance = exp.max_rate == 0
+    threshold = SAMPLE_ZERO_TOLERANCE if zero_tolerance else exp.max_rate
+    info = {
+        "sampled": True,
+        "sample_size": len(sample),
+        "population": sample.population,
+        "rate_estimate": round(float(estimate), 6),
+        "rate_ci": [round(float(low), 6), round(float(high), 6)],
+        "rate_threshold": threshold,
+        "confidence": ctx.confidence,
+        "fallback_full_scan": False,
+    }
+    summary = (
+        f"Sampled {len(sample)}/{sample.population} rows: rate {estimate:.3%} "
+        f"({ctx.confidence:.0%} CI {low:.3%}–{high:.3%}, threshold {threshold:.3%})"
+    )
+
+    if zero_tolerance and indicator.any():
+        # A violation in the sample is a violation in the data — no doubt left
+        return (False, f"{summary}; {int(indicator.sum())} violating rows found", len(sample)), info
+    if high <= threshold:
+        return (True, summary, len(sample)), info
+    if low > threshold:
+        return (False, summary, len(sample)), info
+
+    info["fallback_full_scan"] = True
+    return None, info
+
+
+def _full_scan_verdict(exp: Expectation, ctx: SuiteContext) -> Tuple[bool, str, int]:
+    """Internal: Exact violation rate over the full frame (sampled-mode fallback)."""
+    indicator = exp.violations(ctx.df)
+    rate = float(indicator.mean()) if indicator.size else 0.0
+    passed = indicator.sum() == 0 if exp.max_rate == 0 else rate <= exp.max_rate
+    detail = (
+        f"Full scan (sample CI straddled the threshold): rate {rate:.3%}, "
+        f"{int(indicator.sum())} violating rows (threshold {exp.max_rate:.3%})"
+    )
+    return bool(passed), detail, len(ctx.df)
+
+
+def run_great_expectations_suite(
+    df: pd.DataFrame,
+    profile: Optional[DataFrameProfile] = None,
+    dedup_index: Optional[DedupIndex] = None,
+    group_by: Optional[Sequence[str]] = None,
+    max_workers: int = QUALITY_MAX_WORKERS,
+    fast_fail: bool = False,
+    sample_size: Optional[int] = None,
+    confidence: float = DEFAULT_CONFIDENCE,
+) -> Dict:
+    """
+    Run a Great Expectations-style validation suite.
+    
+    We implement the same logic as GE but without requiring
+    the full GE server setup (works offline, no extra config).
+
+    The checks are the registered EXPECTATIONS, run concurrently by
+    run_expectations() with per-check timing, rows scanned and timeouts;
+    `fast_fail` stops at the first critical failure.
+
+    With `sample_size` (and more rows than that) the suite runs in sampled
+    mode: rate-style checks are decided on a stratified sample (by
+    feature_name × event date, see pipeline/sampling.py) and report the
+    sample size and a confidence interval on the violation rate. A check
+    whose interval straddles its threshold falls back to a full scan.
+    Zero-tolerance checks pass on a sample only when the rate is below
+    SAMPLE_ZERO_TOLERANCE; checks without a row-level rate (duplicates,
+    required columns, row count) always use the full frame.
+
+    Column-level expectations are evaluated from `profile` (computed here
+    if not passed), so the frame itself is only scanned for the checks a
+    profile can't answer (duplicates, timestamp parsing).
+
+    Duplicates are found on hashed (user_id, timestamp) keys; with a
+    `dedup_index` (see pipeline/dedup.py) events already seen by earlier
+    batches or runs count as duplicates too.
+
+    With `group_by` (e.g. ["feature_name"]) the row-level expectations are
+    also evaluated per group — see run_grouped_expectations() — and the
+    report gains a "groups" section, so a problem confined to one feature
+    shows up before it moves the global numbers.
+    
+    Returns a report dict with:
+    - passed: True/False overall
+    - results: list of individual check results
+    - score: % of checks that passed
+    """
+    suite_start = time.perf_counter()
+    sample = None
+    if sample_size is not None and len(df) > sample_size:
+        strata = [c for c in ("feature_name",) if c in df.columns]
+        strata += ["date"] if "timestamp" in df.columns else []
+        sample = stratified_sample(df, sample_size, strata)
+    elif profile is None:
+        profile = profile_dataframe(df)
+
+    ctx = SuiteContext(
+        df=df, cached_profile=profile, dedup_index=dedup_index,
+        sample=sample, confidence=confidence,
+    )
+    all_results = run_expectations(ctx, max_workers=max_workers, fast_fail=fast_fail)
+    results = [r for r in all_results if r["status"] != "skipped"]
+    skipped = [r["expectation"] for r in all_results if r["status"] == "skipped"]
 
     # ── BUILD FINAL REPORT ────────────────────────────────────
     total = len(results)
@@ -153,8 +541,26 @@ def run_great_expectations_suite(df: pd.DataFrame) -> Dict:
         "overall_passed": len(failed) == 0,
         "failures": failed,
         "results": results,
+        "skipped": skipped,
+        "fast_fail": fast_fail,
+        "mode": "sampled" if sample is not None else "full",
+        "sample_size": len(sample) if sample is not None else None,
+        "sampled_fallbacks": [r["expectation"] for r in results if r.get("fallback_full_scan")],
+        # Timed-out checks can't be stopped: they keep running (and holding
+        # a thread) until they finish; only their results are dropped
+        "timed_out_still_running": [r["expectation"] for r in results if r["status"] == "timeout"],
+        "wall_time_ms": round((time.perf_counter() - suite_start) * 1000, 3),
+        "slowest_check": max(results, key=lambda r: r["wall_time_ms"])["expectation"] if results else None,
     }
 
+    if group_by:
+        groups = run_grouped_expectations(df, group_by)
+        failing = groups[~groups["passed"]]
+        report["group_by"] = list(group_by)
+        report["groups_total"] = int(len(groups))
+        report["groups_failed"] = int(len(failing))
+        report["groups"] = groups.to_dict(orient="records")
+
     # Saving report to disk
     report_file = QUALITY_REPORT_PATH / "latest_quality_report.json"
     with open(report_file, "w") as f:
@@ -169,25 +575,137 @@ def run_great_expectations_suite(df: pd.DataFrame) -> Dict:
         for f_check in failed:
             logger.warning(f"  FAILED: {f_check['expectation']} → {f_check['detail']}")
 
+    if group_by:
+        logger.info(
+            f"Grouped quality | by={list(group_by)} | "
+            f"groups_failed={report['groups_failed']}/{report['groups_total']}"
+        )
+        for row in failing.head(10).to_dict(orient="records"):
+            label = ", ".join(f"{c}={row[c]}" for c in group_by)
+            logger.warning(f"  GROUP FAILED: {label} → {row['failed_expectations']}")
+
     return report
 
 
+def run_grouped_expectations(df: pd.DataFrame, group_by: Sequence[str]) -> pd.DataFrame:
+    """
+    Evaluate the row-level expectations per group in ONE groupby
+    aggregation: each expectation is first turned into a vectorized per-row
+    indicator column, then a single groupby().agg() sums/averages them for
+    every group at once (no Python loop over groups, so thousands of
+    features cost about the same as a handful).
+
+    Args:
+        df: Raw events
+        group_by: Grouping columns (e.g. ["feature_name"] or
+                  ["feature_name", "platform"])
+
+    Returns:
+        One row per group: the group keys, rows, the measured metrics,
+        one boolean column per expectation, `passed` and a
+        `failed_expectations` list
+    """
+    group_by = list(group_by)
+    missing = [c for c in group_by if c not in df.columns]
+    if missing:
+        raise ValueError(f"run_grouped_expectations: Missing group columns: {missing}")
+
+    # ── Per-row indicators (all vectorized) ──────────────────
+    indicators = pd.DataFrame(index=df.index)
+    aggs: Dict[str, Tuple[str, str]] = {"rows": ("_one", "size")}
+    indicators["_one"] = 1
+    for col in ["latency_ms", "crash_flag", "feedback_score"]:
+        if col in df.columns:
+            indicators[f"_null_{col}"] = df[col].isnull().to_numpy()
+            aggs[f"null_rate_{col}"] = (f"_null_{col}", "mean")
+    if "latency_ms" in df.columns:
+        indicators["_latency"] = df["latency_ms"].to_numpy(dtype="float64", na_value=np.nan)
+        indicators["_spike"] = indicators["_latency"] > SPIKE_LATENCY_MS
+        aggs["min_latency"] = ("_latency", "min")
+        aggs["max_latency"] = ("_latency", "max")
+        aggs["latency_spikes"] = ("_spike", "sum")
+    if "crash_flag" in df.columns:
+        crash = df["crash_flag"].to_numpy(dtype="float64", na_value=np.nan)
+        indicators["_non_binary_crash"] = ~np.isnan(crash) & (crash != 0) & (crash != 1)
+        aggs["non_binary_crash_flags"] = ("_non_binary_crash", "sum")
+    if "feedback_score" in df.columns:
+        feedback = df["feedback_score"].to_numpy(dtype="float64", na_value=np.nan)
+        lo, hi = FEEDBACK_RANGE
+        indicators["_bad_feedback"] = (feedback < lo) | (feedback > hi)
+        aggs["feedback_out_of_range"] = ("_bad_feedback", "sum")
+    if "user_id" in df.columns and "timestamp" in df.columns:
+        indicators["_duplicate"] = duplicate_mask(hash_keys(df))
+        aggs["duplicate_events"] = ("_duplicate", "sum")
+    if "timestamp" in df.columns:
+        indicators["_bad_timestamp"] = _unparseable_timestamps(df)
+        aggs["unparseable_timestamps"] = ("_bad_timestamp", "sum")
+    for col in group_by:
+        indicators[col] = df[col].to_numpy()
+
+    # ── One aggregation for every group ──────────────────────
+    groups = (
+        indicators.groupby(group_by, observed=True, sort=True, dropna=False)
+        .agg(**aggs)
+        .reset_index()
+    )
+
+    # ── Vectorized pass/fail per expectation ─────────────────
+    expectations = {}
+    for col in ["latency_ms", "crash_flag", "feedback_score"]:
+        if f"null_rate_{col}" in groups:
+            expectations[f"expect_column_null_rate_below_threshold_{col}"] = (
+                groups[f"null_rate_{col}"] <= NULL_RATE_THRESHOLD
+            )
+    if "min_latency" in groups:
+        lo, hi = LATENCY_RANGE_MS
+        # A group whose latencies are all null has nothing out of range
+        expectations["expect_latency_in_valid_range"] = ~(
+            (groups["min_latency"] < lo) | (groups["max_latency"] > hi)
+        )
+        expectations["expect_no_extreme_latency_spikes"] = groups["latency_spikes"] == 0
+    if "non_binary_crash_flags" in groups:
+        expectations["expect_crash_flag_is_binary"] = groups["non_binary_crash_flags"] == 0
+    if "feedback_out_of_range" in groups:
+        expectations["expect_feedback_score_between_1_and_5"] = groups["feedback_out_of_range"] == 0
+    if "duplicate_events" in groups:
+        expectations["expect_no_duplicate_events"] = groups["duplicate_events"] == 0
+    if "unparseable_timestamps" in groups:
+        expectations["expect_timestamp_parseable"] = groups["unparseable_timestamps"] == 0
+
+    checks = pd.DataFrame(expectations)
+    groups = pd.concat([groups, checks], axis=1)
+    groups["passed"] = checks.all(axis=1)
+    failed = ~checks
+    groups["failed_expectations"] = [
+        list(checks.columns[row]) for row in failed.to_numpy()
+    ]
+    return groups
+
+
 # ─────────────────────────────────────────────
 
 
-def check_null_rates(df: pd.DataFrame, threshold: float = 0.2) -> bool:
+def check_null_rates(
+    df: pd.DataFrame, threshold: float = 0.2, profile: Optional[DataFrameProfile] = None
+) -> bool:
     """Original null rate check — kept for existing tests."""
-    null_rates = df.isnull().mean()
-    high_null_cols = null_rates[null_rates > threshold]
-    if not high_null_cols.empty:
+    if profile is not None:
+        high_null_cols = [c for c, p in profile.columns.items() if p.null_rate > threshold]
+    else:
+        null_rates = df.isnull().mean()
+        high_null_cols = list(null_rates[null_rates > threshold].index)
+    if high_null_cols:
         raise ValueError(
-            f"Null rate exceeded threshold for columns: {list(high_null_cols.index)}"
+            f"Null rate exceeded threshold for columns: {high_null_cols}"
         )
     return True
 
 
-def check_latency_outliers(df: pd.DataFrame, max_latency: float = 5000) -> bool:
+def check_latency_outliers(
+    df: pd.DataFrame, max_latency: float = 5000, profile: Optional[DataFrameProfile] = None
+) -> bool:
     """Original latency check — kept for existing tests."""
-    if df["latency_ms"].max() > max_latency:
+    max_seen = profile["latency_ms"].max if profile is not None else df["latency_ms"].max()
+    if max_seen > max_latency:
         raise ValueError("Extreme latency spike detected")
     return True
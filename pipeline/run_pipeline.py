@@ -5,7 +5,9 @@ import time
 from datetime import datetime, timezone
 from pathlib import Path
 
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Repo root on the path so every module loads once, as pipeline.* — also
+# when this file is run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # ── Logging setup ─────────────────────────────────────────────
 os.makedirs("logs", exist_ok=True)
@@ -20,63 +22,201 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # ── Imports ───────────────────────────────────────────────────
-from ingest import load_raw_data
-from validate import validate_schema
-from transform import engineer_features
-from aggregate import aggregate_daily
-from quality_checks import check_null_rates, check_latency_outliers, run_great_expectations_suite
-from score import MLConfig, create_target, train_model, score_dataframe, save_artifacts, compute_shap_values
-from monitoring.baseline import compute_baseline, save_baseline, load_baseline
-from monitoring.drift import detect_data_drift, save_data_drift
-from monitoring.run_report import save_run_report
+from pipeline.ingest import (
+    BRONZE_FILE_INDEX_COLUMN, GOLD_PATH, bronze_copies, load_raw_data, load_bronze_data, ingest_raw_to_bronze,
+    parse_timestamps,
+)
+from pipeline.validate import validate_schema
+from pipeline.transform import engineer_features
+from pipeline.aggregate import (
+    AGGREGATE_INPUT_COLUMNS, daily_to_partial_aggregates, finalize_partial_aggregates,
+    latency_digests, merge_latency_digests, merge_partial_aggregates, partial_aggregates,
+)
+from pipeline.incremental import pending_bronze_files, commit_watermark, pipeline_lock
+from pipeline.gold import materialize_gold
+from pipeline.sql_models import MODEL_ERRORS, fact_feature_metrics, run_analytical_queries, run_sql_models
+from pipeline.dtypes import memory_report
+from pipeline.profiling import profile_dataframe
+from pipeline.dedup import DEDUP_KEY_COLUMNS, DedupIndex, counted_mask, event_windows, hash_keys
+from pipeline.quality_checks import check_null_rates, check_latency_outliers, run_great_expectations_suite
+from pipeline.score import (
+    MLConfig, create_target, train_model, score_dataframe, save_artifacts, compute_shap_values,
+)
+from pipeline.monitoring.baseline import compute_baseline, save_baseline, load_baseline
+from pipeline.monitoring.drift import detect_data_drift, save_data_drift
+from pipeline.monitoring.run_report import save_run_report
 
 import pandas as pd
+import pyarrow.parquet as pq
 
 # ── Config ────────────────────────────────────────────────────
 RAW_PATH = "data/raw/product_logs.csv"
 OUTPUT_PATH = "data/processed/feature_metrics.csv"
-
-
-def log_data_profile(df):
+# Per feature-day sums/counts behind OUTPUT_PATH — incremental runs add a
+# batch's partials to these instead of re-reading earlier events
+DAILY_PARTIALS_PATH = "data/processed/daily_partials.parquet"
+# Per feature-day latency t-digests — incremental runs merge a batch's
+# digests into these to update the latency percentiles of the days it touches
+LATENCY_DIGESTS_PATH = "data/processed/latency_digests.parquet"
+MEMORY_REPORT_PATH = "artifacts/reports/memory_report.csv"
+# Hashed (user_id, timestamp) keys of every event counted in the current
+# outputs, one file per event date. Incremental runs drop events already
+# in it — a re-landed (e.g. grown) export, or an older Bronze copy of one,
+# is only counted once — and the quality suite reports them. A full run
+# rebuilds it. Dates beyond the last DEDUP_INDEX_WINDOWS are forgotten, so
+# a batch reads only the dates it touches
+DEDUP_INDEX_PATH = "data/bronze/_dedup_index"
+DEDUP_INDEX_WINDOWS = 90
+# Quality expectations are also evaluated per group of these columns
+QUALITY_GROUP_BY = ["feature_name"]
+# Decide rate-style quality checks on a stratified sample of this many rows
+# (None = always scan every row) — see pipeline/sampling.py
+QUALITY_SAMPLE_SIZE = None
+
+# "compact" = categorical labels, int8 flags, float32 metrics, Arrow strings
+# (see pipeline/dtypes.py); "default" = pandas-inferred dtypes
+DTYPE_PROFILE = "compact"
+
+# Estimate percentiles (quality p99, anomaly p95, target thresholds) with
+# t-digest sketches instead of exact sorts — see pipeline/sketches.py
+APPROX_QUANTILES = False
+
+# Worker processes for the row-local feature steps (1 = serial). Only
+# worth raising on multi-core hosts; frames below
+# transform.PARALLEL_MIN_ROWS are always transformed serially
+TRANSFORM_WORKERS = 1
+
+# Group-by engine for the daily aggregates: "pandas" or "arrow" (pyarrow's
+# multi-threaded hash group-by) — see `python -m pipeline.benchmark_aggregate`
+AGGREGATION_BACKEND = "pandas"
+
+# Also run the dbt_project SQL models (and models/analytical_queries.sql)
+# in-process over Bronze: None = off, "duckdb" = embedded DuckDB — see
+# pipeline/sql_models.py
+SQL_MODELS_ENGINE = None
+# DuckDB spills intermediates to disk past this limit (None = its default)
+SQL_MODELS_MEMORY_LIMIT = None
+SQL_MODELS_OUTPUT_PATH = Path("data/processed")
+ANALYTICAL_QUERIES_REPORT_PATH = Path("artifacts/reports/analytical_queries")
+
+
+def log_data_profile(df, profile=None):
     """Log basic data profile stats for the ingested DataFrame."""
     logger.info(f"Row count: {len(df)}")
     logger.info(f"Column count: {len(df.columns)}")
     logger.info(f"Columns: {list(df.columns)}")
     if "latency_ms" in df.columns:
+        latency = (profile or profile_dataframe(df, columns=["latency_ms"]))["latency_ms"]
         logger.info(
-            f"Latency stats | min: {df['latency_ms'].min()}, "
-            f"max: {df['latency_ms'].max()}, "
-            f"mean: {df['latency_ms'].mean():.2f}"
+            f"Latency stats | min: {latency.min}, "
+            f"max: {latency.max}, "
+            f"mean: {latency.mean:.2f}"
         )
 
 
-def run():
-  
+def run(incremental: bool = False, force_retrain: bool = False):
+    """
+    Run the full pipeline.
+
+    Args:
+        incremental: Only process Bronze files that no previous successful
+                     run consumed, and merge their aggregates into the
+                     existing processed output instead of rebuilding it.
+        force_retrain: Retrain the risk model even when the model cache
+                       holds one for the same aggregates and config.
+
+    Holds the pipeline lock (see pipeline/incremental.py) throughout, so
+    compaction can't merge Bronze files between this run reading them and
+    committing them; a second run waits for the first.
+    """
+    with pipeline_lock():
+        _run(incremental, force_retrain)
+
+
+def _run(incremental: bool, force_retrain: bool) -> None:
+    """Internal: The pipeline steps behind run()."""
     start_time = time.time()
     runtime = 0.0
     rows_processed = 0
+    mode = "incremental" if incremental else "full"
 
     try:
         logger.info(f"Pipeline started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
         # ── STEP 1: Ingestion ─────────────────────────────────
         logger.info("---------- STEP 1: INGESTION ----------")
-        df = load_raw_data(RAW_PATH)
+        dedup_index = DedupIndex.load(DEDUP_INDEX_PATH, max_windows=DEDUP_INDEX_WINDOWS)
+        if incremental:
+            # Land the raw export in Bronze (skipped if unchanged), then read
+            # only the Bronze files that arrived since the last committed run
+            ingest_raw_to_bronze(RAW_PATH)
+            bronze_files = pending_bronze_files()
+            df = pd.DataFrame()
+            if bronze_files:
+                df = load_bronze_data(files=bronze_files, dtype_profile=DTYPE_PROFILE, with_file_index=True)
+                event_keys, event_key_windows = hash_keys(df), event_windows(df)
+                # Events an earlier run — or an earlier file of this batch —
+                # already counted: a grown export is re-landed in full, and
+                # older copies of an export may still sit in Bronze
+                counted = counted_mask(
+                    event_keys, dedup_index, event_key_windows,
+                    sources=df.pop(BRONZE_FILE_INDEX_COLUMN).to_numpy(),
+                )
+                if counted.any():
+                    df = df[~counted]
+                    event_keys, event_key_windows = event_keys[~counted], event_key_windows[~counted]
+                logger.info(
+                    f"Incremental run: {len(bronze_files)} new Bronze files, {len(df)} new rows "
+                    f"({int(counted.sum())} already counted, dropped)"
+                )
+            if df.empty:
+                if bronze_files:
+                    commit_watermark(bronze_files)
+                logger.info("Incremental run: no new events — nothing to process")
+                save_run_report({
+                    "status": "skipped",
+                    "mode": mode,
+                    "bronze_files_consumed": len(bronze_files),
+                    "run_timestamp": datetime.now(timezone.utc).isoformat(),
+                    "rows_processed": 0,
+                    "runtime_seconds": round(time.time() - start_time, 2),
+                })
+                return
+        else:
+            df = load_raw_data(RAW_PATH, dtype_profile=DTYPE_PROFILE)
+            # The Bronze copy of this export is what a full run consumes
+            bronze_files = bronze_copies(RAW_PATH)
+            keys = parse_timestamps(df[list(DEDUP_KEY_COLUMNS)].copy())
+            event_keys, event_key_windows = hash_keys(keys), event_windows(keys)
+            del keys
         df = validate_schema(df, stage="raw")
         logger.info("Raw data loaded successfully")
-        log_data_profile(df)
+
+        # One profile of the raw frame feeds the run log, the drift baseline,
+        # the drift check and the quality suite
+        raw_profile = profile_dataframe(df, approximate=APPROX_QUANTILES)
+        log_data_profile(df, raw_profile)
+
+        mem = memory_report(df)
+        os.makedirs(os.path.dirname(MEMORY_REPORT_PATH), exist_ok=True)
+        mem.to_csv(MEMORY_REPORT_PATH, index=False)
+        logger.info(
+            f"Memory | profile={DTYPE_PROFILE} | "
+            f"bytes/row default={mem['default_bytes_per_row'].iloc[-1]} → "
+            f"compact={mem['compact_bytes_per_row'].iloc[-1]}"
+        )
 
         # ── STEP 2: Baseline + Drift Detection ───────────────
         logger.info("---------- STEP 2: DRIFT DETECTION ----------")
         baseline = load_baseline()
-        current_stats = compute_baseline(df)
+        current_stats = compute_baseline(df, raw_profile)
 
         if baseline is None:
             logger.info("No baseline found. Creating baseline_stats.json (first run only).")
             save_baseline(current_stats)
             drift_report = {"alerts": [], "alert_count": 0, "overall_drift_detected": False}
         else:
-            drift_report = detect_data_drift(df, baseline, threshold=0.20)
+            drift_report = detect_data_drift(df, baseline, threshold=0.20, profile=raw_profile)
             save_data_drift(drift_report)
 
             if drift_report["alerts"]:
@@ -88,38 +228,81 @@ def run():
 
         # ── STEP 3: Data Quality Checks ──────────────────────
         logger.info("---------- STEP 3: DATA QUALITY ----------")
-        quality_report = run_great_expectations_suite(df)
+        quality_report = run_great_expectations_suite(
+            df, raw_profile, dedup_index if incremental else None, group_by=QUALITY_GROUP_BY,
+            sample_size=QUALITY_SAMPLE_SIZE,
+        )
         logger.info(
             f"Quality suite | score={quality_report['score_pct']}% | "
             f"passed={quality_report['passed']}/{quality_report['total_checks']}"
         )
 
-        check_null_rates(df)
+        check_null_rates(df, profile=raw_profile)
         logger.info("Null rate validation passed")
 
-        check_latency_outliers(df)
+        check_latency_outliers(df, profile=raw_profile)
         logger.info("Latency threshold validation passed")
 
         # ── STEP 4: Feature Engineering ──────────────────────
         logger.info("---------- STEP 4: FEATURE ENGINEERING ----------")
-        df = engineer_features(df)
+        # Every feature goes to Silver; only the aggregation inputs stay in memory
+        if incremental:
+            run_ts = datetime.now(timezone.utc).strftime("%H%M%S_%f")
+            df = engineer_features(
+                df,
+                silver_filename=f"transformed_events_{run_ts}.parquet",
+                dtype_profile=DTYPE_PROFILE,
+                approx_quantiles=APPROX_QUANTILES,
+                workers=TRANSFORM_WORKERS,
+                columns=AGGREGATE_INPUT_COLUMNS,
+            )
+        else:
+            df = engineer_features(
+                df,
+                dtype_profile=DTYPE_PROFILE,
+                approx_quantiles=APPROX_QUANTILES,
+                workers=TRANSFORM_WORKERS,
+                columns=AGGREGATE_INPUT_COLUMNS,
+            )
         logger.info("Feature engineering completed")
 
         # ── STEP 5: Aggregation ───────────────────────────────
         logger.info("---------- STEP 5: AGGREGATION ----------")
-        df = aggregate_daily(df)
+        # The event-level inputs are kept for the Gold rollups (step 9)
+        events = df
+        partials = partial_aggregates(events, backend=AGGREGATION_BACKEND)
+        # Exact latency percentiles of this batch, plus digests to merge later
+        digests = latency_digests(events)
         logger.info("Daily aggregation completed")
 
+        if incremental:
+            history = None
+            if os.path.exists(DAILY_PARTIALS_PATH):
+                history = pd.read_parquet(DAILY_PARTIALS_PATH)
+            elif os.path.exists(OUTPUT_PATH):
+                # Output from before partials were kept — seed them from it
+                history = daily_to_partial_aggregates(pd.read_csv(OUTPUT_PATH))
+            if history is not None:
+                new_days = len(partials)
+                partials = merge_partial_aggregates(history, partials)
+                logger.info(
+                    f"Merged new batch into existing aggregates → {len(partials)} feature-day rows "
+                    f"({new_days} updated)"
+                )
+            if os.path.exists(LATENCY_DIGESTS_PATH):
+                digests = merge_latency_digests(pd.read_parquet(LATENCY_DIGESTS_PATH), digests)
+        df = finalize_partial_aggregates(partials, percentiles=digests)
+
         df = validate_schema(df, stage="processed")
         logger.info("Processed schema validation passed")
 
         # ── STEP 6: ML Risk Scoring ───────────────────────────
         logger.info("---------- STEP 6: ML RISK SCORING ----------")
-        config = MLConfig()
+        config = MLConfig(approx_quantiles=APPROX_QUANTILES)
         df = create_target(df, config)
-        model, metrics = train_model(df, config)
+        model, metrics = train_model(df, config, force_retrain=force_retrain)
         df = score_dataframe(df, model, config)
-        logger.info("ML layer completed")
+        logger.info(f"ML layer completed ({'cached model' if metrics.get('cache_hit') else 'trained'})")
         logger.info(
             f"Metrics | AUC={metrics.get('roc_auc', 'N/A')} | "
             f"ACC={metrics.get('accuracy', 'N/A')}"
@@ -128,7 +311,7 @@ def run():
         # ── STEP 7: Save Artifacts ────────────────────────────
         logger.info("---------- STEP 7: SAVE ARTIFACTS ----------")
         fi = pd.DataFrame({
-            "feature": list(config.feature_cols),
+            "feature": metrics["feature_cols"],
             "importance": model.feature_importances_,
         }).sort_values("importance", ascending=False)
 
@@ -148,8 +331,28 @@ def run():
         logger.info("---------- STEP 9: SAVE OUTPUT ----------")
         os.makedirs("data/processed", exist_ok=True)
         df.to_csv(OUTPUT_PATH, index=False)
+        partials.to_parquet(DAILY_PARTIALS_PATH, index=False)
+        digests.to_parquet(LATENCY_DIGESTS_PATH, index=False)
         logger.info(f"Processed data saved to {OUTPUT_PATH}")
 
+        # Hourly/daily/weekly rollups; incremental batches are merged into
+        # the partitions they touch, so this runs only once nothing else can fail
+        gold_paths = materialize_gold(events, merge=incremental)
+        del events
+        logger.info(f"Gold rollups saved to {GOLD_PATH} ({sum(map(len, gold_paths.values()))} partitions)")
+
+        # A full run's outputs hold only this export: everything else in
+        # Bronze is pending again, and only its events have been counted
+        commit_watermark(bronze_files, reset=not incremental)
+        if not incremental:
+            dedup_index.clear()
+        dedup_index.add(event_keys, window=event_key_windows)
+        dedup_index.save()
+
+        # Optional extra outputs: failures are logged, the batch stays committed
+        if SQL_MODELS_ENGINE == "duckdb":
+            run_sql_engine(df)
+
     
         rows_processed = int(len(df))
         runtime = round(time.time() - start_time, 2)
@@ -159,6 +362,8 @@ def run():
         # ── STEP 10: Run Report ───────────────────────────────
         save_run_report({
             "status": "success",
+            "mode": mode,
+            "bronze_files_consumed": len(bronze_files),
             "run_timestamp": datetime.now(timezone.utc).isoformat(),
             "rows_processed": rows_processed,
             "output_path": OUTPUT_PATH,
@@ -167,6 +372,7 @@ def run():
             "ml_accuracy": metrics.get("accuracy"),
             "quality_score_pct": quality_report["score_pct"],
             "quality_checks_passed": quality_report["passed"],
+            "quality_groups_failed": quality_report.get("groups_failed", 0),
             "drift_alerts": drift_report.get("alert_count", 0),
             "drift_detected": drift_report.get("overall_drift_detected", False),
         })
@@ -180,6 +386,7 @@ def run():
 
         save_run_report({
             "status": "failed",
+            "mode": mode,
             "run_timestamp": datetime.now(timezone.utc).isoformat(),
             "runtime_seconds": runtime,
             "rows_processed": rows_processed,
@@ -188,5 +395,40 @@ def run():
         raise
 
 
+def run_sql_engine(processed: pd.DataFrame) -> None:
+    """
+    Run the dbt models in-process over Bronze and save each resulting table
+    to SQL_MODELS_OUTPUT_PATH, then run the analytical queries against the
+    scored feature-days. Skipped with a warning when duckdb isn't installed.
+
+    Runs after the batch is committed, so an error in the SQL models is
+    logged (at error level, with its traceback) rather than failing a run
+    whose outputs are already saved. Anything else still raises.
+    """
+    try:
+        tables = run_sql_models(memory_limit=SQL_MODELS_MEMORY_LIMIT)
+        reports = run_analytical_queries({"fact_feature_metrics": fact_feature_metrics(processed)})
+
+        for name, table in tables.items():
+            pq.write_table(table, SQL_MODELS_OUTPUT_PATH / f"{name}.parquet")
+            logger.info(f"SQL model {name} saved ({table.num_rows} rows)")
+        ANALYTICAL_QUERIES_REPORT_PATH.mkdir(parents=True, exist_ok=True)
+        for i, table in enumerate(reports, start=1):
+            if table is not None:
+                table.to_pandas().to_csv(ANALYTICAL_QUERIES_REPORT_PATH / f"query_{i}.csv", index=False)
+    except ImportError as e:
+        logger.warning(f"SQL models skipped: {e}")
+    except MODEL_ERRORS:
+        logger.exception("SQL models failed — pipeline outputs unaffected")
+
+
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Feature Quality Analytics pipeline")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only process Bronze files added since the last successful run")
+    parser.add_argument("--force-retrain", action="store_true",
+                        help="Retrain the risk model even if a cached one matches")
+    args = parser.parse_args()
+    run(incremental=args.incremental, force_retrain=args.force_retrain)
\ No newline at end of file
@@ -0,0 +1,145 @@
+import logging
+from dataclasses import dataclass
+from typing import Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────────
+# STRATIFIED SAMPLING
+#   Draws a proportional sample from every stratum (feature_name × event
+#   date by default, so small features are never missed) and estimates
+#   row-level rates from it with a confidence interval, using the standard
+#   stratified estimator:
+#       p̂ = Σ W_h·p̂_h,   Var(p̂) = Σ W_h²·(1 − n_h/N_h)·p̂_h(1 − p̂_h)/(n_h − 1)
+#   where W_h = N_h/N is the stratum's share of the population.
+#   The variance term needs n_h ≥ 2, so every stratum gets at least
+#   MIN_STRATUM_SAMPLE rows — or all of its rows, when it has fewer (it is
+#   then fully observed and adds no variance).
+# ─────────────────────────────────────────────
+
+DEFAULT_STRATA = ("feature_name", "date")
+DEFAULT_CONFIDENCE = 0.95
+MIN_STRATUM_SAMPLE = 2
+
+
+@dataclass
+class StratifiedSample:
+    """A stratified sample plus what's needed to weight estimates back up."""
+    df: pd.DataFrame
+    strata: np.ndarray          # stratum code of each sampled row
+    population_sizes: np.ndarray  # N_h per stratum code
+    sample_sizes: np.ndarray      # n_h per stratum code
+
+    @property
+    def population(self) -> int:
+        return int(self.population_sizes.sum())
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+
+def stratum_codes(df: pd.DataFrame, strata: Sequence[str] = DEFAULT_STRATA) -> np.ndarray:
+    """
+    Integer stratum code per row. A "date" stratum not present as a column
+    is taken from the integer `day_key` added at ingest, else derived from
+    `timestamp` (its first 10 characters for raw strings).
+    """
+    keys = []
+    for col in strata:
+        if col in df.columns:
+            keys.append(df[col])
+        elif col == "date" and "day_key" in df.columns:
+            keys.append(df["day_key"])
+        elif col == "date" and "timestamp" in df.columns:
+            ts = df["timestamp"]
+            if pd.api.types.is_datetime64_any_dtype(ts):
+                keys.append(ts.dt.normalize())
+            else:
+                keys.append(ts.astype("string[pyarrow]").str.slice(0, 10))
+        else:
+            raise ValueError(f"stratum_codes: Unknown stratum column '{col}'")
+    if not keys:
+        return np.zeros(len(df), dtype=np.int64)
+    frame = pd.concat(keys, axis=1, keys=range(len(keys)))
+    return frame.groupby(list(range(len(keys))), observed=True, sort=False, dropna=False).ngroup().to_numpy()
+
+
+def stratified_sample(
+    df: pd.DataFrame,
+    sample_size: int,
+    strata: Sequence[str] = DEFAULT_STRATA,
+    seed: int = 42,
+) -> StratifiedSample:
+    """
+    Proportionally allocated stratified sample of about `sample_size` rows
+    (at least MIN_STRATUM_SAMPLE per stratum, or the whole stratum if it is
+    smaller), drawn without a Python loop over strata.
+    """
+    codes = stratum_codes(df, strata)
+    population_sizes = np.bincount(codes) if codes.size else np.zeros(0, dtype=np.int64)
+    fraction = min(1.0, sample_size / max(len(df), 1))
+    sample_sizes = np.clip(
+        np.round(population_sizes * fraction), MIN_STRATUM_SAMPLE, population_sizes
+    ).astype(np.int64)
+
+    # Random order within each stratum; keep the first n_h rows of each
+    rng = np.random.default_rng(seed)
+    order = np.lexsort((rng.random(codes.size), codes))
+    sorted_codes = codes[order]
+    group_start = np.searchsorted(sorted_codes, sorted_codes, side="left")
+    position = np.arange(codes.size) - group_start
+    keep = np.sort(order[position < sample_sizes[sorted_codes]])
+
+    logger.info(
+        f"stratified_sample | population={len(df)} | sample={keep.size} | "
+        f"strata={population_sizes.size}"
+    )
+    return StratifiedSample(
+        df=df.iloc[keep],
+        strata=codes[keep],
+        population_sizes=population_sizes,
+        sample_sizes=sample_sizes,
+    )
+
+
+def estimate_rate(
+    sample: StratifiedSample,
+    indicator: np.ndarray,
+    confidence: float = DEFAULT_CONFIDENCE,
+) -> Tuple[float, float, float]:
+    """
+    Stratified estimate of the population rate of a per-row boolean
+    `indicator` (aligned with sample.df).
+
+    Returns:
+        (estimate, ci_low, ci_high). When the sample holds no positive at
+        all the upper bound is the Wilson bound z²/(n + z²) — a sample can
+        never prove a rate is exactly zero.
+    """
+    z = stats.norm.ppf(0.5 + confidence / 2)
+    indicator = np.asarray(indicator, dtype=bool)
+    n = indicator.size
+    if n == 0:
+        return 0.0, 0.0, 1.0
+
+    hits = np.bincount(sample.strata, weights=indicator, minlength=sample.population_sizes.size)
+    n_h = sample.sample_sizes.astype("float64")
+    N_h = sample.population_sizes.astype("float64")
+    weights = N_h / N_h.sum()
+    p_h = hits / n_h
+
+    estimate = float((weights * p_h).sum())
+    if (n_h >= N_h).all():
+        return estimate, estimate, estimate  # the "sample" is the whole population
+    if hits.sum() == 0:
+        return 0.0, 0.0, float(z ** 2 / (n + z ** 2))
+
+    fpc = 1 - n_h / N_h
+    variance = float((weights ** 2 * fpc * p_h * (1 - p_h) / np.maximum(n_h - 1, 1)).sum())
+    half_width = z * np.sqrt(variance)
+    return estimate, max(0.0, estimate - half_width), min(1.0, estimate + half_width)
@@ -1,14 +1,18 @@
 from __future__ import annotations
+import hashlib
 import json
 import logging
-from dataclasses import dataclass
+import os
+import time
+from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import joblib
 import numpy as np
 import pandas as pd
+import sklearn
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import (
     accuracy_score,
@@ -20,6 +24,9 @@ from sklearn.metrics import (
 from sklearn.model_selection import StratifiedKFold, cross_val_score, train_test_split
 from sklearn.preprocessing import RobustScaler
 
+from pipeline.ingest import write_partitioned
+from pipeline.sketches import approx_quantile
+
 logger = logging.getLogger(__name__)
 
 MODELS_PATH = Path("models")
@@ -30,10 +37,27 @@ MODELS_PATH.mkdir(parents=True, exist_ok=True)
 ARTIFACTS_PATH.mkdir(parents=True, exist_ok=True)
 SILVER_PATH.mkdir(parents=True, exist_ok=True)
 
+# ─────────────────────────────────────────────
+# MODEL CACHE
+#   train_model() results keyed by a fingerprint of the cleaned training
+#   frame (features + label, row order included — it drives the split),
+#   the MLConfig and the scikit-learn version. A run whose aggregates and
+#   config haven't changed gets the stored model and metrics back instead
+#   of refitting the forest and the CV ensemble. Entries beyond
+#   MODEL_CACHE_MAX_ENTRIES (oldest first) or older than
+#   MODEL_CACHE_MAX_AGE_DAYS are evicted whenever a new one is stored.
+# ─────────────────────────────────────────────
+
+MODEL_CACHE_PATH = MODELS_PATH / "cache"
+MODEL_CACHE_MAX_ENTRIES = 10
+MODEL_CACHE_MAX_AGE_DAYS = 30
+
 
 @dataclass
 class MLConfig:
     label_col: str = "is_high_risk"
+    # Any aggregate_daily() column works here — e.g. add the latency tail
+    # ("latency_p95", "latency_p99"; also "latency_p50") to the defaults
     feature_cols: Tuple[str, ...] = (
         "avg_latency", "crash_rate", "avg_feedback",
         "usage_count", "avg_error_count",
@@ -43,6 +67,8 @@ class MLConfig:
     n_estimators: int = 300
     max_depth: Optional[int] = 8
     min_samples_leaf: int = 2
+    # Estimate create_target thresholds with a t-digest (pipeline/sketches.py)
+    approx_quantiles: bool = False
 
 
 def create_target(df: pd.DataFrame, config: MLConfig) -> pd.DataFrame:
@@ -65,10 +91,11 @@ def create_target(df: pd.DataFrame, config: MLConfig) -> pd.DataFrame:
 
     # Moderate thresholds — 75th/25th percentile
     # Produces ~15-25% positive rate for meaningful ML signal
-    crash_thr    = df["crash_rate"].quantile(0.75)
-    latency_thr  = df["avg_latency"].quantile(0.75)
-    feedback_thr = df["avg_feedback"].quantile(0.25)
-    error_thr    = df["avg_error_count"].quantile(0.75) if "avg_error_count" in df.columns else None
+    quantile = _approx_quantile if config.approx_quantiles else _exact_quantile
+    crash_thr    = quantile(df["crash_rate"], 0.75)
+    latency_thr  = quantile(df["avg_latency"], 0.75)
+    feedback_thr = quantile(df["avg_feedback"], 0.25)
+    error_thr    = quantile(df["avg_error_count"], 0.75) if "avg_error_count" in df.columns else None
 
     # Score: how many conditions does each row breach?
     risk_score = (
@@ -105,9 +132,19 @@ def create_target(df: pd.DataFrame, config: MLConfig) -> pd.DataFrame:
     return df
 
 
+def _exact_quantile(series: pd.Series, q: float) -> float:
+    return series.quantile(q)
+
+
+def _approx_quantile(series: pd.Series, q: float) -> float:
+    return approx_quantile(series, q)
+
+
 def train_model(
     df: pd.DataFrame,
     config: MLConfig,
+    force_retrain: bool = False,
+    cache_path: Optional[Path] = MODEL_CACHE_PATH,
 ) -> Tuple[RandomForestClassifier, Dict[str, Any]]:
     """
     Train a Random Forest classifier with:
@@ -115,6 +152,11 @@ def train_model(
     - class_weight='balanced' (handles class imbalance)
     - Cross-validated AUC for robust evaluation
     - Feature scaling via RobustScaler (handles outliers)
+
+    The model and metrics are cached (see MODEL CACHE): for the same
+    training frame and config they are returned without retraining.
+    Pass force_retrain=True to refit (and refresh the cache entry), or
+    cache_path=None to bypass the cache.
     """
     df = df.copy()
 
@@ -142,6 +184,15 @@ def train_model(
     X = df[available_features]
     y = df[config.label_col].astype(int)
 
+    # ── Model cache ───────────────────────────────────────────
+    fingerprint = training_fingerprint(X, y, config)
+    if cache_path is not None and not force_retrain:
+        cached = load_cached_model(fingerprint, cache_path)
+        if cached is not None:
+            model, metrics = cached
+            logger.info(f"train_model | cache hit | fingerprint={fingerprint}")
+            return model, {**metrics, "cache_hit": True}
+
     # ── Scale features (RobustScaler handles latency outliers) ─
     scaler = RobustScaler()
     X_scaled = pd.DataFrame(
@@ -219,6 +270,8 @@ def train_model(
         "test_rows":          len(X_test),
         "feature_cols":       available_features,
         "run_timestamp":      datetime.now(timezone.utc).isoformat(),
+        "fingerprint":        fingerprint,
+        "cache_hit":          False,
     }
 
     logger.info(
@@ -245,9 +298,81 @@ def train_model(
     except Exception as e:
         logger.debug(f"MLflow logging skipped: {e}")
 
+    if cache_path is not None:
+        save_cached_model(fingerprint, model, metrics, cache_path)
     return model, metrics
 
 
+def training_fingerprint(X: pd.DataFrame, y: pd.Series, config: MLConfig) -> str:
+    """
+    Hex digest identifying one training run: the feature and label values
+    (hashed vectorized by pandas, in row order), column names and dtypes,
+    every MLConfig field and the scikit-learn version.
+    """
+    digest = hashlib.sha256()
+    for frame in (X, y.to_frame()):
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+        digest.update(json.dumps([[str(c), str(t)] for c, t in frame.dtypes.items()]).encode())
+    digest.update(json.dumps(asdict(config), sort_keys=True, default=str).encode())
+    digest.update(sklearn.__version__.encode())
+    return digest.hexdigest()[:32]
+
+
+def load_cached_model(
+    fingerprint: str,
+    cache_path: Path = MODEL_CACHE_PATH,
+    max_age_days: float = MODEL_CACHE_MAX_AGE_DAYS,
+) -> Optional[Tuple[RandomForestClassifier, Dict[str, Any]]]:
+    """(model, metrics) stored under `fingerprint`, or None if absent, expired or unreadable."""
+    path = Path(cache_path) / f"{fingerprint}.joblib"
+    if not path.exists():
+        return None
+    if time.time() - path.stat().st_mtime > max_age_days * 86400:
+        return None
+    try:
+        entry = joblib.load(path)
+    except Exception as e:
+        logger.warning(f"model_cache | unreadable entry {path.name} ignored: {e}")
+        return None
+    return entry["model"], entry["metrics"]
+
+
+def save_cached_model(
+    fingerprint: str,
+    model: RandomForestClassifier,
+    metrics: Dict[str, Any],
+    cache_path: Path = MODEL_CACHE_PATH,
+) -> Path:
+    """Store a trained model under its fingerprint (atomically), then evict old entries."""
+    cache_path = Path(cache_path)
+    cache_path.mkdir(parents=True, exist_ok=True)
+    path = cache_path / f"{fingerprint}.joblib"
+    tmp_path = cache_path / f"_{fingerprint}.{os.getpid()}.tmp"
+    joblib.dump({"model": model, "metrics": metrics}, tmp_path)
+    os.replace(tmp_path, path)
+    evict_model_cache(cache_path)
+    return path
+
+
+def evict_model_cache(
+    cache_path: Path = MODEL_CACHE_PATH,
+    max_entries: int = MODEL_CACHE_MAX_ENTRIES,
+    max_age_days: float = MODEL_CACHE_MAX_AGE_DAYS,
+) -> List[Path]:
+    """
+    Delete cache entries older than `max_age_days`, then the oldest ones
+    beyond `max_entries`. Returns the deleted paths.
+    """
+    entries = sorted(Path(cache_path).glob("*.joblib"), key=lambda p: p.stat().st_mtime, reverse=True)
+    cutoff = time.time() - max_age_days * 86400
+    evicted = [p for i, p in enumerate(entries) if i >= max_entries or p.stat().st_mtime < cutoff]
+    for path in evicted:
+        path.unlink(missing_ok=True)
+    if evicted:
+        logger.info(f"model_cache | evicted={len(evicted)} | kept={len(entries) - len(evicted)}")
+    return evicted
+
+
 def compute_shap_values(
     model: RandomForestClassifier,
     df: pd.DataFrame,
@@ -326,12 +451,14 @@ def score_dataframe(
     df["risk_probability"] = model.predict_proba(X)[:, 1]
     df["risk_label"]       = model.predict(X)
 
+    # One file per feature-day date; frames without a date go to today's partition
     today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    silver_partition = SILVER_PATH / f"date={today}"
-    silver_partition.mkdir(parents=True, exist_ok=True)
-    silver_path = silver_partition / "scored_features.parquet"
-    df.to_parquet(silver_path, index=False, engine="pyarrow")
-    logger.info(f"score_dataframe | scored={len(df)} rows | saved → {silver_path}")
+    dates = df["date"].astype(str) if "date" in df.columns else pd.Series(today, index=df.index)
+    silver_paths = write_partitioned(df, SILVER_PATH, "scored_features.parquet", dates)
+    logger.info(
+        f"score_dataframe | scored={len(df)} rows | "
+        f"saved → {SILVER_PATH} ({len(silver_paths)} partitions)"
+    )
 
     return df
 
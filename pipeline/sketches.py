@@ -0,0 +1,190 @@
+import logging
+from typing import Dict, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────────
+# QUANTILE SKETCHES
+#   A merging t-digest: values are kept as at most ~δ/2 weighted
+#   centroids, small near the tails and larger around the median, so
+#   p95/p99 stay accurate while memory stays bounded whatever the input
+#   size. Digests built per batch or per partition merge into one.
+#
+#   Error guarantee: with compression δ a centroid covering quantile q
+#   holds at most ≈ 2π·√(q(1−q))/δ of the total weight, so an estimate is
+#   off by at most about half that in rank:
+#       |rank error| ≲ π·√(q(1−q)) / δ
+#   For the default δ=200 that is ≤0.8% of rows at the median and ≤0.16%
+#   at p99. Min and max are exact.
+# ─────────────────────────────────────────────
+
+DEFAULT_COMPRESSION = 200
+
+# Buffered raw values are folded into the centroids once this many
+# accumulate (in multiples of the compression)
+BUFFER_FACTOR = 20
+
+
+class TDigest:
+    """Mergeable t-digest quantile sketch with vectorized bulk updates."""
+
+    def __init__(self, compression: int = DEFAULT_COMPRESSION):
+        if compression < 10:
+            raise ValueError(f"TDigest compression must be >= 10, got {compression}")
+        self.compression = compression
+        self._means = np.empty(0)
+        self._weights = np.empty(0)
+        self._buffer = []
+        self._buffered = 0
+        self.min = float("nan")
+        self.max = float("nan")
+
+    @classmethod
+    def from_values(cls, values, compression: int = DEFAULT_COMPRESSION) -> "TDigest":
+        digest = cls(compression)
+        digest.update(values)
+        return digest
+
+    @property
+    def count(self) -> float:
+        return float(self._weights.sum()) + self._buffered
+
+    @property
+    def centroids(self) -> int:
+        self._compress()
+        return int(self._weights.size)
+
+    def update(self, values) -> "TDigest":
+        """Add a batch of values (array-like, Series or Arrow array); NaNs are ignored."""
+        if isinstance(values, (pa.Array, pa.ChunkedArray)):
+            values = values.to_numpy(zero_copy_only=False)
+        elif isinstance(values, pd.Series):
+            values = values.to_numpy(dtype="float64", na_value=np.nan)
+        arr = np.asarray(values, dtype="float64").ravel()
+        arr = arr[~np.isnan(arr)]
+        if not arr.size:
+            return self
+
+        self.min = float(np.fmin(self.min, arr.min()))
+        self.max = float(np.fmax(self.max, arr.max()))
+        self._buffer.append(arr)
+        self._buffered += arr.size
+        if self._buffered >= self.compression * BUFFER_FACTOR:
+            self._compress()
+        return self
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        """Fold another digest (e.g. from another partition) into this one."""
+        other._compress()
+        self._compress()
+        self._means = np.concatenate([self._means, other._means])
+        self._weights = np.concatenate([self._weights, other._weights])
+        self.min = float(np.fmin(self.min, other.min))
+        self.max = float(np.fmax(self.max, other.max))
+        self._compress(force=True)
+        return self
+
+    def quantile(self, q: Union[float, Iterable[float]]) -> Union[float, np.ndarray]:
+        """Estimated quantile(s) — a float for a scalar `q`, else an array."""
+        self._compress()
+        qs = np.asarray(q, dtype="float64")
+        if not self._weights.size:
+            result = np.full(qs.shape, np.nan)
+            return float(result) if qs.ndim == 0 else result
+
+        total = self._weights.sum()
+        # Each centroid sits at the middle of the rank range it covers;
+        # interpolate between centroids, anchored at the exact min and max
+        centers = np.cumsum(self._weights) - self._weights / 2
+        ranks = np.concatenate([[0.0], centers, [total]])
+        values = np.concatenate([[self.min], self._means, [self.max]])
+        result = np.interp(np.clip(qs, 0, 1) * total, ranks, values)
+        return float(result) if qs.ndim == 0 else result
+
+    def to_dict(self) -> Dict:
+        """JSON-serialisable state (for persisting per-partition digests)."""
+        self._compress()
+        return {
+            "compression": self.compression,
+            "means": self._means.tolist(),
+            "weights": self._weights.tolist(),
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> "TDigest":
+        digest = cls(state["compression"])
+        digest._means = np.asarray(state["means"], dtype="float64")
+        digest._weights = np.asarray(state["weights"], dtype="float64")
+        # An empty digest's NaN min/max come back as None from parquet
+        digest.min = float("nan") if state["min"] is None else float(state["min"])
+        digest.max = float("nan") if state["max"] is None else float(state["max"])
+        return digest
+
+    def _compress(self, force: bool = False) -> None:
+        """
+        Internal: Merge buffered values and existing centroids. Points are
+        sorted, then every point whose mid-rank falls in the same unit
+        interval of the scale function k(q) = δ/2π · asin(2q−1) becomes
+        one centroid — done with a cumsum and reduceat, no Python loop.
+        """
+        if not self._buffered and not force:
+            return
+        if self._buffer:
+            raw = np.concatenate(self._buffer)
+            means = np.concatenate([self._means, raw])
+            weights = np.concatenate([self._weights, np.ones(raw.size)])
+            self._buffer, self._buffered = [], 0
+        else:
+            means, weights = self._means, self._weights
+        if not weights.size:
+            return
+
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        q_mid = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q_mid - 1)
+        cluster = np.floor(k)
+
+        starts = np.flatnonzero(np.concatenate([[True], cluster[1:] != cluster[:-1]]))
+        new_weights = np.add.reduceat(weights, starts)
+        self._means = np.add.reduceat(means * weights, starts) / new_weights
+        self._weights = new_weights
+
+
+def sketch_batches(
+    batches: Iterable,
+    column: str,
+    compression: int = DEFAULT_COMPRESSION,
+    digest: Optional[TDigest] = None,
+) -> TDigest:
+    """
+    Build (or extend) a digest of one column over a stream of batches —
+    pandas DataFrames, Arrow RecordBatches or Tables (e.g. from
+    ingest.iter_raw_batches) — holding only one batch at a time.
+    """
+    digest = digest or TDigest(compression)
+    batches_seen = 0
+    for batch in batches:
+        if isinstance(batch, pd.DataFrame):
+            digest.update(batch[column])
+        else:
+            digest.update(batch.column(column))
+        batches_seen += 1
+    logger.info(
+        f"sketch_batches | column={column} | batches={batches_seen} | "
+        f"values={int(digest.count)} | centroids={digest.centroids}"
+    )
+    return digest
+
+
+def approx_quantile(values, q: Union[float, Iterable[float]], compression: int = DEFAULT_COMPRESSION):
+    """One-shot approximate quantile(s) of an array-like via a TDigest."""
+    return TDigest.from_values(values, compression).quantile(q)
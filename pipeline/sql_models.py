@@ -0,0 +1,229 @@
+import logging
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+
+from pipeline.ingest import bronze_dataset
+
+try:
+    import duckdb
+except ImportError:  # optional dependency — see run_sql_models()
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────────
+# IN-PROCESS SQL MODELS
+#   Runs the dbt_project models with embedded DuckDB, without the dbt CLI
+#   and straight over the Bronze parquet partitions instead of the raw CSV:
+#     - the Jinja the models use is rendered here: {{ config(...) }} is
+#       read for the materialization, {{ ref('x') }} becomes relation x
+#     - the models' read_csv_auto(<raw csv>) source is replaced by the
+#       Bronze dataset, registered as an Arrow dataset — DuckDB scans it
+#       lazily with projection pushdown, so nothing is loaded up front
+#     - models run in ref() order as views or tables; the tables come
+#       back as Arrow tables, and DuckDB spills to disk past memory_limit
+#   duckdb is in the requirements; where it's missing this engine raises
+#   ImportError and run_pipeline skips it.
+# ─────────────────────────────────────────────
+
+DBT_MODELS_PATH = Path(__file__).resolve().parents[1] / "dbt_project" / "models"
+ANALYTICAL_QUERIES_PATH = Path(__file__).resolve().parents[1] / "models" / "analytical_queries.sql"
+
+# Errors a model run can fail with: a bad model (ref cycle, unknown model,
+# empty Bronze) or an error raised by DuckDB while running the SQL
+MODEL_ERRORS = (ValueError,) + ((duckdb.Error,) if duckdb is not None else ())
+
+# Relation the Bronze dataset is registered as
+BRONZE_RELATION = "bronze_parquet"
+
+_CONFIG_RE = re.compile(r"\{\{\s*config\((?P<args>.*?)\)\s*\}\}", re.DOTALL)
+_MATERIALIZED_RE = re.compile(r"materialized\s*=\s*['\"](\w+)['\"]")
+_REF_RE = re.compile(r"\{\{\s*ref\(\s*['\"](\w+)['\"]\s*\)\s*\}\}")
+_RAW_SOURCE_RE = re.compile(r"read_csv_auto\(\s*'(?P<path>[^']+)'[^)]*\)")
+
+
+@dataclass
+class SqlModel:
+    """One dbt model: its rendered SELECT, materialization and upstream refs."""
+    name: str
+    sql: str
+    materialized: str = "view"
+    refs: List[str] = field(default_factory=list)
+
+
+def load_models(models_path: Path = DBT_MODELS_PATH) -> List[SqlModel]:
+    """
+    Read and render every model under `models_path`, ordered so each model
+    comes after the models it ref()s.
+    """
+    models = {}
+    for path in sorted(Path(models_path).rglob("*.sql")):
+        models[path.stem] = render_model(path.stem, path.read_text())
+
+    ordered: List[SqlModel] = []
+    visiting = set()
+
+    def visit(name: str) -> None:
+        if name in visiting:
+            raise ValueError(f"load_models: ref() cycle through model '{name}'")
+        if any(m.name == name for m in ordered):
+            return
+        visiting.add(name)
+        for ref in models[name].refs:
+            if ref not in models:
+                raise ValueError(f"load_models: Model '{name}' refs unknown model '{ref}'")
+            visit(ref)
+        visiting.discard(name)
+        ordered.append(models[name])
+
+    for name in models:
+        visit(name)
+    return ordered
+
+
+def render_model(name: str, sql: str) -> SqlModel:
+    """
+    Render the Jinja subset the dbt models use into plain DuckDB SQL, with
+    the raw CSV source read from the Bronze relation instead.
+    """
+    materialized = "view"
+    config = _CONFIG_RE.search(sql)
+    if config:
+        match = _MATERIALIZED_RE.search(config.group("args"))
+        materialized = match.group(1) if match else materialized
+        sql = _CONFIG_RE.sub("", sql, count=1)
+
+    refs = list(dict.fromkeys(_REF_RE.findall(sql)))
+    sql = _REF_RE.sub(lambda m: m.group(1), sql)
+
+    source = _RAW_SOURCE_RE.search(sql)
+    if source:
+        sql = _RAW_SOURCE_RE.sub(BRONZE_RELATION, sql)
+        # Bronze rows record the producer they came from (csv, kafka, ...)
+        sql = sql.replace(f"'{source.group('path')}'", "_source")
+    return SqlModel(name=name, sql=sql.strip(), materialized=materialized, refs=refs)
+
+
+def run_sql_models(
+    files: Optional[List[Path]] = None,
+    models_path: Path = DBT_MODELS_PATH,
+    select: Optional[Iterable[str]] = None,
+    database: str = ":memory:",
+    memory_limit: Optional[str] = None,
+    threads: Optional[int] = None,
+) -> Dict[str, pa.Table]:
+    """
+    Execute the dbt models in-process over the Bronze layer.
+
+    Args:
+        files: Bronze files to read (default: every file in the catalog)
+        models_path: dbt models directory
+        select: Models to return (default: every model materialized as a
+                table — views are only inputs)
+        database: DuckDB database file, or ":memory:"
+        memory_limit: DuckDB memory limit (e.g. "2GB"); larger
+                      intermediates spill to the database's temp directory
+        threads: DuckDB worker threads (default: all cores)
+
+    Returns:
+        {model name: Arrow table}
+    """
+    if duckdb is None:
+        raise ImportError("run_sql_models: duckdb is not installed — run: pip install duckdb")
+    dataset = bronze_dataset(files)
+    if dataset is None:
+        raise ValueError("run_sql_models: The Bronze layer is empty — nothing to model")
+
+    models = load_models(models_path)
+    wanted = set(select) if select is not None else {m.name for m in models if m.materialized == "table"}
+    unknown = wanted - {m.name for m in models}
+    if unknown:
+        raise ValueError(f"run_sql_models: Unknown models: {sorted(unknown)}")
+
+    results: Dict[str, pa.Table] = {}
+    with duckdb.connect(database) as con:
+        if memory_limit:
+            con.execute(f"SET memory_limit = '{memory_limit}'")
+        if threads:
+            con.execute(f"SET threads = {int(threads)}")
+        con.register(BRONZE_RELATION, dataset)
+
+        for model in models:
+            kind = "TABLE" if model.materialized == "table" else "VIEW"
+            con.execute(f"CREATE OR REPLACE {kind} {model.name} AS {model.sql}")
+            logger.info(f"sql_model | {model.name} | materialized={model.materialized}")
+        for name in (m.name for m in models if m.name in wanted):
+            results[name] = _fetch_arrow(con.execute(f"SELECT * FROM {name}"))
+            logger.info(f"sql_model_result | {name} | rows={results[name].num_rows}")
+    return results
+
+
+def run_analytical_queries(
+    tables: Dict[str, Union[pa.Table, pd.DataFrame]],
+    path: Path = ANALYTICAL_QUERIES_PATH,
+) -> List[Optional[pa.Table]]:
+    """
+    Run each query of an analytical SQL file against the given tables
+    (registered under their dict keys). A query that reads a table not
+    given is skipped, with None in its place.
+
+    Returns:
+        One Arrow table (or None) per query, in file order
+    """
+    if duckdb is None:
+        raise ImportError("run_analytical_queries: duckdb is not installed — run: pip install duckdb")
+
+    queries = [q.strip() for q in _strip_comments(Path(path).read_text()).split(";") if q.strip()]
+    results: List[Optional[pa.Table]] = []
+    with duckdb.connect() as con:
+        for name, table in tables.items():
+            con.register(name, table)
+        for i, query in enumerate(queries, start=1):
+            missing = [
+                t for t in re.findall(r"\b(?:FROM|JOIN)\s+(\w+)", query, flags=re.IGNORECASE)
+                if t not in tables
+            ]
+            if missing:
+                logger.warning(f"analytical_query {i} skipped: missing tables {missing}")
+                results.append(None)
+                continue
+            results.append(_fetch_arrow(con.execute(query)))
+            logger.info(f"analytical_query {i} | rows={results[-1].num_rows}")
+    return results
+
+
+def fact_feature_metrics(processed: pd.DataFrame) -> pd.DataFrame:
+    """
+    The processed feature-day frame in the shape of the
+    models/fact_feature_metrics.sql star-schema fact the analytical
+    queries read (feature_id, event_date, latency_ms, risk_score, ...).
+    """
+    columns = {
+        "feature_name": "feature_id",
+        "date": "event_date",
+        "avg_latency": "latency_ms",
+        "crash_rate": "crash_rate",
+        "avg_feedback": "feedback_score",
+        "usage_count": "active_users",
+        "risk_probability": "risk_score",
+    }
+    fact = processed[[c for c in columns if c in processed.columns]].rename(columns=columns)
+    if "event_date" in fact.columns:
+        fact["event_date"] = pd.to_datetime(fact["event_date"]).dt.date
+    return fact
+
+
+def _fetch_arrow(result) -> pa.Table:
+    """Internal: Result as an Arrow table (to_arrow_table() replaced fetch_arrow_table() in duckdb 1.4)."""
+    return result.to_arrow_table() if hasattr(result, "to_arrow_table") else result.fetch_arrow_table()
+
+
+def _strip_comments(sql: str) -> str:
+    """Internal: Drop `--` line comments (the query files have no string literals with --)."""
+    return "\n".join(line.split("--", 1)[0] for line in sql.splitlines())
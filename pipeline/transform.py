@@ -1,89 +1,260 @@
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from datetime import datetime, timezone
+from typing import AbstractSet, Optional, Sequence
 
 import numpy as np
 import pandas as pd
 
+from pipeline.dtypes import apply_dtype_profile, check_profile
+from pipeline.ingest import (
+    DAY_KEY_COLUMN, UNPARSEABLE_TIMESTAMP_COLUMN, parse_timestamps, render_day_keys, write_partitioned,
+)
+from pipeline.sketches import approx_quantile
+
 logger = logging.getLogger(__name__)
 
 SILVER_PATH = Path("data/silver")
 SILVER_PATH.mkdir(parents=True, exist_ok=True)
 
+# Frames smaller than this are transformed serially even when workers > 1 —
+# the row steps take well under a second per million rows, so process
+# start-up and pickling the chunks would outweigh the gain
+PARALLEL_MIN_ROWS = 1_000_000
+
+# Row chunks per worker process (a few per worker evens out stragglers)
+CHUNKS_PER_WORKER = 2
+
+# Every column engineer_features derives, in output order
+DERIVED_COLUMNS = (
+    "date", "hour_of_day", "day_of_week", "is_weekend", "is_business_hours",
+    "quality_score", "latency_bucket", "is_anomaly", "has_errors", "high_error",
+    "session_quality_index", "log_latency",
+)
+
+# Columns the row-local feature steps read (all a worker process receives)
+ROW_FEATURE_INPUTS = (
+    "timestamp", "latency_ms", "crash_flag", "feedback_score", "error_count", "session_duration",
+)
+
+# Workers are started fresh rather than forked: the caller usually has
+# Arrow/BLAS threads running, and fork() with live threads can deadlock
+_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def engineer_features(
+    df: pd.DataFrame,
+    silver_filename: str = "transformed_events.parquet",
+    dtype_profile: str = "default",
+    approx_quantiles: bool = False,
+    workers: int = 1,
+    columns: Optional[Sequence[str]] = None,
+    write_silver: bool = True,
+) -> pd.DataFrame:
+    """
+    Derive time, quality, latency and anomaly features and persist them to
+    the Silver layer. Incremental runs pass a per-run `silver_filename` so
+    batches processed on the same day don't overwrite each other.
+
+    With dtype_profile="compact" the derived columns are created as int8
+    flags, float32 scores and a categorical latency bucket, so a compact
+    frame from ingest stays compact.
+
+    With approx_quantiles=True the p95 latency anomaly threshold comes from
+    a t-digest (pipeline/sketches.py) instead of a full partition of the
+    column.
+
+    With workers > 1 (and at least PARALLEL_MIN_ROWS rows) the row-local
+    feature steps run on row chunks in a process pool. The only global
+    statistics — p95 latency and max session_duration — are computed first
+    and passed to every chunk, so the result is identical to the serial path.
+
+    The input frame is never deep-copied: columns are only ever added or
+    replaced (never written into), so the caller's frame is left untouched.
+    Pass `columns` to get back only what the next step reads (e.g.
+    aggregate.AGGREGATE_INPUT_COLUMNS) — the rest is released once Silver is
+    written. With write_silver=False nothing is persisted and only the
+    derived columns listed in `columns` are computed.
+    """
+    check_profile(dtype_profile)
+    compact = dtype_profile == "compact"
 
-def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
-   
     if df.empty:
         logger.warning("transform_skipped: empty DataFrame received")
         return df
 
-    df = df.copy()
+    wanted = frozenset(
+        DERIVED_COLUMNS if write_silver or columns is None else set(columns) & set(DERIVED_COLUMNS)
+    )
+    # Shallow: new columns must not show up in the caller's frame
+    df = df.copy(deep=False)
 
-    # ── STEP 1: Parse timestamp ───────────────────────────────
-    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-    df["date"] = df["timestamp"].dt.date.astype(str)
+    # ── STEP 1: Parse timestamp (a no-op for frames from ingest) ──
+    parse_timestamps(df)
 
     bad_timestamps = df["timestamp"].isnull().sum()
     if bad_timestamps > 0:
-        logger.warning(f"Dropped {bad_timestamps} rows with unparseable timestamps")
+        logger.warning(f"Dropped {bad_timestamps} rows with missing or unparseable timestamps")
         df = df.dropna(subset=["timestamp"])
+        df[DAY_KEY_COLUMN] = df[DAY_KEY_COLUMN].astype("int32")
+    df = df.drop(columns=[UNPARSEABLE_TIMESTAMP_COLUMN], errors="ignore")
+    # Silver keeps its YYYY-MM-DD column, rendered once per distinct day
+    if "date" in wanted:
+        df["date"] = render_day_keys(df[DAY_KEY_COLUMN])
+
+    # ── Global statistics (the only steps that see every row) ──
+    latency_p95 = max_duration = None
+    if "is_anomaly" in wanted:
+        if approx_quantiles:
+            latency_p95 = approx_quantile(df["latency_ms"], 0.95)
+        else:
+            latency_p95 = df["latency_ms"].quantile(0.95)
+    if "session_quality_index" in wanted:
+        max_duration = df["session_duration"].max() if df["session_duration"].max() > 0 else 1
+
+    # ── STEPS 2-8: Row-local features ─────────────────────────
+    if workers > 1 and len(df) >= PARALLEL_MIN_ROWS:
+        df = _parallel_row_features(df, workers, latency_p95, max_duration, compact, wanted)
+    else:
+        df = _row_features(df, latency_p95, max_duration, compact, wanted)
+
+    if compact:
+        apply_dtype_profile(df, "compact")
+
+    anomalies = int(df["is_anomaly"].sum()) if "is_anomaly" in df.columns else None
+
+    # ── Save to Silver layer as Parquet (one file per event date) ──
+    silver_paths = []
+    if write_silver:
+        silver_paths = write_partitioned(df, SILVER_PATH, silver_filename, df[DAY_KEY_COLUMN])
+
+    if columns is not None:
+        df = df[list(columns)]
+
+    logger.info(
+        f"transform_complete | rows={len(df)} | columns={len(df.columns)} | "
+        f"anomalies={anomalies} | "
+        f"silver_partitions={len(silver_paths)} | "
+        f"silver_path={SILVER_PATH}"
+    )
+
+    return df
+
+
+def _row_features(
+    df: pd.DataFrame,
+    latency_p95: float,
+    max_duration: float,
+    compact: bool,
+    wanted: AbstractSet[str] = frozenset(DERIVED_COLUMNS),
+) -> pd.DataFrame:
+    """
+    Internal: Feature steps that only look at one row at a time (plus the
+    broadcast global statistics). Runs on the whole frame or on one chunk
+    inside a worker process; adds the `wanted` derived columns (and the
+    hour/weekday they're built from) to `df` and returns it.
+    """
+    flag = "int8" if compact else int
 
     # ── STEP 2: Time-based features ───────────────────────────
-    df["hour_of_day"] = df["timestamp"].dt.hour
-    df["day_of_week"] = df["timestamp"].dt.dayofweek   # 0=Monday, 6=Sunday
-    df["is_weekend"] = df["day_of_week"].isin([5, 6]).astype(int)
-    df["is_business_hours"] = df["hour_of_day"].between(9, 17).astype(int)
+    if not wanted.isdisjoint({"hour_of_day", "is_business_hours"}):
+        df["hour_of_day"] = df["timestamp"].dt.hour
+    if not wanted.isdisjoint({"day_of_week", "is_weekend"}):
+        df["day_of_week"] = df["timestamp"].dt.dayofweek   # 0=Monday, 6=Sunday
+    if "is_weekend" in wanted:
+        df["is_weekend"] = df["day_of_week"].isin([5, 6]).astype(flag)
+    if "is_business_hours" in wanted:
+        df["is_business_hours"] = df["hour_of_day"].between(9, 17).astype(flag)
 
     # ── STEP 3: Original quality score  ──
-    df["quality_score"] = (
-        1 / (1 + df["latency_ms"])
-        + (1 - df["crash_flag"])
-        + df["feedback_score"] / 5
-    ) / 3
+    if "quality_score" in wanted:
+        df["quality_score"] = (
+            1 / (1 + df["latency_ms"])
+            + (1 - df["crash_flag"])
+            + df["feedback_score"] / 5
+        ) / 3
 
     # ── STEP 4: Latency bucket (categorical signal) ───────────
-    
-    df["latency_bucket"] = pd.cut(
-        df["latency_ms"],
-        bins=[0, 100, 300, 600, 1000, float("inf")],
-        labels=["excellent", "good", "moderate", "poor", "critical"],
-    ).astype(str)
+    if "latency_bucket" in wanted:
+        df["latency_bucket"] = pd.cut(
+            df["latency_ms"],
+            bins=[0, 100, 300, 600, 1000, float("inf")],
+            labels=["excellent", "good", "moderate", "poor", "critical"],
+        )
+        if not compact:
+            df["latency_bucket"] = df["latency_bucket"].astype(str)
 
     # ── STEP 5: Anomaly flag ──────────────────────────────────
     # Flags events that look suspicious — high latency AND crash AND bad feedback
-    df["is_anomaly"] = (
-        (df["latency_ms"] > df["latency_ms"].quantile(0.95))
-        & (df["crash_flag"] == 1)
-        & (df["feedback_score"] < 2.0)
-    ).astype(int)
+    if "is_anomaly" in wanted:
+        df["is_anomaly"] = (
+            (df["latency_ms"] > latency_p95)
+            & (df["crash_flag"] == 1)
+            & (df["feedback_score"] < 2.0)
+        ).astype(flag)
 
     # ── STEP 6: Error rate signal ─────────────────────────────
-    df["has_errors"] = (df["error_count"] > 0).astype(int)
-    df["high_error"] = (df["error_count"] > 3).astype(int)
+    if "has_errors" in wanted:
+        df["has_errors"] = (df["error_count"] > 0).astype(flag)
+    if "high_error" in wanted:
+        df["high_error"] = (df["error_count"] > 3).astype(flag)
 
     # ── STEP 7: Session quality index (0 to 1) ───────────────
     # Combines session duration + feedback into one score
-    max_duration = df["session_duration"].max() if df["session_duration"].max() > 0 else 1
-    df["session_quality_index"] = (
-        (df["session_duration"] / max_duration) * 0.5
-        + (df["feedback_score"] / 5.0) * 0.5
-    ).round(4)
+    if "session_quality_index" in wanted:
+        df["session_quality_index"] = (
+            (df["session_duration"] / max_duration) * 0.5
+            + (df["feedback_score"] / 5.0) * 0.5
+        ).round(4)
 
     # ── STEP 8: Log-transform latency ────────────────────────
     # Log transform reduces skew — helps ML models learn better
-    df["log_latency"] = np.log1p(df["latency_ms"])
+    if "log_latency" in wanted:
+        df["log_latency"] = np.log1p(df["latency_ms"])
 
-    # ── Save to Silver layer as Parquet ──────────────────────
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    silver_partition = SILVER_PATH / f"date={today}"
-    silver_partition.mkdir(parents=True, exist_ok=True)
-    silver_path = silver_partition / "transformed_events.parquet"
-    df.to_parquet(silver_path, index=False, engine="pyarrow")
+    return df
+
+
+def _parallel_row_features(
+    df: pd.DataFrame,
+    workers: int,
+    latency_p95: float,
+    max_duration: float,
+    compact: bool,
+    wanted: AbstractSet[str],
+) -> pd.DataFrame:
+    """
+    Internal: _row_features over contiguous row chunks in a process pool.
+    Only the input columns the steps read are sent to the workers and only
+    the derived columns come back, which are then attached to `df` in the
+    original row order. Row chunks (rather than date partitions) keep the
+    work balanced when a few days hold most events.
+    """
+    inputs = df[list(ROW_FEATURE_INPUTS)]
+    n_chunks = workers * CHUNKS_PER_WORKER
+    bounds = np.linspace(0, len(df), n_chunks + 1).astype(int)
+    chunks = [inputs.iloc[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+
+    context = multiprocessing.get_context(_START_METHOD)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        parts = list(pool.map(
+            _derived_columns,
+            chunks,
+            repeat(latency_p95),
+            repeat(max_duration),
+            repeat(compact),
+            repeat(wanted),
+        ))
+
+    derived = pd.concat(parts)
+    for col in derived.columns:
+        df[col] = derived[col].array
+    logger.info(f"transform_parallel | rows={len(df)} | workers={workers} | chunks={len(chunks)}")
+    return df
 
-    logger.info(
-        f"transform_complete | rows={len(df)} | "
-        f"anomalies={df['is_anomaly'].sum()} | "
-        f"silver_path={silver_path}"
-    )
 
-    return df
\ No newline at end of file
+def _derived_columns(inputs: pd.DataFrame, *stats) -> pd.DataFrame:
+    """Internal: Worker entry point — the columns _row_features adds to one chunk."""
+    return _row_features(inputs, *stats).drop(columns=list(ROW_FEATURE_INPUTS))
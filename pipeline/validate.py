@@ -1,6 +1,8 @@
 import logging
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 logger = logging.getLogger(__name__)
@@ -17,6 +19,19 @@ RAW_REQUIRED_COLUMNS = [
     "timestamp",
 ]
 
+# ── Explicit Arrow types used by the streaming CSV reader ─────
+# Keys mirror RAW_REQUIRED_COLUMNS; any extra CSV columns are inferred.
+RAW_COLUMN_TYPES = {
+    "user_id":          "string",
+    "feature_name":     "string",
+    "session_duration": "float64",
+    "latency_ms":       "float64",
+    "crash_flag":       "int64",
+    "error_count":      "int64",
+    "feedback_score":   "float64",
+    "timestamp":        "string",
+}
+
 # ── Processed/aggregated data schema ─────────────────────────
 PROCESSED_REQUIRED_COLUMNS = [
     "feature_name",
@@ -43,17 +58,55 @@ COLUMN_RANGE_EXPECTATIONS = {
 }
 
 
-def validate_schema(df: pd.DataFrame, stage: str = "raw") -> pd.DataFrame:
+# Fail the run when more than this share of a column's values is out of range
+CRITICAL_RANGE_VIOLATION_RATE = 0.20
+
+
+@dataclass
+class ColumnValidation:
+    """Everything validate_schema learned about one column, from a single pass."""
+    name: str
+    null_count: int = 0
+    coercion_failures: int = 0
+    non_null: int = 0
+    out_of_range: int = 0
+    valid_range: Optional[Tuple[float, float]] = None
+
+    @property
+    def out_of_range_rate(self) -> float:
+        return self.out_of_range / self.non_null if self.non_null else 0.0
+
+
+@dataclass
+class ValidationResult:
+    """Structured outcome of check_schema(); reusable by later pipeline steps."""
+    stage: str
+    rows: int
+    columns: Dict[str, ColumnValidation] = field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+    @property
+    def passed(self) -> bool:
+        return not self.errors
+
+    def raise_for_errors(self) -> None:
+        if self.errors:
+            raise ValueError(self.errors[0])
+
+
+def check_schema(df: pd.DataFrame, stage: str = "raw") -> ValidationResult:
     """
-    Validates DataFrame schema and data quality.
+    Run every schema/quality check in one fused pass per column and return
+    a ValidationResult instead of raising on data problems.
 
-    Args:
-        df: DataFrame to validate
-        stage: "raw" or "processed"
+    For each required column the null count, numeric coercion failures and
+    range violations are computed together, so a column is scanned once
+    rather than once per check. Non-numeric columns that should be numeric
+    are coerced in place (as validate_schema always has).
 
-    Returns:
-        The original DataFrame (unchanged) if all checks pass.
-        Raises ValueError if critical checks fail.
+    Raises:
+        ValueError only for an invalid `stage`
     """
     if stage == "raw":
         required_columns = RAW_REQUIRED_COLUMNS
@@ -62,83 +115,117 @@ def validate_schema(df: pd.DataFrame, stage: str = "raw") -> pd.DataFrame:
     else:
         raise ValueError(f"Invalid stage '{stage}'. Use 'raw' or 'processed'.")
 
+    result = ValidationResult(stage=stage, rows=len(df))
+
     # ── CHECK 1: Required columns exist ──────────────────────
     missing = [col for col in required_columns if col not in df.columns]
     if missing:
-        raise ValueError(f"validate_schema [{stage}]: Missing required columns: {missing}")
+        result.errors.append(f"validate_schema [{stage}]: Missing required columns: {missing}")
+        return result
 
     logger.info(f"validate_schema [{stage}]: All {len(required_columns)} required columns present")
 
     # ── CHECK 2: DataFrame is not empty ──────────────────────
     if df.empty:
-        raise ValueError(f"validate_schema [{stage}]: DataFrame is empty — no rows to process")
+        result.errors.append(f"validate_schema [{stage}]: DataFrame is empty — no rows to process")
+        return result
 
     if len(df) < 10:
-        logger.warning(f"validate_schema [{stage}]: Very few rows ({len(df)}) — results may be unreliable")
-
-    # ── CHECK 3: Numeric columns have correct types ───────────
-    if stage == "raw":
-        for col, expected_type in COLUMN_DTYPE_EXPECTATIONS.items():
-            if col not in df.columns:
-                continue
-            if expected_type == "numeric":
-                if not pd.api.types.is_numeric_dtype(df[col]):
-                    # Try to coerce instead of failing hard
-                    try:
-                        df[col] = pd.to_numeric(df[col], errors="coerce")
-                        coerced_nulls = df[col].isnull().sum()
-                        logger.warning(
-                            f"validate_schema: '{col}' coerced to numeric — "
-                            f"{coerced_nulls} values became NaN"
-                        )
-                    except Exception:
-                        raise ValueError(
-                            f"validate_schema: Column '{col}' cannot be converted to numeric"
-                        )
-
-    # ── CHECK 4: Values within expected ranges ────────────────
-    if stage == "raw":
-        range_violations = []
-        for col, (min_val, max_val) in COLUMN_RANGE_EXPECTATIONS.items():
-            if col not in df.columns:
-                continue
-            col_data = pd.to_numeric(df[col], errors="coerce").dropna()
-            out_of_range = ((col_data < min_val) | (col_data > max_val)).sum()
-            if out_of_range > 0:
-                pct = out_of_range / len(col_data) * 100
-                msg = (
-                    f"'{col}': {out_of_range} values ({pct:.1f}%) "
-                    f"outside range [{min_val}, {max_val}]"
+        result.warnings.append(f"validate_schema [{stage}]: Very few rows ({len(df)}) — results may be unreliable")
+
+    # ── CHECKS 3-5: One pass per column ──────────────────────
+    # dtype coercion + null count + range violations computed together
+    dtype_expectations = COLUMN_DTYPE_EXPECTATIONS if stage == "raw" else {}
+    range_expectations = COLUMN_RANGE_EXPECTATIONS if stage == "raw" else {}
+
+    for col in dict.fromkeys(list(required_columns) + list(range_expectations)):
+        if col not in df.columns:
+            continue
+        check = ColumnValidation(name=col)
+        values = df[col]
+        nulls = values.isnull()
+        check.null_count = int(nulls.sum())
+
+        if dtype_expectations.get(col) == "numeric" and not pd.api.types.is_numeric_dtype(values):
+            # Try to coerce instead of failing hard
+            try:
+                values = pd.to_numeric(values, errors="coerce")
+            except Exception:
+                raise ValueError(
+                    f"validate_schema: Column '{col}' cannot be converted to numeric"
                 )
-                range_violations.append(msg)
-                logger.warning(f"validate_schema range warning: {msg}")
-
-        # Only fail if MORE than 20% of values are out of range
-        critical_violations = []
-        for col, (min_val, max_val) in COLUMN_RANGE_EXPECTATIONS.items():
-            if col not in df.columns:
-                continue
-            col_data = pd.to_numeric(df[col], errors="coerce").dropna()
-            out_of_range = ((col_data < min_val) | (col_data > max_val)).sum()
-            if len(col_data) > 0 and (out_of_range / len(col_data)) > 0.20:
-                critical_violations.append(col)
-
-        if critical_violations:
-            raise ValueError(
-                f"validate_schema: Critical range violations (>20% bad values) "
-                f"in columns: {critical_violations}"
+            df[col] = values
+            coerced_nulls = values.isnull()
+            check.coercion_failures = int(coerced_nulls.sum()) - check.null_count
+            check.null_count = int(coerced_nulls.sum())
+            result.warnings.append(
+                f"validate_schema: '{col}' coerced to numeric — "
+                f"{check.null_count} values became NaN"
             )
 
-    # ── CHECK 5: No fully null columns ───────────────────────
-    fully_null = [col for col in required_columns if df[col].isnull().all()]
+        check.non_null = len(values) - check.null_count
+
+        if col in range_expectations and pd.api.types.is_numeric_dtype(values):
+            min_val, max_val = range_expectations[col]
+            check.valid_range = (min_val, max_val)
+            arr = values.to_numpy(dtype="float64", na_value=np.nan)
+            # NaN compares False on both sides, so nulls never count as violations
+            check.out_of_range = int(np.count_nonzero((arr < min_val) | (arr > max_val)))
+            if check.out_of_range > 0:
+                result.warnings.append(
+                    f"validate_schema range warning: '{col}': {check.out_of_range} values "
+                    f"({check.out_of_range_rate * 100:.1f}%) outside range [{min_val}, {max_val}]"
+                )
+
+        result.columns[col] = check
+
+    # Only fail if MORE than 20% of values are out of range
+    critical_violations = [
+        c.name for c in result.columns.values()
+        if c.valid_range is not None and c.out_of_range_rate > CRITICAL_RANGE_VIOLATION_RATE
+    ]
+    if critical_violations:
+        result.errors.append(
+            f"validate_schema: Critical range violations (>20% bad values) "
+            f"in columns: {critical_violations}"
+        )
+
+    # No fully null columns
+    fully_null = [
+        col for col in required_columns if result.columns[col].null_count == len(df)
+    ]
     if fully_null:
-        raise ValueError(
+        result.errors.append(
             f"validate_schema [{stage}]: These columns are entirely null: {fully_null}"
         )
 
+    return result
+
+
+def validate_schema(df: pd.DataFrame, stage: str = "raw") -> pd.DataFrame:
+    """
+    Validates DataFrame schema and data quality.
+
+    Thin wrapper around check_schema(): logs its warnings and raises on
+    the first critical finding. Use check_schema() directly to get the
+    per-column ValidationResult.
+
+    Args:
+        df: DataFrame to validate
+        stage: "raw" or "processed"
+
+    Returns:
+        The original DataFrame (unchanged) if all checks pass.
+        Raises ValueError if critical checks fail.
+    """
+    result = check_schema(df, stage)
+    for msg in result.warnings:
+        logger.warning(msg)
+    result.raise_for_errors()
+
     logger.info(
         f"validate_schema [{stage}]: PASSED | "
         f"rows={len(df)} | columns={len(df.columns)}"
     )
 
-    return df
\ No newline at end of file
+    return df
@@ -1,5 +1,9 @@
 import pandas as pd
-from pipeline.aggregate import aggregate_daily
+import pytest
+from pipeline import aggregate
+from pipeline.aggregate import LATENCY_PERCENTILES, aggregate_daily, partial_aggregates
+from pipeline.dtypes import apply_dtype_profile
+from pipeline.ingest import parse_timestamps
 from pipeline.validate import validate_schema
 
 def test_aggregate_daily_produces_valid_schema():
@@ -23,4 +27,51 @@ def test_aggregate_daily_produces_valid_schema():
     validate_schema(out, stage="processed")
 
     assert "feature_name" in out.columns
-    assert len(out) > 0
\ No newline at end of file
+    assert len(out) > 0
+
+
+def test_aggregate_daily_same_for_raw_and_parsed_timestamps(sample_raw_df):
+    raw = aggregate_daily(sample_raw_df)
+    parsed = aggregate_daily(parse_timestamps(sample_raw_df.copy()))
+
+    pd.testing.assert_frame_equal(raw, parsed)
+    assert list(raw.columns[:2]) == ["feature_name", "date"]
+    assert raw["date"].iloc[0] == "2025-01-01"
+
+
+def test_aggregate_daily_latency_percentiles_are_exact(sample_raw_df):
+    df = sample_raw_df.copy()
+    df.loc[::5, "latency_ms"] = None
+    out = aggregate_daily(df)
+
+    expected = (
+        df.assign(date=df["timestamp"].str.slice(0, 10))
+        .groupby(["feature_name", "date"])["latency_ms"]
+        .quantile(list(LATENCY_PERCENTILES.values()))
+        .unstack()
+    )
+    expected.columns = list(LATENCY_PERCENTILES)
+    actual = out.set_index(["feature_name", "date"])[list(LATENCY_PERCENTILES)]
+    pd.testing.assert_frame_equal(actual, expected.loc[actual.index], check_names=False)
+
+
+def test_arrow_backend_matches_pandas_groupby(sample_raw_df):
+    df = sample_raw_df.copy()
+    df.loc[::9, "latency_ms"] = None
+    df.loc[::11, "feature_name"] = None
+
+    for frame in (df, apply_dtype_profile(df.copy(), "compact")):
+        expected = partial_aggregates(frame)
+        actual = partial_aggregates(frame, backend="arrow")
+        # Keys, counts and integer-valued sums are bit-identical; float sums
+        # may differ in the last bit (pandas uses Kahan summation)
+        exact = [c for c in expected.columns if not c.startswith("latency_ms_s")]
+        pd.testing.assert_frame_equal(actual[exact], expected[exact], check_exact=True)
+        pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=1e-12)
+
+
+def test_default_backend_is_read_at_call_time(sample_raw_df, monkeypatch):
+    monkeypatch.setattr(aggregate, "AGGREGATION_BACKEND", "no-such-backend")
+
+    with pytest.raises(ValueError, match="no-such-backend"):
+        aggregate.aggregate_daily(sample_raw_df)
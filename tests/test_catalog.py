@@ -0,0 +1,26 @@
+from pipeline import catalog
+
+
+def test_catalog_prunes_by_partition_and_min_max(tmp_path, sample_raw_df):
+    for day in ["2025-01-01", "2025-01-02"]:
+        partition = tmp_path / f"date={day}"
+        partition.mkdir()
+        sample_raw_df[sample_raw_df["feature_name"] == "search"].to_parquet(
+            partition / "search.parquet", index=False
+        )
+        sample_raw_df[sample_raw_df["feature_name"] == "login"].to_parquet(
+            partition / "login.parquet", index=False
+        )
+
+    # No catalog yet → bootstrapped from disk on first read
+    assert len(catalog.list_files(tmp_path)) == 4
+
+    files = catalog.list_files(tmp_path, start="2025-01-02", filters={"feature_name": ["search"]})
+    assert [f.relative_to(tmp_path).as_posix() for f in files] == ["date=2025-01-02/search.parquet"]
+
+    summary = catalog.layer_summary(tmp_path)
+    assert summary["files"] == 4
+    assert summary["rows"] == 2 * ((sample_raw_df["feature_name"].isin(["search", "login"])).sum())
+
+    catalog.unregister_files(tmp_path, files)
+    assert catalog.layer_summary(tmp_path)["files"] == 3
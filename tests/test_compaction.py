@@ -0,0 +1,105 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pandas as pd
+import pyarrow.parquet as pq
+from pipeline import catalog, incremental, ingest
+from pipeline.compaction import compact_partition
+
+
+def test_compact_partition_merges_small_files(tmp_path, monkeypatch, sample_raw_df):
+    monkeypatch.setattr(ingest, "BRONZE_PATH", tmp_path)
+    partition = tmp_path / "date=2025-01-01"
+    partition.mkdir()
+    for i, chunk in enumerate([sample_raw_df.iloc[:40], sample_raw_df.iloc[40:70], sample_raw_df.iloc[70:]]):
+        chunk.to_parquet(partition / f"raw_events_00000{i}.parquet", index=False)
+
+    summary = compact_partition(partition, min_file_age_seconds=0)
+
+    files = list(partition.glob("*.parquet"))
+    assert summary["files_before"] == 3
+    assert summary["files_after"] == len(files) == 1
+    assert not list(partition.glob("_compaction.lock"))
+
+    out = pq.read_table(files[0]).to_pandas()
+    assert len(out) == len(sample_raw_df)
+    assert out["feature_name"].is_monotonic_increasing
+    assert pq.read_metadata(files[0]).row_group(0).column(0).compression == "ZSTD"
+
+
+def test_compact_partition_leaves_recent_files_alone(tmp_path, monkeypatch, sample_raw_df):
+    monkeypatch.setattr(ingest, "BRONZE_PATH", tmp_path)
+    partition = tmp_path / "date=2025-01-01"
+    partition.mkdir()
+    for i in range(3):
+        sample_raw_df.to_parquet(partition / f"events_00000{i}.parquet", index=False)
+
+    summary = compact_partition(partition, min_file_age_seconds=3600)
+
+    assert summary["skipped"] == "nothing_to_compact"
+    assert len(list(partition.glob("*.parquet"))) == 3
+
+
+def test_compact_partition_takes_over_stale_locks_only(tmp_path, monkeypatch, sample_raw_df):
+    monkeypatch.setattr(ingest, "BRONZE_PATH", tmp_path)
+    partition = tmp_path / "date=2025-01-01"
+    partition.mkdir()
+    for i in range(2):
+        sample_raw_df.to_parquet(partition / f"events_00000{i}.parquet", index=False)
+    lock = partition / "_compaction.lock"
+    host = socket.gethostname()
+
+    lock.write_text(f"{os.getpid()} {host} {time.time()}")
+    assert compact_partition(partition, min_file_age_seconds=0)["skipped"] == "locked"
+
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    lock.write_text(f"{dead.pid} {host} {time.time()}")
+    summary = compact_partition(partition, min_file_age_seconds=0)
+    assert summary["skipped"] is None and summary["files_after"] == 1
+    assert not lock.exists()
+
+    # Lock of an older version (pid + ISO time), judged by its age
+    lock.write_text(f"{os.getpid()} 2025-01-01T00:00:00+00:00")
+    os.utime(lock, (0, 0))
+    assert compact_partition(partition, min_file_age_seconds=0)["skipped"] == "nothing_to_compact"
+    assert not lock.exists()
+
+
+def test_compaction_swaps_catalog_entries_before_deleting_inputs(tmp_path, monkeypatch, sample_raw_df):
+    monkeypatch.setattr(ingest, "BRONZE_PATH", tmp_path)
+    partition = tmp_path / "date=2025-01-01"
+    partition.mkdir()
+    for i, chunk in enumerate([sample_raw_df.iloc[:50], sample_raw_df.iloc[50:]]):
+        chunk.to_parquet(partition / f"raw_events_00000{i}.parquet", index=False)
+    assert len(catalog.list_files(tmp_path)) == 2
+
+    # What a catalog reader sees just before the inputs are deleted
+    seen = []
+    remap = ingest.remap_manifest_paths
+    monkeypatch.setattr(ingest, "remap_manifest_paths", lambda group, output: seen.append(
+        (catalog.list_files(tmp_path), catalog.layer_summary(tmp_path)["rows"])
+    ) or remap(group, output))
+    compact_partition(partition, min_file_age_seconds=0)
+
+    (listed, rows), = seen
+    assert [f.name for f in listed] == [f.name for f in partition.glob("*.parquet")]
+    assert rows == len(sample_raw_df)
+
+
+def test_compaction_skips_partitions_while_a_pipeline_run_holds_the_lock(tmp_path, monkeypatch, sample_raw_df):
+    monkeypatch.setattr(ingest, "BRONZE_PATH", tmp_path)
+    partition = tmp_path / "date=2025-01-01"
+    partition.mkdir()
+    for i in range(2):
+        sample_raw_df.to_parquet(partition / f"events_00000{i}.parquet", index=False)
+
+    with incremental.pipeline_lock():
+        assert compact_partition(partition, min_file_age_seconds=0)["skipped"] == "pipeline_running"
+    assert not (partition / "_compaction.lock").exists()
+
+    assert compact_partition(partition, min_file_age_seconds=0)["files_after"] == 1
+    assert not incremental.pipeline_lock_path().exists()
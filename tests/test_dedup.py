@@ -0,0 +1,112 @@
+import numpy as np
+
+from pipeline import dedup
+from pipeline.dedup import (
+    DedupIndex, RotatingBloomFilter, counted_mask, drop_duplicates, event_windows, hash_keys,
+)
+from pipeline.quality_checks import run_great_expectations_suite
+
+
+def test_dedup_index_catches_duplicates_across_batches(sample_raw_df, tmp_path):
+    first, second = sample_raw_df.iloc[:60], sample_raw_df.iloc[40:]
+
+    index = DedupIndex()
+    kept, dropped = drop_duplicates(first, index, window=event_windows(first))
+    assert dropped == 0 and len(index) == 60
+
+    index.save(tmp_path / "_dedup_index")
+    reloaded = DedupIndex.load(tmp_path / "_dedup_index")
+    kept, dropped = drop_duplicates(second, reloaded, window=event_windows(second))
+
+    assert dropped == 20
+    assert kept["user_id"].tolist() == second["user_id"].iloc[20:].tolist()
+
+    report = run_great_expectations_suite(
+        second, dedup_index=DedupIndex(hash_keys(first), window=event_windows(first))
+    )
+    dup_check = next(r for r in report["results"] if r["expectation"] == "expect_no_duplicate_events")
+    assert not dup_check["passed"]
+
+
+def test_dedup_index_keeps_one_file_per_window_and_evicts_the_oldest(sample_raw_df, tmp_path):
+    # 100 hourly events from 2025-01-01 span five event dates
+    index = DedupIndex(path=tmp_path / "_dedup_index", max_windows=3)
+    index.add(hash_keys(sample_raw_df), window=event_windows(sample_raw_df))
+    index.save()
+
+    assert sorted(p.name for p in (tmp_path / "_dedup_index").glob("*.npy")) == [
+        "2025-01-03.npy", "2025-01-04.npy", "2025-01-05.npy",
+    ]
+    reloaded = DedupIndex.load(tmp_path / "_dedup_index")
+    windows = event_windows(sample_raw_df)
+    found = reloaded.contains(hash_keys(sample_raw_df), windows)
+    assert (found == (windows >= "2025-01-03")).all()
+    assert reloaded._loaded.keys() <= {"2025-01-03", "2025-01-04", "2025-01-05"}
+
+
+def test_rotating_bloom_filter_has_no_false_negatives_and_evicts_old_windows(tmp_path):
+    keys = np.arange(10_000, dtype=np.uint64) * np.uint64(2654435761)
+    bloom = RotatingBloomFilter(capacity_per_window=10_000, error_rate=0.01, max_windows=2)
+    bloom.add(keys, window="2025-01-01")
+
+    assert bloom.contains(keys).all()
+    unseen = keys + np.uint64(1)
+    assert bloom.contains(unseen).mean() < 0.03
+    assert not bloom.contains(keys, window="2025-01-02").any()
+
+    bloom.save(tmp_path / "_dedup_bloom.npz")
+    bloom = RotatingBloomFilter.load(tmp_path / "_dedup_bloom.npz")
+    bloom.add(keys[:1], window="2025-01-02")
+    bloom.add(keys[:1], window="2025-01-03")
+
+    assert bloom.windows == ["2025-01-02", "2025-01-03"]
+    assert not bloom.contains(keys[1:]).any()
+
+
+def test_bloom_hits_are_confirmed_before_dropping(sample_raw_df):
+    # A filter far over capacity reports nearly every key as seen
+    bloom = RotatingBloomFilter(capacity_per_window=10, error_rate=0.1)
+    bloom.add(np.arange(100_000, dtype=np.uint64), window="2025-01-01")
+    first, second = sample_raw_df.iloc[:10], sample_raw_df.iloc[:20]
+    seen = DedupIndex()
+    drop_duplicates(first, bloom, window="2025-01-01", confirm=seen)
+
+    kept, dropped = drop_duplicates(second, bloom, window="2025-01-01", confirm=seen)
+
+    assert dropped == 10
+    assert kept["user_id"].tolist() == second["user_id"].iloc[10:].tolist()
+
+
+def test_saved_dedup_state_from_another_hash_version_is_discarded(sample_raw_df, tmp_path, monkeypatch):
+    keys, windows = hash_keys(sample_raw_df), event_windows(sample_raw_df)
+    DedupIndex(keys, window=windows).save(tmp_path / "_dedup_index")
+    bloom = RotatingBloomFilter(capacity_per_window=1_000)
+    bloom.add(keys, window=windows)
+    bloom.save(tmp_path / "_dedup_bloom.npz")
+    np.save(tmp_path / "_dedup_index.npy", keys)
+
+    assert DedupIndex.load(tmp_path / "_dedup_index").contains(keys, windows).all()
+    assert not (tmp_path / "_dedup_index.npy").exists()
+
+    monkeypatch.setattr(dedup, "HASH_VERSION", dedup.HASH_VERSION + 1)
+    assert not DedupIndex.load(tmp_path / "_dedup_index").contains(keys, windows).any()
+    assert not list((tmp_path / "_dedup_index").glob("*.npy"))
+    assert RotatingBloomFilter.load(tmp_path / "_dedup_bloom.npz").windows == []
+
+
+def test_counted_mask_keeps_repeats_within_a_source(sample_raw_df, tmp_path):
+    keys, windows = hash_keys(sample_raw_df), event_windows(sample_raw_df)
+    index = DedupIndex(keys[:10], window=windows[:10], path=tmp_path / "_dedup_index")
+
+    # Source 0 repeats one of its new keys; source 1 is a copy of source 0
+    batch = np.concatenate([keys[5:20], keys[15:16], keys[5:20]])
+    labels = np.concatenate([windows[5:20], windows[15:16], windows[5:20]])
+    sources = np.repeat([0, 1], [16, 15])
+
+    counted = counted_mask(batch, index, labels, sources=sources)
+    assert counted[:5].all() and not counted[5:16].any()
+    assert counted[16:].all()
+
+    index.clear()
+    index.save()
+    assert not counted_mask(keys, DedupIndex.load(tmp_path / "_dedup_index"), windows).any()
@@ -0,0 +1,43 @@
+import pandas as pd
+import pyarrow as pa
+from pipeline import transform
+from pipeline.aggregate import aggregate_daily
+from pipeline.dtypes import apply_dtype_profile, arrow_to_pandas, memory_report
+
+
+def test_compact_profile_is_kept_through_transform_and_aggregate(tmp_path, monkeypatch, sample_raw_df):
+    monkeypatch.setattr(transform, "SILVER_PATH", tmp_path)
+    compact = apply_dtype_profile(sample_raw_df.copy(), "compact")
+    assert isinstance(compact["feature_name"].dtype, pd.CategoricalDtype)
+    assert compact["crash_flag"].dtype == "int8"
+    assert compact["latency_ms"].dtype == "float32"
+
+    features = transform.engineer_features(compact, dtype_profile="compact")
+    assert features["is_anomaly"].dtype == "int8"
+    assert isinstance(features["latency_bucket"].dtype, pd.CategoricalDtype)
+
+    out = aggregate_daily(features)
+    expected = aggregate_daily(transform.engineer_features(sample_raw_df))
+    assert len(out) == len(expected)
+    pd.testing.assert_frame_equal(out, expected, check_dtype=False, rtol=1e-5)
+
+
+def test_memory_report_shows_per_row_reduction(sample_raw_df):
+    report = memory_report(sample_raw_df)
+    total = report[report["column"] == "TOTAL"].iloc[0]
+    assert total["compact_bytes_per_row"] < total["default_bytes_per_row"]
+
+
+def test_compact_profile_keeps_out_of_range_integers(sample_raw_df):
+    df = sample_raw_df.copy()
+    df.loc[0, "error_count"] = 40_000
+    df.loc[1, "crash_flag"] = 300
+
+    from_arrow = arrow_to_pandas(pa.Table.from_pandas(df, preserve_index=False), "compact")
+    compact = apply_dtype_profile(df.copy(), "compact")
+
+    for out in (from_arrow, compact):
+        assert out["error_count"].tolist() == df["error_count"].tolist()
+        assert out["crash_flag"].tolist() == df["crash_flag"].tolist()
+        # Columns whose values fit are still narrowed
+        assert out["latency_ms"].dtype == "float32"
@@ -0,0 +1,33 @@
+import pandas as pd
+from pipeline.aggregate import aggregate_daily
+from pipeline.gold import load_gold, materialize_gold
+
+
+def _sorted(df, key):
+    return df.sort_values(["feature_name", key]).reset_index(drop=True)
+
+
+def test_gold_rollups_merge_batches_and_match_daily_aggregates(tmp_path, sample_raw_df):
+    full, incremental = tmp_path / "full", tmp_path / "incremental"
+    materialize_gold(sample_raw_df, full)
+    materialize_gold(sample_raw_df.iloc[:70], incremental)
+    written = materialize_gold(sample_raw_df.iloc[70:], incremental, merge=True)
+
+    # The second batch (events 70-99, hourly) only touches Jan 3-5
+    assert [p.parent.name for p in written["hour"]] == ["date=2025-01-03", "date=2025-01-04", "date=2025-01-05"]
+    for grain, key in [("hour", "hour_key"), ("day", "day_key"), ("week", "week_key")]:
+        pd.testing.assert_frame_equal(
+            _sorted(load_gold(grain, base_path=incremental), key),
+            _sorted(load_gold(grain, base_path=full), key),
+        )
+
+    # Daily rollup (summed from hourly partials) agrees with aggregate_daily
+    daily = _sorted(load_gold("day", base_path=full), "day_key")
+    expected = _sorted(aggregate_daily(sample_raw_df), "date")
+    assert (daily["period_start"].dt.strftime("%Y-%m-%d") == expected["date"]).all()
+    pd.testing.assert_series_equal(daily["avg_latency"], expected["avg_latency"])
+    assert load_gold("week", base_path=full)["usage_count"].sum() == len(sample_raw_df)
+
+    # A full recompute replaces, rather than adds to, the days it covers
+    materialize_gold(sample_raw_df, full)
+    assert load_gold("hour", base_path=full)["usage_count"].sum() == len(sample_raw_df)
@@ -0,0 +1,148 @@
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pipeline import catalog, incremental, ingest
+from pipeline.aggregate import (
+    DAILY_COLUMNS, LATENCY_PERCENTILES, aggregate_daily, daily_to_partial_aggregates, finalize_partial_aggregates,
+    latency_digests, merge_daily_aggregates, merge_latency_digests, merge_partial_aggregates,
+    partial_aggregates,
+)
+from pipeline.incremental import commit_watermark, pending_bronze_files
+
+RUN_PIPELINE = Path(__file__).resolve().parents[1] / "pipeline" / "run_pipeline.py"
+
+
+def test_pending_bronze_files_excludes_committed(tmp_path, monkeypatch, sample_raw_df):
+    monkeypatch.setattr(ingest, "BRONZE_PATH", tmp_path)
+    partition = tmp_path / "date=2025-01-01"
+    partition.mkdir()
+    sample_raw_df.to_parquet(partition / "raw_events_a.parquet", index=False)
+
+    first = pending_bronze_files()
+    assert len(first) == 1
+    commit_watermark(first)
+
+    sample_raw_df.to_parquet(partition / "raw_events_b.parquet", index=False)
+    catalog.register_files(tmp_path, [partition / "raw_events_b.parquet"])
+    second = pending_bronze_files()
+    assert [f.name for f in second] == ["raw_events_b.parquet"]
+
+
+
+def test_concurrent_watermark_commits_keep_every_file(tmp_path, monkeypatch, sample_raw_df):
+    monkeypatch.setattr(ingest, "BRONZE_PATH", tmp_path)
+    partition = tmp_path / "date=2025-01-01"
+    partition.mkdir()
+    files = [partition / f"raw_events_{i}.parquet" for i in range(2)]
+
+    # Slow enough that, unlocked, both commits read the watermark before either saves
+    save = incremental._save_watermark
+    monkeypatch.setattr(incremental, "_save_watermark", lambda w: time.sleep(0.2) or save(w))
+    threads = [threading.Thread(target=commit_watermark, args=([f],)) for f in files]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(incremental.load_watermark()["consumed"]) == [ingest.bronze_key(f) for f in files]
+    assert not (tmp_path / "_watermark.lock").exists()
+
+
+def test_full_then_incremental_runs_count_every_event_once(tmp_path):
+    np.random.seed(42)
+    n = 1200
+    export = pd.DataFrame({
+        "user_id": [f"u{i}" for i in range(n)],
+        "feature_name": np.random.choice(["search", "checkout", "login", "dashboard"], n),
+        "session_duration": np.random.uniform(10, 300, n),
+        "latency_ms": np.random.uniform(80, 600, n),
+        "crash_flag": np.random.choice([0, 1], n, p=[0.95, 0.05]),
+        "error_count": np.random.randint(0, 10, n),
+        "feedback_score": np.random.choice([1, 2, 3, 4, 5], n),
+        "timestamp": pd.date_range("2025-01-01", periods=n, freq="h").astype(str),
+    })
+    raw = tmp_path / "data" / "raw" / "product_logs.csv"
+    raw.parent.mkdir(parents=True)
+
+    def run(*args):
+        subprocess.run([sys.executable, str(RUN_PIPELINE), *args], cwd=tmp_path, check=True, capture_output=True)
+        return pd.read_csv(tmp_path / "data" / "processed" / "feature_metrics.csv")["usage_count"].sum()
+
+    export.iloc[:800].to_csv(raw, index=False)
+    assert run() == 800
+
+    # An older Bronze copy of the export (as earlier pipeline versions left
+    # behind) and an unchanged export add nothing
+    legacy = tmp_path / "data" / "bronze" / "date=2025-01-01" / "raw_events_000000.parquet"
+    export.iloc[:800].to_parquet(legacy, index=False)
+    catalog.register_files(tmp_path / "data" / "bronze", [legacy])
+    assert run("--incremental") == 800
+
+    # A grown export is re-landed in full; only its new rows are added
+    export.to_csv(raw, index=False)
+    assert run("--incremental") == n
+
+def test_merge_daily_aggregates_matches_full_recompute(sample_raw_df):
+    old, new = sample_raw_df.iloc[:60], sample_raw_df.iloc[60:]
+
+    merged = merge_daily_aggregates(aggregate_daily(old), aggregate_daily(new))
+    full = aggregate_daily(sample_raw_df)[DAILY_COLUMNS]
+
+    merged = merged.sort_values(["feature_name", "date"]).reset_index(drop=True)
+    full = full.sort_values(["feature_name", "date"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(merged, full, check_dtype=False)
+
+
+def test_partial_aggregates_merge_late_events_into_affected_days_only(sample_raw_df):
+    history = sample_raw_df.copy()
+    history.loc[::7, "latency_ms"] = None
+    # Late events for 2025-01-02 arrive after that day was aggregated
+    late = history[history["timestamp"].str.startswith("2025-01-02")].head(5).assign(latency_ms=9000.0)
+
+    before = finalize_partial_aggregates(partial_aggregates(history))
+    merged = merge_partial_aggregates(partial_aggregates(history), partial_aggregates(late))
+    after = finalize_partial_aggregates(merged)
+
+    full = aggregate_daily(pd.concat([history, late]))[DAILY_COLUMNS]
+    pd.testing.assert_frame_equal(after, full)
+
+    changed = (after[["avg_latency", "usage_count"]] != before[["avg_latency", "usage_count"]]).any(axis=1)
+    assert set(after.loc[changed, "date"]) == {"2025-01-02"}
+
+
+def test_seeded_partials_leave_std_unknown_after_merge(sample_raw_df):
+    old, new = sample_raw_df.iloc[:60], sample_raw_df.iloc[60:]
+    history = aggregate_daily(old)
+
+    seeded = daily_to_partial_aggregates(history)
+    merged = finalize_partial_aggregates(merge_partial_aggregates(seeded, partial_aggregates(new)), with_std=True)
+    exact = finalize_partial_aggregates(partial_aggregates(new), with_std=True)
+
+    # Feature-days with seeded history have no std; the new batch's own days keep theirs
+    merged = merged.set_index(["feature_name", "date"])["latency_ms_std"]
+    from_history = merged.index.isin(pd.MultiIndex.from_frame(history[["feature_name", "date"]]))
+    assert from_history.any() and merged[from_history].isna().all()
+    fresh = merged[~from_history]
+    pd.testing.assert_series_equal(fresh, exact.set_index(["feature_name", "date"])["latency_ms_std"].loc[fresh.index])
+
+
+def test_latency_digests_merge_updates_percentiles_of_affected_days_only(sample_raw_df):
+    late = sample_raw_df[sample_raw_df["timestamp"].str.startswith("2025-01-02")].head(5).assign(latency_ms=9000.0)
+    cols = list(LATENCY_PERCENTILES)
+
+    before = latency_digests(sample_raw_df)
+    merged = merge_latency_digests(before, latency_digests(late))
+    full = aggregate_daily(pd.concat([sample_raw_df, late]))
+
+    # Untouched feature-days keep their exact batch percentiles
+    changed = (merged[cols] != before[cols]).any(axis=1)
+    assert set(merged.loc[changed, "day_key"]) == set(late.pipe(ingest.parse_timestamps)["day_key"])
+    assert (merged.loc[~changed, cols].to_numpy() == full.loc[~changed.to_numpy(), cols].to_numpy()).all()
+    # The late tail shows up in the merged p99, bounded by the exact max
+    assert (merged.loc[changed, "latency_p99"] > before.loc[changed, "latency_p99"]).all()
+    assert (merged.loc[changed, "latency_p99"] <= 9000.0).all()
@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+from pipeline import ingest
+from pipeline.ingest import iter_raw_batches, load_raw_data
+from pipeline.validate import check_schema
+
+
+def test_iter_raw_batches_streams_with_explicit_schema(tmp_path, monkeypatch, sample_raw_df):
+    monkeypatch.setattr(ingest, "BRONZE_PATH", tmp_path / "bronze")
+    csv_path = tmp_path / "product_logs.csv"
+    sample_raw_df.to_csv(csv_path, index=False)
+
+    batches = list(iter_raw_batches(csv_path, block_size=1024))
+
+    assert len(batches) > 1
+    assert sum(b.num_rows for b in batches) == len(sample_raw_df)
+    assert batches[0].schema.field("user_id").type == pa.string()
+    assert batches[0].schema.field("latency_ms").type == pa.float64()
+
+    df = load_raw_data(str(csv_path))
+    assert len(df) == len(sample_raw_df)
+    assert list(df.columns) == list(sample_raw_df.columns) + ["day_key"]
+    assert pd.api.types.is_datetime64_dtype(df["timestamp"])
+
+
+def test_load_raw_data_reads_malformed_numeric_cells_leniently(tmp_path, monkeypatch, sample_raw_df):
+    monkeypatch.setattr(ingest, "BRONZE_PATH", tmp_path / "bronze")
+    raw = sample_raw_df.astype({"latency_ms": object, "crash_flag": object})
+    raw.loc[3, "latency_ms"] = "abc"
+    raw.loc[5, "crash_flag"] = "1.0"
+    csv_path = tmp_path / "product_logs.csv"
+    raw.to_csv(csv_path, index=False)
+
+    df = load_raw_data(str(csv_path), dtype_profile="compact")
+    result = check_schema(df)
+
+    assert len(df) == len(raw)
+    assert result.columns["latency_ms"].coercion_failures == 1
+    assert result.columns["crash_flag"].coercion_failures == 0
+    assert df.loc[5, "crash_flag"] == 1
+
+    bronze = ingest.load_bronze_data()
+    assert len(bronze) == len(raw)
+    assert bronze["latency_ms"].isna().sum() == 1
+
+
+def test_load_bronze_data_prunes_partitions_and_filters_rows(tmp_path, monkeypatch, sample_raw_df):
+    bronze = tmp_path / "bronze"
+    monkeypatch.setattr(ingest, "BRONZE_PATH", bronze)
+    for day in ["2025-01-01", "2025-01-02", "2025-01-03"]:
+        (bronze / f"date={day}").mkdir(parents=True)
+        sample_raw_df.to_parquet(bronze / f"date={day}" / "raw_events_000000.parquet", index=False)
+
+    df = ingest.load_bronze_data(
+        start="2025-01-02",
+        end="2025-01-03",
+        columns=["feature_name", "latency_ms", "date"],
+        filters={"feature_name": ["search"]},
+    )
+
+    expected = (sample_raw_df["feature_name"] == "search").sum() * 2
+    assert len(df) == expected
+    assert set(df["feature_name"]) == {"search"}
+    assert set(df["date"]) == {"2025-01-02", "2025-01-03"}
+    assert list(df.columns) == ["feature_name", "latency_ms", "date"]
+
+
+def test_load_raw_data_skips_duplicate_bronze_writes(tmp_path, monkeypatch, sample_raw_df):
+    bronze = tmp_path / "bronze"
+    monkeypatch.setattr(ingest, "BRONZE_PATH", bronze)
+    csv_path = tmp_path / "product_logs.csv"
+    sample_raw_df.to_csv(csv_path, index=False)
+
+    load_raw_data(str(csv_path))
+    first_write = len(list(bronze.rglob("*.parquet")))
+    load_raw_data(str(csv_path))
+    assert len(list(bronze.rglob("*.parquet"))) == first_write
+
+    # Same content under a new mtime → hashed again, still deduplicated
+    os.utime(csv_path, ns=(0, 0))
+    load_raw_data(str(csv_path))
+    assert len(list(bronze.rglob("*.parquet"))) == first_write
+
+    sample_raw_df.head(10).to_csv(csv_path, index=False)
+    load_raw_data(str(csv_path))
+    assert len(list(bronze.rglob("*.parquet"))) == first_write + 1
+
+
+def test_concurrent_bronze_landings_keep_every_manifest_entry(tmp_path, monkeypatch, sample_raw_df):
+    monkeypatch.setattr(ingest, "BRONZE_PATH", tmp_path / "bronze")
+    threads = []
+    for i, chunk in enumerate([sample_raw_df.iloc[:50], sample_raw_df.iloc[50:]]):
+        source = tmp_path / f"export_{i}.csv"
+        chunk.to_csv(source, index=False)
+        # Slow enough that, unlocked, both landings read the manifest before either saves
+        load = lambda chunk=chunk: time.sleep(0.2) or chunk
+        threads.append(threading.Thread(target=ingest._save_to_bronze_once, args=(source, load)))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    manifest = ingest._load_manifest()
+    assert len(manifest["content"]) == len(manifest["sources"]) == 2
+    assert not (tmp_path / "bronze" / "_ingest_manifest.lock").exists()
+
+
+def test_save_to_bronze_partitions_by_event_date(tmp_path, monkeypatch, sample_raw_df):
+    monkeypatch.setattr(ingest, "BRONZE_PATH", tmp_path)
+
+    paths = ingest._save_to_bronze(sample_raw_df)
+
+    # 100 hourly events starting 2025-01-01 span five calendar days
+    assert [p.parent.name for p in paths] == [f"date=2025-01-0{d}" for d in range(1, 6)]
+    df = ingest.load_bronze_data(start="2025-01-02", end="2025-01-02")
+    assert len(df) == 24
+
+
+def test_load_bronze_data_concurrency_limit_gives_same_result(tmp_path, monkeypatch, sample_raw_df):
+    monkeypatch.setattr(ingest, "BRONZE_PATH", tmp_path)
+    for i in range(6):
+        ingest._save_to_bronze(sample_raw_df.iloc[i * 10:(i + 1) * 10])
+
+    serial = ingest.load_bronze_data(max_concurrency=1)
+    parallel = ingest.load_bronze_data(max_concurrency=8)
+
+    assert len(serial) == len(parallel) == 60
+    key = ["user_id", "timestamp"]
+    pd.testing.assert_frame_equal(
+        serial.sort_values(key).reset_index(drop=True),
+        parallel.sort_values(key).reset_index(drop=True),
+    )
+
+
+def test_parse_timestamps_adds_day_key_once(sample_raw_df):
+    df = sample_raw_df.copy()
+    df.loc[3, "timestamp"] = "not a timestamp"
+
+    ingest.parse_timestamps(df)
+    assert pd.api.types.is_datetime64_dtype(df["timestamp"])
+    assert df["timestamp"].isna().sum() == 1
+    assert df["day_key"].isna().sum() == 1
+
+    # 2025-01-01 is day 20089 since the epoch; rendering happens per distinct day
+    assert df["day_key"].iloc[0] == 20089
+    dates = ingest.render_day_keys(df["day_key"])
+    assert dates[0] == "2025-01-01" and dates[3] is None
+    assert list(dates[df["day_key"].notna().to_numpy()]) == list(
+        df["timestamp"].dropna().dt.strftime("%Y-%m-%d")
+    )
+
+    pd.testing.assert_frame_equal(ingest.parse_timestamps(df.copy()), df)
@@ -1,5 +1,5 @@
 import pandas as pd
-from pipeline.score import MLConfig, create_target, train_model, score_dataframe
+from pipeline.score import MLConfig, create_target, evict_model_cache, train_model, score_dataframe
 
 
 def _make_training_df(n: int = 200) -> pd.DataFrame:
@@ -38,3 +38,26 @@ def test_score_dataframe_adds_risk_score_and_bucket():
     assert "risk_probability" in df_scored.columns
     assert df_scored["risk_probability"].between(0, 1).all()
     assert "risk_label" in df_scored.columns
+
+
+def test_train_model_cache_hit_force_retrain_and_eviction(tmp_path):
+    config = MLConfig(n_estimators=20)
+    df = create_target(_make_training_df(200), config)
+
+    model, metrics = train_model(df, config, cache_path=tmp_path)
+    cached_model, cached_metrics = train_model(df, config, cache_path=tmp_path)
+    assert not metrics["cache_hit"] and cached_metrics["cache_hit"]
+    assert cached_metrics["fingerprint"] == metrics["fingerprint"]
+    assert cached_metrics["roc_auc"] == metrics["roc_auc"]
+    assert (cached_model.predict_proba(df[list(config.feature_cols)]) ==
+            model.predict_proba(df[list(config.feature_cols)])).all()
+
+    _, retrained = train_model(df, config, force_retrain=True, cache_path=tmp_path)
+    assert not retrained["cache_hit"]
+
+    # A different config is a different entry; the oldest goes past max_entries
+    _, other = train_model(df, MLConfig(n_estimators=21), cache_path=tmp_path)
+    assert other["fingerprint"] != metrics["fingerprint"]
+    assert len(list(tmp_path.glob("*.joblib"))) == 2
+    evicted = evict_model_cache(tmp_path, max_entries=1)
+    assert [p.stem for p in evicted] == [metrics["fingerprint"]]
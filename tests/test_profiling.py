@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from pipeline.profiling import profile_dataframe
+from pipeline.quality_checks import run_great_expectations_suite
+
+
+def test_profile_matches_pandas_statistics(sample_raw_df):
+    df = sample_raw_df.copy()
+    df.loc[:4, "latency_ms"] = np.nan
+
+    profile = profile_dataframe(df)
+    latency = profile["latency_ms"]
+
+    assert profile.rows == len(df)
+    assert latency.null_count == 5
+    assert latency.mean == df["latency_ms"].mean()
+    assert np.isclose(latency.std, df["latency_ms"].std())
+    assert latency.quantile(0.99) == df["latency_ms"].quantile(0.99)
+    assert profile["crash_flag"].distinct_values == sorted(df["crash_flag"].unique())
+    assert profile["feature_name"].n_distinct == df["feature_name"].nunique()
+
+
+def test_quality_suite_evaluates_checks_from_profile(sample_raw_df):
+    df = sample_raw_df.copy()
+    df.loc[0, "crash_flag"] = 2
+    df.loc[1:2, "feedback_score"] = 9.0
+
+    report = run_great_expectations_suite(df, profile_dataframe(df))
+    failed = {r["expectation"]: r["detail"] for r in report["failures"]}
+
+    assert "expect_crash_flag_is_binary" in failed
+    assert failed["expect_feedback_score_between_1_and_5"].endswith(": 2")
+
+
+def test_string_and_categorical_profiles_agree_across_dtypes():
+    names = pd.Series(["search", "export", None, " ", "search", "share", ""], name="feature_name")
+    expected = profile_dataframe(pd.DataFrame({"feature_name": names}))["feature_name"]
+
+    for dtype in ("category", "string[pyarrow]", "string[python]"):
+        # Unused categories are not distinct values of the column
+        series = names.astype(dtype)
+        if dtype == "category":
+            series = series.cat.add_categories(["unused"])
+        prof = profile_dataframe(pd.DataFrame({"feature_name": series}))["feature_name"]
+        assert (prof.count, prof.null_count, prof.empty_count) == (6, 1, 2)
+        assert prof.n_distinct == expected.n_distinct == 5
+        assert prof.distinct_values == expected.distinct_values == ["", " ", "export", "search", "share"]
@@ -1,6 +1,16 @@
+import time
+
+import numpy as np
 import pandas as pd
 import pytest
-from pipeline.quality_checks import check_null_rates
+from pipeline import quality_checks
+from pipeline.ingest import parse_timestamps
+from pipeline.profiling import profile_dataframe
+from pipeline.sampling import estimate_rate, stratified_sample
+from pipeline.quality_checks import (
+    Expectation, SuiteContext, check_null_rates, run_expectations, run_great_expectations_suite,
+)
+
 
 def test_check_null_rates_passes_when_valid():
     df = pd.DataFrame({
@@ -18,4 +28,102 @@ def test_check_null_rates_raises_when_nulls_present():
     })
 
     with pytest.raises(ValueError):
-        check_null_rates(df)
\ No newline at end of file
+        check_null_rates(df)
+
+
+def test_grouped_quality_suite_isolates_failing_feature(sample_raw_df):
+    df = sample_raw_df.copy()
+    checkout = df["feature_name"] == "checkout"
+    df.loc[checkout, "crash_flag"] = 3
+    df.loc[df.index[checkout][:2], "latency_ms"] = None
+
+    report = run_great_expectations_suite(df, group_by=["feature_name"])
+    groups = {g["feature_name"]: g for g in report["groups"]}
+
+    assert report["groups_total"] == 4
+    assert report["groups_failed"] == 1
+    assert set(groups["checkout"]["failed_expectations"]) == {
+        "expect_crash_flag_is_binary",
+        "expect_column_null_rate_below_threshold_latency_ms",
+    }
+    assert groups["search"]["passed"]
+
+
+def test_quality_suite_records_timing_and_fast_fails(sample_raw_df):
+    report = run_great_expectations_suite(sample_raw_df)
+    assert all(r["wall_time_ms"] >= 0 for r in report["results"])
+    timestamp_check = next(r for r in report["results"] if r["expectation"] == "expect_timestamp_parseable")
+    assert timestamp_check["rows_scanned"] == len(sample_raw_df)
+
+    df = sample_raw_df.drop(columns=["crash_flag"])
+    report = run_great_expectations_suite(df, max_workers=1, fast_fail=True)
+
+    assert [r["expectation"] for r in report["results"]] == ["expect_columns_to_exist"]
+    assert len(report["skipped"]) > 0
+
+
+def test_sampled_quality_suite_reports_ci_and_falls_back_near_threshold(sample_raw_df):
+    df = pd.concat([sample_raw_df] * 200, ignore_index=True)
+    df["user_id"] = [f"u{i}" for i in range(len(df))]
+    df.loc[df.index % 20 == 0, "latency_ms"] = None  # exactly the 5% threshold
+
+    report = run_great_expectations_suite(df, sample_size=5_000)
+    results = {r["expectation"]: r for r in report["results"]}
+
+    assert report["mode"] == "sampled"
+    crash = results["expect_crash_flag_is_binary"]
+    assert crash["sampled"] and crash["rows_scanned"] == report["sample_size"]
+    assert crash["rate_ci"][0] <= crash["rate_estimate"] <= crash["rate_ci"][1]
+    nulls = results["expect_column_null_rate_below_threshold_latency_ms"]
+    assert nulls["fallback_full_scan"] and nulls["rows_scanned"] == len(df)
+
+
+
+def test_stratified_sample_takes_two_rows_from_small_strata():
+    # 500 strata of 10 rows plus one single-row stratum; a 5% proportional
+    # allocation would take one row from each and report zero variance
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"feature_name": np.append(np.repeat(np.arange(500), 10), 500).astype(str)})
+    flagged = rng.random(len(df)) < 0.3
+
+    sample = stratified_sample(df, sample_size=250, strata=["feature_name"])
+    assert (sample.sample_sizes == np.minimum(2, sample.population_sizes)).all()
+
+    estimate, low, high = estimate_rate(sample, flagged[sample.df.index])
+    assert high - low > 0.02
+    assert low <= flagged.mean() <= high
+
+def test_timestamp_check_counts_unparseable_but_not_missing_timestamps(sample_raw_df):
+    df = sample_raw_df.copy()
+    df.loc[3, "timestamp"] = None
+    df.loc[5, "timestamp"] = "not a timestamp"
+
+    for frame in (df, parse_timestamps(df.copy())):
+        report = run_great_expectations_suite(frame)
+        check = next(r for r in report["results"] if r["expectation"] == "expect_timestamp_parseable")
+        assert not check["passed"] and check["detail"] == "Unparseable timestamps: 1"
+
+    df.loc[5, "timestamp"] = None
+    report = run_great_expectations_suite(parse_timestamps(df))
+    check = next(r for r in report["results"] if r["expectation"] == "expect_timestamp_parseable")
+    assert check["passed"]
+
+
+def test_time_spent_on_the_shared_profile_does_not_count_towards_timeouts(sample_raw_df, monkeypatch):
+    def slow_profile(df):
+        time.sleep(0.5)
+        return profile_dataframe(df)
+
+    monkeypatch.setattr(quality_checks, "profile_dataframe", slow_profile)
+    ctx = SuiteContext(df=sample_raw_df)
+    uses_profile = [
+        Expectation(f"uses_profile_{i}", lambda ctx: (ctx.profile["latency_ms"].count > 0, "ok", 0), timeout=0.2)
+        for i in range(2)
+    ]
+    slow = Expectation("slow", lambda ctx: (time.sleep(0.5), (True, "ok", 0))[1], timeout=0.2)
+
+    results = {r["expectation"]: r for r in run_expectations(ctx, uses_profile + [slow], max_workers=3)}
+
+    assert results["uses_profile_0"]["status"] == results["uses_profile_1"]["status"] == "passed"
+    assert results["slow"]["status"] == "timeout"
+    assert "still running" in results["slow"]["detail"]
@@ -0,0 +1,31 @@
+import numpy as np
+
+from pipeline.sketches import TDigest, sketch_batches
+
+
+def test_tdigest_quantiles_within_documented_rank_error():
+    rng = np.random.default_rng(7)
+    values = rng.lognormal(5, 1, 200_000)
+    sorted_values = np.sort(values)
+
+    digest = TDigest()
+    for chunk in np.array_split(values, 13):
+        digest.update(chunk)
+
+    for q in (0.5, 0.95, 0.99):
+        rank = np.searchsorted(sorted_values, digest.quantile(q)) / len(values)
+        assert abs(rank - q) <= np.pi * np.sqrt(q * (1 - q)) / digest.compression
+    assert digest.quantile(0.0) == values.min()
+    assert digest.quantile(1.0) == values.max()
+
+
+def test_tdigest_merge_across_partitions_matches_single_digest(sample_raw_df):
+    halves = [sample_raw_df.iloc[:50], sample_raw_df.iloc[50:]]
+
+    merged = TDigest.from_values(halves[0]["latency_ms"]).merge(
+        TDigest.from_values(halves[1]["latency_ms"])
+    )
+    streamed = sketch_batches(halves, "latency_ms")
+
+    assert merged.count == streamed.count == len(sample_raw_df)
+    assert np.isclose(merged.quantile(0.95), streamed.quantile(0.95), rtol=0.05)
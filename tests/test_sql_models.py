@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+from pipeline import ingest
+from pipeline.aggregate import aggregate_daily
+from pipeline.sql_models import BRONZE_RELATION, load_models, run_sql_models
+
+
+def test_load_models_renders_jinja_and_orders_by_ref():
+    models = {m.name: m for m in load_models()}
+    names = list(models)
+
+    assert names.index("bronze_feature_events") < names.index("silver_feature_metrics")
+    assert models["bronze_feature_events"].materialized == "view"
+    assert models["silver_feature_metrics"].materialized == "table"
+    assert models["silver_feature_metrics"].refs == ["bronze_feature_events"]
+    for model in models.values():
+        assert "{{" not in model.sql and "read_csv_auto" not in model.sql
+    assert f"FROM {BRONZE_RELATION}" in models["bronze_feature_events"].sql
+
+
+def test_run_sql_models_over_bronze_matches_aggregate_daily(tmp_path, monkeypatch, sample_raw_df):
+    pytest.importorskip("duckdb")
+    monkeypatch.setattr(ingest, "BRONZE_PATH", tmp_path / "bronze")
+    ingest._save_to_bronze(sample_raw_df)
+
+    tables = run_sql_models()
+
+    assert list(tables) == ["silver_feature_metrics"]
+    silver = tables["silver_feature_metrics"].to_pandas()
+    silver["date"] = pd.to_datetime(silver["event_date"]).dt.strftime("%Y-%m-%d")
+    silver = silver.sort_values(["feature_name", "date"], ignore_index=True)
+    daily = aggregate_daily(sample_raw_df)
+    pd.testing.assert_series_equal(silver["usage_count"], daily["usage_count"], check_dtype=False)
+    pd.testing.assert_series_equal(silver["avg_latency"], daily["avg_latency"], check_exact=False)
+    assert silver["rolling_7d_avg_latency"].notna().all()
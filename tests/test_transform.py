@@ -0,0 +1,35 @@
+import pandas as pd
+from pipeline import transform
+from pipeline.dtypes import apply_dtype_profile
+
+
+def test_parallel_engineer_features_matches_serial(tmp_path, monkeypatch, sample_raw_df):
+    monkeypatch.setattr(transform, "SILVER_PATH", tmp_path)
+    monkeypatch.setattr(transform, "PARALLEL_MIN_ROWS", 0)
+
+    for profile in ("default", "compact"):
+        raw = sample_raw_df if profile == "default" else apply_dtype_profile(sample_raw_df.copy(), "compact")
+        serial = transform.engineer_features(raw, dtype_profile=profile)
+        parallel = transform.engineer_features(raw, dtype_profile=profile, workers=2)
+
+        # p95 latency and max session_duration come from the whole frame,
+        # not from each worker's chunk
+        pd.testing.assert_frame_equal(parallel, serial)
+        assert serial["is_anomaly"].sum() == parallel["is_anomaly"].sum()
+
+
+def test_engineer_features_column_subset_leaves_input_untouched(tmp_path, monkeypatch, sample_raw_df):
+    monkeypatch.setattr(transform, "SILVER_PATH", tmp_path)
+    raw = sample_raw_df.copy()
+
+    full = transform.engineer_features(raw, write_silver=False)
+    subset = transform.engineer_features(raw, columns=["feature_name", "is_anomaly"], write_silver=False)
+
+    pd.testing.assert_frame_equal(subset, full[["feature_name", "is_anomaly"]])
+    pd.testing.assert_frame_equal(raw, sample_raw_df)
+    assert not list(tmp_path.rglob("*.parquet"))
+
+    # Writing Silver still derives every column, whatever is returned
+    transform.engineer_features(raw, columns=["feature_name"])
+    written = pd.read_parquet(next(tmp_path.rglob("*.parquet")))
+    assert set(transform.DERIVED_COLUMNS) <= set(written.columns)
@@ -1,6 +1,6 @@
 import pandas as pd
 import pytest
-from pipeline.validate import validate_schema
+from pipeline.validate import check_schema, validate_schema
 
 def test_validate_schema_raw_passes_with_required_columns():
     df = pd.DataFrame({
@@ -25,4 +25,28 @@ def test_validate_schema_raw_raises_on_missing_column():
     })
 
     with pytest.raises(ValueError):
-        validate_schema(df, stage="raw")
\ No newline at end of file
+        validate_schema(df, stage="raw")
+
+
+def test_check_schema_reports_per_column_counts_in_one_result():
+    df = pd.DataFrame({
+        "user_id": ["u1", "u2", "u3", "u4"],
+        "feature_name": ["search"] * 4,
+        "session_duration": [120, 60, 30, 10],
+        "latency_ms": ["250", "oops", None, "20000"],
+        "crash_flag": [0, 1, 0, 0],
+        "error_count": [0, 0, 0, 0],
+        "feedback_score": [4.5, 4.0, 3.0, 2.0],
+        "timestamp": ["2026-01-01T00:00:00Z"] * 4,
+    })
+
+    result = check_schema(df, stage="raw")
+    latency = result.columns["latency_ms"]
+
+    assert latency.null_count == 2
+    assert latency.coercion_failures == 1
+    assert latency.non_null == 2
+    assert latency.out_of_range == 1
+    assert not result.passed  # 1 of 2 non-null values out of range (>20%)
+    with pytest.raises(ValueError, match="Critical range violations"):
+        result.raise_for_errors()